@@ -9,7 +9,12 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 
 ### files for usage ###
 from backend_files.weather_wrapper import weather_wrapper as ww
-from backend_files.weather_plot_main import plot_oneAxis, plot_twinAxis
+from backend_files.weather_plot_main import get_series, get_viewport_series
+from backend_files.weather_plot_canvas import weather_plot_canvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+from backend_files._weather_trend import trend_methods, trend_labels
+from backend_files._weather_resample import get_frequency_seconds
+from backend_files import _weather_profiler as profiler
 
 
 
@@ -57,6 +62,158 @@ def get_view_selection_strings(list_view: QtWidgets.QListView):
 
 
 
+class _loading_cancelled(Exception):
+    pass
+
+class weather_loader(QtCore.QThread):
+    '''
+    Builds the weather_wrapper of a folder in a background thread, so the GUI stays responsive.
+    With a data_object, only its changed files get parsed (weather_wrapper.load_changes), the GUI-thread
+    merges them with apply_changes. The results are only handed over via signals (queued into the GUI-thread).
+    '''
+    progress = QtCore.pyqtSignal(int, int, int) # loaded files, number of files, loaded rows
+    loaded = QtCore.pyqtSignal(object) # the finished weather_wrapper (changes for a data_object)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+    
+    def __init__(self, folder_path: str, data_object=None, parent=None):
+        super(weather_loader, self).__init__(parent)
+        self.folder_path = folder_path
+        self.data_object = data_object
+    
+    def run(self):
+        try:
+            if self.data_object is None:
+                data_object = ww(directory=self.folder_path, build_pyramid=True, # pyramid: fast plots of long time ranges
+                                 progress_callback=self._report_progress)
+            else:
+                data_object = self.data_object.load_changes(progress_callback=self._report_progress)
+        except _loading_cancelled:
+            self.cancelled.emit()
+            return
+        except Exception as error: # every error has to reach the GUI, otherwise it waits forever
+            self.failed.emit(str(error))
+            return
+        
+        if self.isInterruptionRequested(): # cancelled after the last file
+            self.cancelled.emit()
+        else:
+            self.loaded.emit(data_object)
+    
+    def _report_progress(self, loaded_files: int, file_count: int, loaded_rows: int):
+        if self.isInterruptionRequested(): raise _loading_cancelled()
+        self.progress.emit(loaded_files, file_count, loaded_rows)
+
+
+
+
+class diagnostics_dialog(QtWidgets.QDialog):
+    # timings of the instrumented stages (see backend_files/_weather_profiler.py)
+    _column_names = ["Abschnitt", "Anzahl", "Gesamt [ms]", "Mittel [ms]", "Max [ms]", "Zeilen", "Gelesen [MB]"]
+    
+    def __init__(self, parent=None):
+        super(diagnostics_dialog, self).__init__(parent)
+        self.setWindowTitle("Diagnose")
+        self.resize(700, 380)
+        
+        self.checkbox_enabled = QtWidgets.QCheckBox("Zeitmessung aktiv", self)
+        self.checkbox_enabled.setChecked(profiler.is_enabled())
+        self.checkbox_enabled.toggled.connect(self.checkBoxEnabled)
+        self.checkbox_profile = QtWidgets.QCheckBox("mit cProfile (langsamer)", self)
+        self.checkbox_profile.setChecked(profiler.is_profiling())
+        self.checkbox_profile.setEnabled(not profiler.is_enabled())
+        
+        self.table = QtWidgets.QTableWidget(0, len(self._column_names), self)
+        self.table.setHorizontalHeaderLabels(self._column_names)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        self.label_cache = QtWidgets.QLabel(self) # result cache of the loaded data (subscript_data/trend lines)
+        
+        button_refresh = QtWidgets.QPushButton("Aktualisieren", self)
+        button_refresh.clicked.connect(self.refresh)
+        button_reset = QtWidgets.QPushButton("Zurücksetzen", self)
+        button_reset.clicked.connect(self.buttonReset)
+        self.button_json = QtWidgets.QPushButton("Als JSON speichern...", self)
+        self.button_json.clicked.connect(self.buttonSaveJson)
+        self.button_profile = QtWidgets.QPushButton("cProfile speichern...", self)
+        self.button_profile.clicked.connect(self.buttonSaveProfile)
+        
+        options_layout = QtWidgets.QHBoxLayout()
+        options_layout.addWidget(self.checkbox_enabled)
+        options_layout.addWidget(self.checkbox_profile)
+        options_layout.addStretch()
+        buttons_layout = QtWidgets.QHBoxLayout()
+        for button in [button_refresh, button_reset, self.button_json, self.button_profile]:
+            buttons_layout.addWidget(button)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(options_layout)
+        layout.addWidget(self.table)
+        layout.addWidget(self.label_cache)
+        layout.addLayout(buttons_layout)
+        
+        self.refresh_timer = QtCore.QTimer(self) # while open, e.g. during loading
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh()
+        
+    def showEvent(self, event):
+        self.refresh_timer.start()
+        self.refresh()
+        super(diagnostics_dialog, self).showEvent(event)
+        
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super(diagnostics_dialog, self).hideEvent(event)
+        
+    def refresh(self):
+        summary = profiler.get_summary()
+        self.table.setRowCount(len(summary))
+        for row, entry in enumerate(summary):
+            values = [entry["name"], str(entry["count"]), f"{1000 * entry['total_seconds']:.1f}", f"{1000 * entry['mean_seconds']:.2f}",
+                      f"{1000 * entry['max_seconds']:.1f}", str(entry["rows"]), f"{entry['bytes_read'] / 10**6:.2f}"]
+            for column, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(value)
+                if column > 0: item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.button_profile.setEnabled(profiler.is_profiling())
+        
+        data_object = getattr(self.parent(), "data_object", None)
+        if data_object is None:
+            self.label_cache.setText("Ergebniscache: keine Daten geladen")
+        else:
+            stats = data_object.get_result_cache_stats()
+            self.label_cache.setText(f"Ergebniscache: {stats['hits']} Treffer, {stats['misses']} Fehlzugriffe, {stats['entries']} Einträge, "
+                                     f"{stats['bytes'] / 2**20:.1f} von {stats['max_bytes'] / 2**20:.0f} MB")
+        
+    def checkBoxEnabled(self, checked):
+        if checked:
+            profiler.enable(profile=self.checkbox_profile.isChecked())
+        else:
+            profiler.disable()
+        self.checkbox_profile.setEnabled(not checked) # cProfile only gets started together with the measurement
+        self.refresh()
+        
+    def buttonReset(self):
+        profiler.reset()
+        self.refresh()
+        
+    def buttonSaveJson(self):
+        file_path = QtWidgets.QFileDialog.getSaveFileName(self, "Zeitmessungen speichern", "weather_diagnostics.json", "JSON (*.json)")[0]
+        if file_path == "": return
+        try:
+            profiler.dump_json(file_path)
+        except OSError as error:
+            self.parent().message_box(f"Die Datei konnte nicht gespeichert werden ({error})!", "Achtung", icon=QtWidgets.QMessageBox.Warning)
+        
+    def buttonSaveProfile(self):
+        file_path = QtWidgets.QFileDialog.getSaveFileName(self, "cProfile speichern", "weather_diagnostics.prof", "cProfile (*.prof)")[0]
+        if file_path == "": return
+        try:
+            profiler.dump_profile(file_path)
+        except (OSError, RuntimeError) as error:
+            self.parent().message_box(f"Die Datei konnte nicht gespeichert werden ({error})!", "Achtung", icon=QtWidgets.QMessageBox.Warning)
+
+
 
 class gui_class(QtWidgets.QMainWindow):
     def __init__(self):
@@ -69,6 +226,28 @@ class gui_class(QtWidgets.QMainWindow):
         self.setup_actions()
         self.folder_path = "" # No folder yet selected        
         
+        self.data_object = None
+        self.refresher = None # weather_loader of the changed files while the folder gets polled
+        self.watch_timer = QtCore.QTimer(self) # parsing in the background, merging in the GUI-thread -> no locking needed
+        self.watch_timer.setInterval(watch_interval_ms)
+        self.watch_timer.timeout.connect(self.pollFolder)
+        
+        self.loader = None # weather_loader while a folder gets loaded
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        self.button_cancel_loading = QtWidgets.QPushButton("Abbrechen", self)
+        self.button_cancel_loading.clicked.connect(self.buttonCancelLoading)
+        self.ui.statusbar.addPermanentWidget(self.progress_bar)
+        self.ui.statusbar.addPermanentWidget(self.button_cancel_loading)
+        self.set_loading_state(False)
+        
+        self.diagnostics = None # dialog, created when it gets opened the first time
+        
+        self.plot_canvas = weather_plot_canvas(self.ui.widgetPlot) # reused for every plot
+        plot_layout = QtWidgets.QVBoxLayout(self.ui.widgetPlot)
+        plot_layout.setContentsMargins(0, 0, 0, 0)
+        plot_layout.addWidget(NavigationToolbar2QT(self.plot_canvas, self.ui.widgetPlot))
+        plot_layout.addWidget(self.plot_canvas)
+        
     def setup_actions(self):
         ### buttons and stuff ###
         self.ui.buttonLoadFolder.clicked.connect(self.buttonLoadFolder) # connect button clicked with action
@@ -76,10 +255,12 @@ class gui_class(QtWidgets.QMainWindow):
         self.ui.checkBoxSecAxis.clicked.connect(self.checkBoxSecAxis)
         
         ### menubar ###
+        self.ui.actionOrdner_ueberwachen.toggled.connect(self.actionOrdner_ueberwachen)
         self.ui.actionBeenden.triggered.connect(self.closeEvent)
         self.ui.actionLink_zu_GitHub.triggered.connect(self.linkZuGithub)
         self.ui.action_ber.triggered.connect(self.action_ueber)
         self.ui.actionZeitachsen_Beschriftung.triggered.connect(self.actionZeitachsen_Beschriftung)
+        self.ui.actionDiagnose.triggered.connect(self.actionDiagnose)
         
         ### context-menus ###
         self.ui.labelFolder.customContextMenuRequested.connect(self.labelFolder_contextMenu)
@@ -87,21 +268,62 @@ class gui_class(QtWidgets.QMainWindow):
         ### other status-settings ###
         self.ui.labelPlotSecAxis.setVisible(False)
         self.ui.listViewSecYAxis.setVisible(False)
+        
+        for trend_method in trend_methods: # label as text, method-key as item-data
+            self.ui.comboBoxTrendMethod.addItem(trend_labels[trend_method], trend_method)
  
         
         
         
     ### --- buttons and stuff --- ###    
     def buttonLoadFolder(self):
+        if not self.loader is None: return # still loading
+        
+        folder_path = QtWidgets.QFileDialog.getExistingDirectory(self, 'Wähle Ordner der Wetterdateien') # Select weather-files folder
+        if folder_path == "": return # dialog cancelled
+        
+        # parsing happens in the background, the old data stays usable until the new data is ready
+        self.loader = weather_loader(folder_path, parent=self)
+        self.loader.progress.connect(self.loadingProgress)
+        self.loader.loaded.connect(self.loadingFinished)
+        self.loader.failed.connect(self.loadingFailed)
+        self.loader.cancelled.connect(self.loadingCancelled)
+        self.loader.finished.connect(self.loaderStopped)
+        
+        self.set_loading_state(True)
+        self.ui.statusbar.showMessage("Wetterdateien werden eingelesen...")
+        self.loader.start()
+    
+    def buttonCancelLoading(self):
+        if self.loader is None: return
+        self.loader.requestInterruption() # stops after the current chunk
+        self.ui.statusbar.showMessage("Einlesen wird abgebrochen...")
+    
+    
+    
+    ### --- background loading --- ###
+    def loadingProgress(self, loaded_files: int, file_count: int, loaded_rows: int):
+        self.progress_bar.setRange(0, file_count)
+        self.progress_bar.setValue(loaded_files)
+        if loaded_files < file_count:
+            self.ui.statusbar.showMessage(f"{loaded_files}/{file_count} Dateien eingelesen ({loaded_rows} Messwerte)...")
+        else:
+            self.ui.statusbar.showMessage(f"{loaded_rows} Messwerte werden aufbereitet...")
+    
+    def loadingFinished(self, data_object):
+        self.ui.statusbar.clearMessage()
+        if data_object.size() == 0:
+            self.message_box("Im ausgewählten Ordner wurden keine Wetterdaten gefunden!", "Achtung", icon=QtWidgets.QMessageBox.Warning)
+            return
+        
         clear_view(self.ui.listViewYAxis) # clear to prevent double-saves
         clear_view(self.ui.listViewSecYAxis)
         
-        self.folder_path = QtWidgets.QFileDialog.getExistingDirectory(self, 'Wähle Ordner der Wetterdateien') # Select weather-files folder
-        
+        self.folder_path = self.loader.folder_path
         self.ui.labelFolder.setText(self.folder_path)
         self.ui.labelFolder.setToolTip("Ausgewählter Ordner: " + str(self.folder_path))
         
-        self.data_object = ww(directory=self.folder_path)
+        self.data_object = data_object
         
         # automatically set "time boundaries" of loaded files
         earliest_time = self.data_object[0]["Time"]
@@ -121,6 +343,18 @@ class gui_class(QtWidgets.QMainWindow):
         self.ui.listViewSecYAxis.setModel(item_model_secAxis)
         
         self.message_box("Daten wurden erfolgreich eingelesen!\nEin weiteres Einlesen überschreibt intern die alten Daten.", "Information")
+    
+    def loadingFailed(self, error_message: str):
+        self.ui.statusbar.clearMessage()
+        self.message_box("Die Wetterdateien konnten nicht eingelesen werden:\n" + error_message, "Fehler", icon=QtWidgets.QMessageBox.Critical)
+    
+    def loadingCancelled(self):
+        self.ui.statusbar.showMessage("Einlesen wurde abgebrochen.")
+    
+    def loaderStopped(self):
+        self.loader.deleteLater()
+        self.loader = None
+        self.set_loading_state(False)
 
     def checkBoxSecAxis(self):        
         if self.ui.checkBoxSecAxis.isChecked():
@@ -156,29 +390,86 @@ class gui_class(QtWidgets.QMainWindow):
         
         sec_axis = self.ui.checkBoxSecAxis.isChecked()
         interpolation_degree = self.ui.spinBoxInterpDegree.value()
+        trend_method = self.ui.comboBoxTrendMethod.currentData()
+        trend_window = str(self.ui.lineEditTrendWindow.text())
+        
+        try:
+            get_frequency_seconds(trend_window)
+        except (ValueError, AssertionError):
+            self.message_box("Das Trendfenster muss z.B. \"6h\", \"1d\" oder \"2w\" sein!", "Achtung", icon=QtWidgets.QMessageBox.Warning)
+            return
         
+        axis_keys = [(YAxis_keys_plot, YAxis_keys_interp)]
         if sec_axis:
             if len(YAxis_keys_plot)+len(YAxis_keys_interp) == 0 or len(secYAxis_keys_plot)+len(secYAxis_keys_interp) == 0:
                 self.message_box("Auf beiden Achsen muss mindestens ein Wert ausgewählt werden!", "Achtung")
                 return
             print("Plotting on two axis...")
-            plot_twinAxis(self.data_object, plotting_time_format, [plot_start_datetime, plot_end_datetime],
-                          YAxis_keys_plot, secYAxis_keys_plot, YAxis_keys_interp, secYAxis_keys_interp, interpolation_degree=interpolation_degree)
+            axis_keys.append((secYAxis_keys_plot, secYAxis_keys_interp))
         else:
             if len(YAxis_keys_plot)+len(YAxis_keys_interp) == 0:
                 self.message_box("Es muss mindestens ein Wert ausgewählt werden!", "Achtung")
                 return
             print("Plotting on one axis...")
-            plot_oneAxis(self.data_object, plotting_time_format, [plot_start_datetime, plot_end_datetime], YAxis_keys_plot,
-                         YAxis_keys_interp, interpolation_degree=interpolation_degree)
+        
+        axes_series = get_series(self.data_object, [plot_start_datetime, plot_end_datetime], axis_keys, self.plot_canvas.get_pixel_width(),
+                                 interpolation_degree=interpolation_degree, trend_method=trend_method, trend_window=trend_window)
+        viewport_source = lambda time_range, pixel_width: get_viewport_series(self.data_object, time_range,
+                                                                              [plotting_keys for plotting_keys, interp_keys in axis_keys], pixel_width)
+        self.plot_canvas.show_series(axes_series, plotting_time_format, x_label=self.data_object.get_labels(["Time"])[0],
+                                     viewport_source=viewport_source)
             
         print("Plot erfolgreich durchgeführt...")
     
     
     
+    ### --- folder watching --- ###
+    def pollFolder(self):
+        if self.data_object is None or not self.refresher is None: return
+        self.refresher = weather_loader(self.folder_path, data_object=self.data_object, parent=self)
+        self.refresher.loaded.connect(self.refreshLoaded)
+        self.refresher.failed.connect(self.refreshFailed)
+        self.refresher.finished.connect(self.refresherStopped)
+        self.refresher.start()
+    
+    def refreshLoaded(self, changes):
+        if not self.refresher.data_object is self.data_object: return # other folder loaded in the meantime
+        try:
+            changed_paths = self.data_object.apply_changes(changes)
+        except RuntimeError as error:
+            self.refreshFailed(str(error))
+            return
+        if len(changed_paths) > 0: self.folderChanged(changed_paths)
+    
+    def refreshFailed(self, error_message: str): # e.g. file still gets written -> try again next time
+        print(f"Ordner konnte nicht aktualisiert werden: {error_message}")
+    
+    def refresherStopped(self):
+        self.refresher.deleteLater()
+        self.refresher = None
+    
+    def folderChanged(self, changed_paths):
+        # new data is merged into self.data_object -> only extend the time-boundaries
+        if self.data_object.size() > 0:
+            self.ui.dateTimeEnd.setDateTime(self.data_object[-1]["Time"])
+        self.ui.statusbar.showMessage(f"{len(changed_paths)} Wetterdatei(en) neu eingelesen ({datetime.now().strftime('%H:%M:%S')})")
+        print("Geänderte Wetterdateien:", changed_paths)
+    
+    
+    
     ### --- menubar --- ###
+    def actionOrdner_ueberwachen(self, checked):
+        if checked:
+            self.watch_timer.start()
+        else:
+            self.watch_timer.stop()
+    
     def closeEvent(self, event):
         print ("User has clicked the close on the main window")        
+        for thread in [self.loader, self.refresher]: # do not destroy a running thread
+            if thread is None: continue
+            thread.requestInterruption()
+            thread.wait()
         self.close() # Close opened window
         app.quit() # End loaded "python instance..."
     
@@ -200,6 +491,11 @@ class gui_class(QtWidgets.QMainWindow):
     def actionZeitachsen_Beschriftung(self, event):
         link_strftime_cheatsheet = "https://strftime.org/"
         open_link(link_strftime_cheatsheet)
+        
+    def actionDiagnose(self, event):
+        if self.diagnostics is None: self.diagnostics = diagnostics_dialog(self)
+        self.diagnostics.show()
+        self.diagnostics.raise_()
     
     
     ### --- context-menus --- ###
@@ -213,7 +509,7 @@ class gui_class(QtWidgets.QMainWindow):
             self.folder_path = ""
             self.ui.labelFolder.setText("--- noch kein Ordner ausgewählt ---")
             self.ui.labelFolder.setToolTip("Ordner mit allen einzulesenden Dateien der Wetterdaten")
-            del self.data_object # should be fine...
+            self.data_object = None
             
             self.ui.dateTimeStart.setDateTime(standard_time)
             self.ui.dateTimeEnd.setDateTime(standard_time)
@@ -228,6 +524,13 @@ class gui_class(QtWidgets.QMainWindow):
   
     
     ### --- helper-functions --- ###
+    def set_loading_state(self, loading: bool):
+        self.ui.buttonLoadFolder.setEnabled(not loading)
+        self.ui.buttonCreatePlot.setEnabled(not loading)
+        self.progress_bar.setVisible(loading)
+        self.button_cancel_loading.setVisible(loading)
+        self.progress_bar.setRange(0, 0) # busy until the first file is loaded
+    
     def message_box(self, message: str, title: str, icon=QtWidgets.QMessageBox.Information):
         msgBox = QtWidgets.QMessageBox(icon, title, message)
         msgBox.exec()
@@ -238,6 +541,7 @@ class gui_class(QtWidgets.QMainWindow):
 
 if __name__ == "__main__":
     standard_time = datetime(2000, 1, 1)
+    watch_interval_ms = 10000 # how often the folder gets checked for new files
     
     app = QtWidgets.QApplication(sys.argv)
 
@@ -0,0 +1,66 @@
+from numpy import array, asarray, isnan, where, flatnonzero, concatenate, unique, minimum, maximum, cumsum, empty, zeros, inf, int64
+
+
+def minmax_downsample(x_data, y_data, bucket_count: int):
+    '''
+    Reduces a (time-sorted) series to the minimum and maximum of every one of "bucket_count"
+    equally wide x-intervals (e.g. one bucket per pixel), so the visual extremes of the line stay.
+    Buckets without valid values keep one NaN-point -> gaps in the line stay visible.
+
+    Returns the selected x- and y-values (at most 2*bucket_count points).
+    '''
+
+    x_data, y_data = asarray(x_data), asarray(y_data, dtype=float)
+    if y_data.shape[0] <= 2 * bucket_count:
+        return x_data, y_data
+
+    indizes = get_minmax_indizes(x_data, y_data, bucket_count)
+    return x_data[indizes], y_data[indizes]
+
+def get_minmax_indizes(x_data, y_data, bucket_count: int):
+    x_values = _as_numbers(x_data)
+    bucket_ids = _get_bucket_ids(x_values, bucket_count)
+
+    bucket_starts = empty(bucket_ids.shape[0], dtype=bool)
+    bucket_starts[0] = True
+    bucket_starts[1:] = bucket_ids[1:] != bucket_ids[:-1]
+    start_indizes = flatnonzero(bucket_starts)
+    group_ids = cumsum(bucket_starts) - 1
+
+    nan_values = isnan(y_data)
+    bucket_minima = minimum.reduceat(where(nan_values, inf, y_data), start_indizes)
+    bucket_maxima = maximum.reduceat(where(nan_values, -inf, y_data), start_indizes)
+
+    min_indizes = _first_per_group(flatnonzero(y_data == bucket_minima[group_ids]), group_ids)
+    max_indizes = _first_per_group(flatnonzero(y_data == bucket_maxima[group_ids]), group_ids)
+    empty_buckets = start_indizes[bucket_minima == inf] # only NaN-values inside
+
+    return unique(concatenate([min_indizes, max_indizes, empty_buckets])) # sorted -> keeps the order of the line
+
+
+
+### helper functions ###
+
+def _as_numbers(x_data):
+    if x_data.dtype == object: # e.g. datetime-objects from subscript_data
+        x_data = array(x_data.tolist(), dtype="datetime64[us]")
+    if x_data.dtype.kind == "M":
+        return x_data.astype("datetime64[us]").view(int64).astype(float)
+    return x_data.astype(float)
+
+def _get_bucket_ids(x_values, bucket_count: int):
+    x_start, x_stop = x_values[0], x_values[-1]
+    if x_stop <= x_start: return zeros(x_values.shape[0], dtype=int64)
+
+    ret_ids = ((x_values - x_start) * (bucket_count / (x_stop - x_start))).astype(int64)
+    return minimum(ret_ids, bucket_count - 1)
+
+def _first_per_group(indizes, group_ids):
+    # first element of "indizes" for every group (indizes are sorted)
+    groups = group_ids[indizes]
+    first = empty(groups.shape[0], dtype=bool)
+    if first.shape[0] == 0: return indizes
+
+    first[0] = True
+    first[1:] = groups[1:] != groups[:-1]
+    return indizes[first]
@@ -0,0 +1,105 @@
+from os import stat, makedirs, replace, remove
+from os.path import abspath, basename, isfile
+from hashlib import sha1
+import json
+
+from numpy import load, savez, array
+
+from backend_files._weather_columns import weather_columns
+
+
+_cache_folder_name = ".weather_cache/"
+_cache_version = 2 # increase if the stored format changes -> invalidates every old cache-file
+_hash_block_size = 1 << 20
+
+
+def get_cache_directory(directory: str):
+    if not directory.endswith("/"): directory += "/"
+    return directory + _cache_folder_name
+
+def load_cached_file(file_path: str, cache_directory: str, load_function: callable, parameters: str):
+    '''
+    Returns the parsed content of "file_path" from its binary sidecar-file in "cache_directory"
+    if the source file did not change, otherwise calls load_function(file_path) and updates the cache.
+
+    A cache entry is valid for the same path, parsing parameters, size and modification time.
+    If only the modification time changed (e.g. file copied), the content hash decides.
+    '''
+
+    file_stat = stat(file_path)
+    cache_path = _get_cache_path(file_path, cache_directory)
+    meta = {"version": _cache_version,
+            "path": abspath(file_path),
+            "parameters": parameters,
+            "size": file_stat.st_size,
+            "mtime_ns": file_stat.st_mtime_ns}
+
+    cached_meta, cached_columns = _read_cache_file(cache_path)
+    if not cached_meta is None and _is_same_key(cached_meta, meta, ["version", "path", "parameters", "size"]):
+        if cached_meta["mtime_ns"] == meta["mtime_ns"]:
+            return cached_columns
+
+        meta["hash"] = get_file_hash(file_path)
+        if cached_meta.get("hash") == meta["hash"]:
+            _write_cache_file(cache_path, meta, cached_columns) # update modification time
+            return cached_columns
+
+    columns = load_function(file_path)
+    if not "hash" in meta: meta["hash"] = get_file_hash(file_path)
+    _write_cache_file(cache_path, meta, columns)
+    return columns
+
+def get_file_hash(file_path: str):
+    file_hash = sha1()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(_hash_block_size), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+
+### helper functions ###
+
+def _get_cache_path(file_path: str, cache_directory: str):
+    if not cache_directory.endswith("/"): cache_directory += "/"
+    path_hash = sha1(abspath(file_path).encode("utf-8")).hexdigest()[:12] # different folders may share one cache-directory
+    return cache_directory + basename(file_path) + "." + path_hash + ".npz"
+
+def _is_same_key(meta_a: dict, meta_b: dict, keys: list):
+    return all(meta_a.get(key) == meta_b.get(key) for key in keys)
+
+def _read_cache_file(cache_path: str):
+    if not isfile(cache_path): return None, None
+
+    try:
+        with load(cache_path, allow_pickle=False) as cache_file:
+            meta = json.loads(str(cache_file["_meta"]))
+            data_names = meta["data_names"]
+
+            columns = {name: cache_file["col_" + name] for name in data_names}
+            categories = {name: cache_file["cat_" + name].tolist() for name in meta["category_names"]}
+    except (OSError, ValueError, KeyError) as error: # broken cache-file -> just parse again
+        print(f"Warning: ignoring unreadable cache-file \"{cache_path}\" ({error})")
+        return None, None
+
+    return meta, weather_columns(data_names, columns, categories=categories)
+
+def _write_cache_file(cache_path: str, meta: dict, columns: weather_columns):
+    meta = dict(meta, data_names=columns.data_names,
+                category_names=[name for name in columns.data_names if name in weather_columns._category_names])
+
+    arrays = {"_meta": array(json.dumps(meta))}
+    for name in meta["data_names"]:
+        arrays["col_" + name] = columns.column(name)
+    for name in meta["category_names"]:
+        arrays["cat_" + name] = array(columns.categories(name), dtype=str)
+
+    tmp_path = cache_path + ".tmp"
+    try:
+        makedirs(cache_path[:cache_path.rindex("/")], exist_ok=True)
+        with open(tmp_path, "wb") as tmp_file: # file-object: savez does not append another ".npz"
+            savez(tmp_file, **arrays)
+        replace(tmp_path, cache_path) # never leave half written cache-files
+    except OSError as error: # e.g. read-only folder, loading still works without cache
+        print(f"Warning: could not write cache-file \"{cache_path}\" ({error})")
+        if isfile(tmp_path): remove(tmp_path)
@@ -0,0 +1,299 @@
+from datetime import datetime
+
+from numpy import array, empty, full, zeros, isnan, isnat, concatenate, argsort, stack, where, nan, int8, int64
+
+from backend_files._weather_merge import get_duplicate_mask
+
+
+class weather_columns(object):
+    '''
+    Columnar storage of weather data: one typed numpy array per data-name instead of one
+    python object per measurement.
+
+    Missing values ("---" in the exports) are stored as NaN for measurements, NaT for times
+    and -1 for integer and categorical columns (e.g. "WindDirection" is saved as int8-codes
+    into the list of categories).
+    '''
+
+    _time_names = ["Time"]
+    _int_names = ["No"]
+    _category_names = ["WindDirection"]
+    # Otherwise, stored as float!
+
+    _time_dtype = "datetime64[s]"
+    _int_dtype = int64
+    _category_dtype = int8
+    _float_dtype = "float64"
+
+    _default_categories = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                           "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+
+    def __init__(self, data_names: list, columns: dict, categories=None):
+        self.data_names = list(data_names)
+        self._columns = columns
+
+        if categories is None:
+            categories = {name: self._default_categories.copy() for name in self.data_names if name in self._category_names}
+        self._categories = categories
+
+        sizes = set(column.shape[0] for column in self._columns.values())
+        assert len(sizes) <= 1, "all columns must have the same length"
+
+    @classmethod
+    def allocate(cls, data_names: list, size=0):
+        columns = {}
+        for name in data_names:
+            columns[name] = full(size, cls._missing_value(name), dtype=cls._column_dtype(name))
+        return cls(data_names, columns)
+
+    @classmethod
+    def from_objects(cls, objects: list, data_names: list):
+        # objects: weather_object-like elements (accessible via obj[data_name])
+        ret_columns = cls.allocate(data_names, size=len(objects))
+
+        for name in data_names:
+            values = [obj[name] for obj in objects]
+            ret_columns.set_values(name, values)
+
+        return ret_columns
+
+    @classmethod
+    def concatenate(cls, column_list: list):
+        assert len(column_list) > 0, "at least one column-object must be given"
+
+        data_names = column_list[0].data_names
+        for tmp_columns in column_list:
+            assert tmp_columns.data_names == data_names, "all column-objects must share the same data-names"
+
+        categories = {name: [] for name in column_list[0]._categories}
+        columns = {}
+        for name in data_names:
+            if name in categories:
+                columns[name] = concatenate([c._remapped_codes(name, categories[name]) for c in column_list])
+            else:
+                columns[name] = concatenate([c._columns[name] for c in column_list])
+
+        return cls(data_names, columns, categories=categories)
+
+
+    ### ---- Public Methods ----- ###
+
+    def size(self):
+        if len(self._columns) == 0: return 0
+        return next(iter(self._columns.values())).shape[0]
+
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns.values())
+
+    def column(self, name: str):
+        assert name in self._columns, "keyword must be a valid data-name-entry"
+        return self._columns[name]
+
+    def categories(self, name: str):
+        return self._categories[name]
+
+    def time_as_int(self, time_key="Time"):
+        # seconds since epoch, zero-copy view of the time column
+        return self._columns[time_key].view(int64)
+
+    def missing_mask(self, name: str):
+        column = self.column(name)
+        if name in self._time_names: return isnat(column)
+        if name in self._int_names or name in self._category_names: return column < 0
+        return isnan(column)
+
+    def set_column(self, name: str, column):
+        assert column.shape[0] == self.size(), "column must have the same length as the other columns"
+        self._columns[name] = column.astype(self._column_dtype(name), copy=False)
+
+    def set_values(self, name: str, values: list):
+        # values: python values (None for missing) -> typed column
+        if name in self._time_names:
+            converted = array([self._missing_value(name) if v is None else v for v in values], dtype=self._time_dtype)
+        elif name in self._category_names:
+            converted = array([self._category_code(name, v) for v in values], dtype=self._category_dtype)
+        elif name in self._int_names:
+            converted = array([-1 if v is None else v for v in values], dtype=self._int_dtype)
+        else:
+            converted = array([float("nan") if v is None else v for v in values], dtype=self._float_dtype)
+
+        self._columns[name] = converted.reshape(len(values))
+
+    def take(self, indizes):
+        columns = {name: column[indizes] for name, column in self._columns.items()}
+        return weather_columns(self.data_names, columns, categories=self._copy_categories())
+
+    def slice(self, start: int, stop: int):
+        # returns views (no copy) of the underlying columns
+        columns = {name: column[start:stop] for name, column in self._columns.items()}
+        return weather_columns(self.data_names, columns, categories=self._categories)
+
+    def get_sort_order(self, remove_duplicates=True, duplicate_policy="first", time_key="Time"):
+        # sorts and deduplicates on the int64 time column only (no python comparisons)
+        # rows without time (NaT, the smallest int64) get dropped, they have no place on the time axis
+        times = self.time_as_int(time_key)
+        order = argsort(times, kind="stable") # stable: for equal times, the first loaded element comes first
+        order = order[~self.missing_mask(time_key)[order]]
+
+        if remove_duplicates:
+            order = order[self.get_duplicate_mask(order, duplicate_policy, time_key=time_key)]
+        return order
+
+    def get_duplicate_mask(self, order, duplicate_policy="first", time_key="Time"):
+        # elements of "order" (time-sorted indizes) to keep according to duplicate_policy
+        non_null_counts = None
+        if duplicate_policy == "most_complete":
+            non_null_counts = self.get_non_null_counts()[order]
+        return get_duplicate_mask(self.time_as_int(time_key)[order], policy=duplicate_policy, non_null_counts=non_null_counts)
+
+    def get_non_null_counts(self):
+        ret_counts = zeros(self.size(), dtype=int64)
+        for name in self.data_names:
+            ret_counts += ~self.missing_mask(name)
+        return ret_counts
+
+    def get_value(self, index: int, name: str):
+        value = self.column(name)[index]
+
+        if name in self._time_names:
+            if isnat(value): return None
+            return value.astype(datetime)
+        if name in self._category_names:
+            if value < 0: return None
+            return self._categories[name][value]
+        if name in self._int_names:
+            if value < 0: return None
+            return int(value)
+
+        if isnan(value): return None
+        return float(value)
+
+    def get_object_column(self, name: str, start=0, stop=None):
+        # python representation of one column (as in weather_object: None for missing values)
+        column = self.column(name)[start:stop]
+
+        if name in self._category_names:
+            lookup = array(self._categories[name] + [None], dtype=object) # code -1 indexes the trailing None
+            return lookup[column]
+
+        ret_column = column.astype(object)
+        if name in self._time_names:
+            ret_column[isnat(column)] = None
+        elif name in self._int_names:
+            ret_column[column < 0] = None
+        else:
+            ret_column[isnan(column)] = None
+        return ret_column
+
+    def get_rows(self, names: list, start=0, stop=None):
+        # 2d-array with one row per measurement, shaped like "array(list_of_rows)" would be
+        if stop is None: stop = self.size()
+        length = max(stop - start, 0)
+
+        is_numeric = all(not name in self._time_names + self._category_names for name in names)
+        if is_numeric and length > 0:
+            rows = self.slice(start, stop) # only touches the requested rows (e.g. of memory-mapped columns)
+            numeric_columns = [rows.column(name) for name in names]
+            has_missing = any(rows.missing_mask(name).any() for name in names)
+            if not has_missing:
+                return stack(numeric_columns, axis=1)
+
+        ret_array = empty((length, len(names)), dtype=object)
+        for i, name in enumerate(names):
+            ret_array[:, i] = self.get_object_column(name, start, stop)
+        return ret_array
+
+    def get_arrays(self, names: list, start=0, stop=None):
+        '''
+        Read-only views of the stored columns (no copy, no conversion) as weather_arrays: times as datetime64 (NaT),
+        measurements as float64 (NaN), integers as int64 and categories as int8-codes (both -1 for missing)
+        together with the category names of the codes.
+        '''
+        ret_arrays = {}
+        for name in names:
+            column = self.column(name)[start:stop] # own flags -> the stored column stays writeable
+            column.flags.writeable = False
+            ret_arrays[name] = column
+        categories = {name: tuple(self._categories[name]) for name in names if name in self._category_names}
+        return weather_arrays(ret_arrays, categories)
+
+
+    ### ---- Helper Methods ----- ###
+
+    @classmethod
+    def _column_dtype(cls, name):
+        if name in cls._time_names: return cls._time_dtype
+        if name in cls._category_names: return cls._category_dtype
+        if name in cls._int_names: return cls._int_dtype
+        return cls._float_dtype
+
+    @classmethod
+    def _missing_value(cls, name):
+        if name in cls._time_names: return "NaT"
+        if name in cls._int_names or name in cls._category_names: return -1
+        return float("nan")
+
+    def _category_code(self, name, value):
+        if value is None: return -1
+        tmp_categories = self._categories[name]
+        if not value in tmp_categories:
+            tmp_categories.append(value)
+        return tmp_categories.index(value)
+
+    def _remapped_codes(self, name, target_categories: list):
+        # translates own codes into codes of "target_categories" (extends it if necessary)
+        for category in self._categories[name]:
+            if not category in target_categories:
+                target_categories.append(category)
+
+        lookup = array([target_categories.index(c) for c in self._categories[name]] + [-1], dtype=self._category_dtype)
+        return lookup[self._columns[name]]
+
+    def _copy_categories(self):
+        return {name: categories.copy() for name, categories in self._categories.items()}
+
+    def __len__(self):
+        return self.size()
+
+
+
+class weather_row(object):
+    '''
+    Read-only view of one measurement inside a weather_columns-object, behaves like a weather_object.
+    '''
+
+    def __init__(self, columns: weather_columns, index: int):
+        self._columns = columns
+        self._index = index
+        self._data_names = columns.data_names
+
+    def __getitem__(self, key):
+        assert key in self._data_names, "keyword must be a valid data-name-entry"
+        return self._columns.get_value(self._index, key)
+
+    def __str__(self):
+        return str({name: self.__getitem__(name) for name in self._data_names})
+
+    def __repr__(self):
+        return self.__str__()
+
+
+
+class weather_arrays(dict):
+    '''
+    Typed arrays of weather_columns.get_arrays (name -> array) and the category names of their categorical
+    columns at the time of the query (code i -> categories[name][i], -1 for missing).
+    '''
+
+    def __init__(self, arrays: dict, categories: dict):
+        super(weather_arrays, self).__init__(arrays)
+        self.categories = categories
+
+    def get_values(self, name: str):
+        # missing values as NaN (integers as float64) or None (categories as their names), e.g. for plotting
+        values = self[name]
+        if name in self.categories:
+            return array(list(self.categories[name]) + [None], dtype=object)[values] # code -1 indexes the trailing None
+        if values.dtype.kind == "i":
+            return where(values < 0, nan, values.astype(float))
+        return values
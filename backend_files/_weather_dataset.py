@@ -0,0 +1,130 @@
+from os import makedirs, replace, stat
+from os.path import isfile
+from hashlib import sha1
+import json
+
+from numpy import memmap, fromfile, zeros, searchsorted, maximum, minimum, where, flatnonzero, dtype as np_dtype
+
+from backend_files._weather_columns import weather_columns
+
+
+_dataset_version = 1
+_header_name = "header.json"
+_index_name = "Time.idx"
+_column_ending = ".bin"
+_index_step = 4096 # every n-th time is stored in the (small) time-index
+
+
+def save_dataset(columns: weather_columns, directory: str, time_key="Time"):
+    '''
+    Writes the (time-sorted) columns as a dataset-folder: one raw fixed-width file per data-name,
+    a coarse index of every n-th time and a header with names, dtypes and categories.
+    The header gets written last, a folder without header is not a (complete) dataset.
+    Returns the id of the dataset (hash of the header).
+    '''
+
+    if not directory.endswith("/"): directory += "/"
+    makedirs(directory, exist_ok=True)
+
+    column_dtypes = {}
+    for name in columns.data_names:
+        column = columns.column(name)
+        column_dtypes[name] = column.dtype.str # with byte-order, e.g. "<f8"
+        _write_array(column, directory + name + _column_ending)
+
+    times = columns.column(time_key)
+    _write_array(times[::_index_step], directory + _index_name)
+
+    header = {"version": _dataset_version,
+              "size": columns.size(),
+              "data_names": columns.data_names,
+              "dtypes": column_dtypes,
+              "categories": {name: columns.categories(name) for name in columns.data_names if name in weather_columns._category_names},
+              "time_key": time_key,
+              "index_step": _index_step}
+    header["id"] = sha1(json.dumps(header).encode("utf-8") + times[-1:].tobytes()).hexdigest()
+
+    with open(directory + _header_name + ".tmp", "w", encoding="utf-8") as header_file:
+        json.dump(header, header_file, indent=1)
+    replace(directory + _header_name + ".tmp", directory + _header_name)
+    return header["id"]
+
+def open_dataset(directory: str):
+    '''
+    Opens a dataset-folder (see save_dataset) without reading it: every column is a read-only
+    numpy.memmap, so only the pages of the accessed rows get loaded from the disk.
+
+    Returns
+    -------
+    (weather_columns, weather_time_index, dict)
+        The memory-mapped columns, the time-index for range-queries and the header of the dataset.
+    '''
+
+    if not directory.endswith("/"): directory += "/"
+    if not isfile(directory + _header_name):
+        raise FileNotFoundError(f"\"{directory}\" is not a dataset (no \"{_header_name}\" found)")
+
+    with open(directory + _header_name, encoding="utf-8") as header_file:
+        header = json.load(header_file)
+    if header["version"] != _dataset_version:
+        raise ValueError(f"unsupported dataset-version {header['version']} (expected {_dataset_version})")
+
+    columns = {name: _map_array(directory + name + _column_ending, header["dtypes"][name], header["size"])
+               for name in header["data_names"]}
+    categories = {name: list(values) for name, values in header["categories"].items()}
+    ret_columns = weather_columns(header["data_names"], columns, categories=categories)
+
+    index_times = fromfile(directory + _index_name, dtype=header["dtypes"][header["time_key"]])
+    time_index = weather_time_index(ret_columns.column(header["time_key"]), index_times, header["index_step"])
+
+    return ret_columns, time_index, header
+
+def is_dataset(directory: str):
+    if not directory.endswith("/"): directory += "/"
+    return isfile(directory + _header_name)
+
+
+
+class weather_time_index(object):
+    '''
+    Two-level binary search on a (memory-mapped) time column: the small in-memory index of every
+    n-th time narrows the search down to one block, so only one block of the column gets read.
+    '''
+
+    def __init__(self, times, index_times, index_step: int):
+        self._times = times
+        self._index_times = index_times
+        self._index_step = index_step
+
+    def searchsorted(self, dates, side="left"):
+        dates = dates.reshape(-1)
+        blocks = searchsorted(self._index_times, dates, side=side) # block i contains the times of [(i-1)*step, i*step)
+        lows = maximum(blocks - 1, 0) * self._index_step
+        highs = minimum(blocks * self._index_step, self._times.shape[0])
+
+        # binary search of all dates at once, every step only reads one time per date (log2(index_step) steps)
+        active = flatnonzero(lows < highs)
+        while active.shape[0] > 0:
+            middles = (lows[active] + highs[active]) // 2
+            middle_times = self._times[middles]
+            go_right = middle_times <= dates[active] if side == "right" else middle_times < dates[active]
+            lows[active] = where(go_right, middles + 1, lows[active])
+            highs[active] = where(go_right, highs[active], middles)
+            active = active[lows[active] < highs[active]]
+        return lows
+
+
+
+### helper functions ###
+
+def _write_array(values, file_path: str):
+    values.tofile(file_path + ".tmp")
+    replace(file_path + ".tmp", file_path)
+
+def _map_array(file_path: str, dtype: str, size: int):
+    expected_size = size * np_dtype(dtype).itemsize
+    if stat(file_path).st_size != expected_size:
+        raise ValueError(f"size of \"{file_path}\" does not match the dataset-header")
+
+    if size == 0: return zeros(0, dtype=dtype) # empty files can not be mapped
+    return memmap(file_path, dtype=dtype, mode="r", shape=(size,))
@@ -0,0 +1,76 @@
+from numpy import array, isfinite, isnat, zeros, packbits, polyfit, vander
+
+from backend_files._weather_profiler import span
+
+
+_fit_time_dtype = "datetime64[us]"
+_microseconds_per_day = 86400 * 10**6
+
+
+def get_day_offsets(times, starting_time=None):
+    # float64 days since starting_time (default: first valid time) for the whole time-column at once
+    times = _as_datetime64(times)
+    if starting_time is None:
+        valid_times = times[~isnat(times)]
+        starting_time = valid_times[0] if valid_times.shape[0] > 0 else times[0]
+
+    starting_time = _as_datetime64([starting_time])[0]
+    return (times - starting_time).astype(float) / _microseconds_per_day # NaT -> nan
+
+def get_mask_groups(valid):
+    # lists of the columns of the 2d boolean array valid with equal masks (equal NaN-positions)
+    packed_masks = packbits(valid, axis=0) # columns with equal NaN-positions have equal bytes
+    mask_columns = {}
+    for column in range(valid.shape[1]):
+        mask_columns.setdefault(packed_masks[:, column].tobytes(), []).append(column)
+    return list(mask_columns.values())
+
+def do_polyval(times: list, data: list, degree=1): # übergebe auf erster Achse die Zeitobjekte, auf der zweiten die zu fittenden Daten
+    return do_polyval_batch(times, array(data).reshape(-1, 1), degree=degree)[0]
+
+def do_polyval_batch(times: list, data, degree=1):
+    '''
+    Least-squares polynomials for several series over the same time axis (data: one column per series).
+    The day offsets get computed once and series with the same missing values share one solve.
+
+    Returns
+    -------
+    list
+        (times without the NaN-values, evaluated polynomial) for every column of data.
+    '''
+
+    times = array(times)
+    values = array(data, dtype=float) # None -> nan
+    if values.ndim == 1: values = values.reshape(-1, 1)
+    if times.shape[0] == 0:
+        return [(times, zeros(0)) for i in range(values.shape[1])]
+
+    with span("fit", rows=values.size):
+        day_offsets = get_day_offsets(times)
+        valid = isfinite(values) & isfinite(day_offsets)[:, None]
+
+        ret_fits = [None] * values.shape[1]
+        for columns in get_mask_groups(valid):
+            mask = valid[:, columns[0]]
+            fit_times = day_offsets[mask]
+
+            if fit_times.shape[0] == 0:
+                fit_values = zeros((0, len(columns)))
+            else:
+                fit_constants = polyfit(fit_times, values[mask][:, columns], degree) # one column of constants per series
+                fit_values = vander(fit_times, degree + 1) @ fit_constants
+
+            for i, column in enumerate(columns):
+                ret_fits[column] = (times[mask], fit_values[:, i])
+
+    return ret_fits
+
+
+
+### helper functions ###
+
+def _as_datetime64(times):
+    times = array(times)
+    if times.dtype == object: # e.g. datetime-objects from subscript_data
+        times = array(times.tolist(), dtype=_fit_time_dtype) # None -> NaT
+    return times.astype(_fit_time_dtype)
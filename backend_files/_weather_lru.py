@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from threading import Lock
+import sys
+
+from numpy import ndarray
+
+
+_size_samples = 100 # elements of object-arrays measured for the size estimate
+
+class lru_cache(object):
+    '''
+    Bounded cache of computed results: the least recently used entries get evicted as soon as more than
+    "max_bytes" (estimated by get_size) or more than "max_entries" entries are stored.
+    Values larger than max_bytes are not stored at all. Safe to use from several threads.
+    '''
+
+    def __init__(self, max_bytes=64 * 2**20, max_entries=1024):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict() # key -> (value, size), most recently used at the end
+        self._bytes = 0
+        self._hits, self._misses, self._evictions = 0, 0, 0
+        self._lock = Lock()
+
+    ### ---- Public Methods ----- ###
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        if size is None: size = get_size(value)
+        with self._lock:
+            if key in self._entries: self._remove(key)
+            if size > self.max_bytes: return False
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "evictions": self._evictions,
+                    "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    ### helper functions ###
+
+    def _remove(self, key):
+        value, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+
+def get_size(value):
+    # estimated memory of a cached value in bytes (numpy-arrays, bytes, strings and containers of them)
+    if isinstance(value, ndarray):
+        if value.dtype != object or value.size == 0: return value.nbytes
+        sample = value.flat[::max(value.size // _size_samples, 1)] # measuring every element would take as long as creating them
+        return value.nbytes + value.size * sum(sys.getsizeof(element) for element in sample) // sample.size
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(get_size(element) for element in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(get_size(key) + get_size(element) for key, element in value.items())
+    return sys.getsizeof(value)
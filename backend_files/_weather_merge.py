@@ -0,0 +1,63 @@
+from numpy import arange, empty, zeros, searchsorted, flatnonzero, cumsum, maximum
+
+
+duplicate_policies = ["first", # keep the first loaded row (file order)
+                      "last", # keep the last loaded row
+                      "most_complete"] # keep the row with the most non-missing values (first one on ties)
+
+
+def get_merge_order(old_times, new_times):
+    '''
+    Merges two sorted time-arrays without sorting again (O(n+m) besides two binary searches).
+    Returns the permutation for concatenate([old, new]) that yields the sorted result,
+    on equal times the old element comes first.
+    '''
+
+    n, m = old_times.shape[0], new_times.shape[0]
+
+    old_positions = arange(n) + searchsorted(new_times, old_times, side="left")
+    new_positions = arange(m) + searchsorted(old_times, new_times, side="right")
+
+    ret_order = empty(n + m, dtype=old_positions.dtype)
+    ret_order[old_positions] = arange(n)
+    ret_order[new_positions] = arange(n, n + m)
+    return ret_order
+
+def get_duplicate_mask(sorted_times, policy="first", non_null_counts=None):
+    '''
+    Selects one element of every group of equal (sorted) times, all comparisons on the int64 times.
+    "non_null_counts" (in the same order as sorted_times) is needed for the policy "most_complete".
+    '''
+    assert policy in duplicate_policies, f"policy must be one of {duplicate_policies}"
+
+    group_starts = _get_group_starts(sorted_times)
+    if policy == "first" or sorted_times.shape[0] == 0:
+        return group_starts
+
+    if policy == "last":
+        keep = empty(sorted_times.shape[0], dtype=bool)
+        keep[:-1] = group_starts[1:]
+        keep[-1] = True
+        return keep
+
+    assert not non_null_counts is None, "policy \"most_complete\" needs the non-null counts"
+    group_ids = cumsum(group_starts) - 1
+    group_maxima = maximum.reduceat(non_null_counts, flatnonzero(group_starts))
+
+    candidates = flatnonzero(non_null_counts == group_maxima[group_ids])
+    keep = zeros(sorted_times.shape[0], dtype=bool)
+    keep[candidates[_get_group_starts(group_ids[candidates])]] = True # first candidate of every group
+    return keep
+
+
+
+### helper functions ###
+
+def _get_group_starts(sorted_values):
+    # True for the first element of every group of equal (sorted) values
+    starts = empty(sorted_values.shape[0], dtype=bool)
+    if starts.shape[0] == 0: return starts
+
+    starts[0] = True
+    starts[1:] = sorted_values[1:] != sorted_values[:-1]
+    return starts
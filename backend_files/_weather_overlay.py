@@ -0,0 +1,167 @@
+from numpy import arange, empty, zeros, ones, concatenate, searchsorted, cumsum, repeat, isin, union1d, int64
+
+from backend_files._weather_columns import weather_columns
+from backend_files._weather_merge import get_merge_order
+
+
+class weather_overlay(object):
+    '''
+    Time-sorted view of a memory-mapped dataset with a small in-memory set of rows merged on top of it
+    (e.g. export files loaded on top of an archive). The mapped columns never get copied into memory:
+    merges only touch the new rows and the dataset rows with equal times, queries only build the requested range.
+
+    Read-only part of the weather_columns-interface (size, column, slice, get_rows, get_arrays, ...),
+    dataset rows replaced by duplicates are stored as sorted indizes.
+    '''
+
+    def __init__(self, base: weather_columns, time_index, time_key="Time"):
+        self.data_names = base.data_names
+        self._base = base
+        self._time_index = time_index # weather_time_index of the dataset
+        self._time_key = time_key
+
+        self._rows = weather_columns.allocate(base.data_names) # rows merged on top, sorted by time
+        self._positions = zeros(0, dtype=int64) # position of every row of self._rows inside of the view
+        self._dropped = zeros(0, dtype=int64) # sorted indizes of the dataset rows removed as duplicates
+
+
+    ### ---- Public Methods ----- ###
+
+    def size(self):
+        return self._base.size() - self._dropped.shape[0] + self._rows.size()
+
+    def nbytes(self):
+        # in-memory part only (the dataset stays in the page cache of the operating system)
+        return self._rows.nbytes() + self._positions.nbytes + self._dropped.nbytes
+
+    def row_count(self):
+        # number of rows merged on top of the dataset
+        return self._rows.size()
+
+    def insert(self, new_data: weather_columns, remove_duplicates=True, duplicate_policy="first"):
+        '''
+        Merges time-sorted (and deduplicated) rows on top. Duplicates get resolved like in one merged
+        weather_columns-object: on equal times, the dataset comes first, then the rows in the order of insertion.
+        Returns the order of the kept rows of concatenate([rows before, new_data]) (e.g. for their source-ids).
+        '''
+        old_times, new_times = self._rows.time_as_int(self._time_key), new_data.time_as_int(self._time_key)
+
+        base_indizes = zeros(0, dtype=int64)
+        if remove_duplicates: base_indizes = self._get_base_matches(new_data.column(self._time_key))
+        base_rows = self._base.take(base_indizes) # only the dataset rows with a time of new_data get read
+
+        current_order = get_merge_order(base_rows.time_as_int(self._time_key), old_times) # dataset first on equal times
+        combined = weather_columns.concatenate([base_rows, self._rows, new_data])
+        order = concatenate([current_order, arange(current_order.shape[0], combined.size())])
+        order = order[get_merge_order(combined.time_as_int(self._time_key)[order[:current_order.shape[0]]], new_times)]
+        if remove_duplicates:
+            order = order[combined.get_duplicate_mask(order, duplicate_policy, time_key=self._time_key)]
+
+        kept_base = order[order < base_rows.size()]
+        self._dropped = union1d(self._dropped, base_indizes[~isin(arange(base_rows.size()), kept_base)])
+
+        ret_order = order[order >= base_rows.size()] - base_rows.size()
+        self._rows = weather_columns.concatenate([self._rows, new_data]).take(ret_order)
+        self._update_positions()
+        return ret_order
+
+    def keep_rows(self, keep):
+        # removes the rows merged on top where keep (boolean mask) is False, replaced dataset rows stay removed
+        self._rows = self._rows.take(keep)
+        self._update_positions()
+
+    def searchsorted(self, dates, side="left"):
+        # like numpy.searchsorted on the time column of the view, only reads one block of the dataset per date
+        base_counts = self._time_index.searchsorted(dates, side=side)
+        base_counts -= searchsorted(self._dropped, base_counts, side="left")
+        return base_counts + searchsorted(self._rows.column(self._time_key), dates, side=side)
+
+    def slice(self, start: int, stop: int, names=None):
+        '''
+        Rows start to stop of the view as weather_columns (only "names" if given). Without rows merged on top
+        and without removed duplicates inside of the range, these are views of the memory-mapped columns.
+        '''
+        if names is None: names = self.data_names
+        start, stop, step = slice(start, stop).indices(self.size())
+        stop = max(start, stop)
+
+        first_row, last_row = searchsorted(self._positions, [start, stop], side="left")
+        base_start, base_stop = self._get_base_index(start - first_row), self._get_base_index(stop - last_row)
+        base_part = _select(self._base, names).slice(base_start, base_stop)
+
+        dropped = self._dropped[searchsorted(self._dropped, base_start):searchsorted(self._dropped, base_stop)]
+        if dropped.shape[0] > 0:
+            keep = ones(base_part.size(), dtype=bool)
+            keep[dropped - base_start] = False
+            base_part = base_part.take(keep)
+        if first_row == last_row: return base_part
+
+        rows_part = _select(self._rows, names).slice(first_row, last_row)
+        row_targets = self._positions[first_row:last_row] - start
+        is_row = zeros(stop - start, dtype=bool)
+        is_row[row_targets] = True
+
+        order = empty(stop - start, dtype=int64)
+        order[~is_row] = arange(base_part.size())
+        order[row_targets] = arange(base_part.size(), stop - start)
+        return weather_columns.concatenate([base_part, rows_part]).take(order)
+
+    def column(self, name: str):
+        assert name in self.data_names, "keyword must be a valid data-name-entry"
+        return self.slice(0, self.size(), names=[name]).column(name)
+
+    def categories(self, name: str):
+        # the codes of every slice refer to a prefix of these categories
+        base_categories = self._base.categories(name)
+        return base_categories + [category for category in self._rows.categories(name) if not category in base_categories]
+
+    def time_as_int(self, time_key="Time"):
+        return self.column(time_key).view(int64)
+
+    def missing_mask(self, name: str):
+        return self.slice(0, self.size(), names=[name]).missing_mask(name)
+
+    def get_value(self, index: int, name: str):
+        return self.slice(index, index + 1, names=[name]).get_value(0, name)
+
+    def get_rows(self, names: list, start=0, stop=None):
+        if stop is None: stop = self.size()
+        return self.slice(start, stop, names=names).get_rows(names)
+
+    def get_arrays(self, names: list, start=0, stop=None):
+        if stop is None: stop = self.size()
+        return self.slice(start, stop, names=names).get_arrays(names)
+
+
+    ### ---- Helper Methods ----- ###
+
+    def _get_base_matches(self, times):
+        # indizes of the (not removed) dataset rows with one of the given (sorted, unique) times
+        starts = self._time_index.searchsorted(times, side="left")
+        lengths = self._time_index.searchsorted(times, side="right") - starts
+        offsets = cumsum(lengths) - lengths
+        indizes = arange(lengths.sum()) - repeat(offsets, lengths) + repeat(starts, lengths)
+        return indizes[~isin(indizes, self._dropped)]
+
+    def _get_base_index(self, kept_count):
+        # dataset index of the kept_count-th not removed dataset row (one past the end if all are before)
+        removed_before = self._dropped - arange(self._dropped.shape[0]) # kept rows in front of every removed one
+        return int(kept_count + searchsorted(removed_before, kept_count, side="right"))
+
+    def _update_positions(self):
+        # every row follows the dataset rows with smaller or equal time
+        base_counts = self._time_index.searchsorted(self._rows.column(self._time_key), side="right")
+        base_counts -= searchsorted(self._dropped, base_counts, side="left")
+        self._positions = arange(self._rows.size()) + base_counts
+
+    def __len__(self):
+        return self.size()
+
+
+
+### helper functions ###
+
+def _select(columns: weather_columns, names: list):
+    # the given columns of a weather_columns-object without copying them
+    categories = {name: columns.categories(name) for name in names if name in weather_columns._category_names}
+    return weather_columns(names, {name: columns.column(name) for name in names}, categories=categories)
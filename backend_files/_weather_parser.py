@@ -0,0 +1,224 @@
+from datetime import datetime
+
+from numpy import array, where, unique, zeros, full, all as np_all, int64, uint8
+
+from backend_files._weather_columns import weather_columns
+
+
+possible_time_formats = ["%d-%m-%Y %H:%M",
+                         "%d.%m.%Y %H:%M:%S"] # depending on the version, there are two different possible time formats!
+
+_file_encoding = "latin-1" # EasyWeather exports are not utf-8 (e.g. "°C" in the header)
+_empty_lines = ["", "\x00", " "]
+_directive_widths = {"d": 2, "m": 2, "Y": 4, "H": 2, "M": 2, "S": 2}
+
+
+def read_export_file(file_path: str, data_names: list, separator=";", no_value_key="---", time_format=None, chunk_size=10000,
+                     chunk_callback=None):
+    '''
+    Reads a whole EasyWeather export into a weather_columns-object. The lines get parsed in chunks (see iter_export_file),
+    so only the lines of one chunk are in memory next to the typed columns.
+    chunk_callback(parsed_rows) gets called after every chunk, e.g. for progress and cancellation.
+
+    Returns
+    -------
+    (weather_columns, str)
+        The parsed columns (still in the units of the file) and the header line of the file.
+    '''
+
+    chunks = []
+    for one_chunk, first_line in iter_export_file(file_path, data_names, separator=separator, no_value_key=no_value_key,
+                                                  time_format=time_format, chunk_size=chunk_size):
+        chunks.append(one_chunk)
+        if not chunk_callback is None: chunk_callback(sum(chunk.size() for chunk in chunks))
+
+    if len(chunks) == 0: # no measurements, only the header line (if any)
+        with open(file_path, encoding=_file_encoding) as file:
+            return weather_columns.allocate(data_names), file.readline().rstrip()
+
+    ret_columns = weather_columns.concatenate(chunks)
+    for name in data_names:
+        if name in weather_columns._time_names and ret_columns.missing_mask(name).all():
+            raise ValueError(f"\"{file_path}\" can not be read: every \"{name}\"-value is missing (\"{no_value_key}\")")
+    return ret_columns, first_line
+
+def iter_export_file(file_path: str, data_names: list, separator=";", no_value_key="---", time_format=None, chunk_size=50000):
+    '''
+    Same as read_export_file, but yields (weather_columns, header line) for every "chunk_size" lines,
+    so only one chunk of the file is in memory at once. The time-format gets detected on the first chunk.
+    '''
+
+    with open(file_path, encoding=_file_encoding) as file:
+        first_line = file.readline().rstrip()
+
+        lines = []
+        for line in file:
+            line = line.rstrip()
+            if line in _empty_lines: continue
+
+            lines.append(line)
+            if len(lines) >= chunk_size:
+                chunk = _parse_file_lines(file_path, lines, data_names, separator, no_value_key, time_format)
+                time_format = _get_detected_format(lines, data_names, separator, no_value_key, time_format)
+                lines = []
+                yield chunk, first_line
+
+        if len(lines) > 0:
+            yield _parse_file_lines(file_path, lines, data_names, separator, no_value_key, time_format), first_line
+
+
+def parse_lines(lines: list, data_names: list, separator=";", no_value_key="---", time_format=None):
+    ret_columns = weather_columns.allocate(data_names, size=len(lines))
+    if len(lines) == 0: return ret_columns
+
+    table = _split_lines(lines, len(data_names), separator, no_value_key)
+
+    for index, name in enumerate(data_names):
+        strings = table[:, index]
+        missing = strings == no_value_key
+
+        if name in weather_columns._time_names:
+            if missing.all(): continue # allocated as NaT, nothing to detect the format from
+            tmp_format = get_valid_time_format(_get_time_formats(time_format), strings[~missing][0]) # detect once per file
+            ret_columns.set_column(name, parse_times(strings, tmp_format, missing=missing))
+        elif name in weather_columns._category_names:
+            values, codes = unique(strings, return_inverse=True)
+            lookup = array([-1 if value == no_value_key else ret_columns._category_code(name, str(value)) for value in values],
+                           dtype=weather_columns._category_dtype)
+            ret_columns.set_column(name, lookup[codes.reshape(-1)])
+        elif name in weather_columns._int_names:
+            ret_columns.set_column(name, where(missing, "-1", strings).astype(weather_columns._int_dtype))
+        else:
+            ret_columns.set_column(name, where(missing, "nan", strings).astype(weather_columns._float_dtype))
+
+    return ret_columns
+
+
+def get_valid_time_format(time_formats: list, time_string: str):
+    def is_valid_format(format_str): # returns if given format is valid for given text
+        try: datetime.strptime(time_string, format_str)
+        except ValueError: return False
+        return True
+
+    for time_format in time_formats:
+        if is_valid_format(time_format):
+            return time_format
+
+    print("Error: No time-format found to save time-stamps!")
+    raise RuntimeError("Unknown data format, should be for example \"%d.%m.%Y %H:%M:%S\"!")
+
+
+def parse_times(time_strings, time_format: str, missing=None):
+    '''
+    Vectorized version of datetime.strptime for zero-padded numeric formats (all EasyWeather formats).
+    Falls back to strptime for every element if the strings do not fit the fixed-width layout.
+    '''
+
+    time_strings = array(time_strings)
+    if missing is None: missing = zeros(time_strings.shape[0], dtype=bool)
+
+    ret_times = _parse_fixed_width_times(time_strings, time_format, missing)
+    if ret_times is None:
+        ret_times = array([None if m else datetime.strptime(str(s), time_format) for s, m in zip(time_strings, missing)],
+                          dtype=weather_columns._time_dtype)
+
+    return ret_times
+
+
+
+### helper functions ###
+
+def _parse_file_lines(file_path: str, lines: list, data_names: list, separator: str, no_value_key: str, time_format):
+    try:
+        return parse_lines(lines, data_names, separator=separator, no_value_key=no_value_key, time_format=time_format)
+    except ValueError as error:
+        raise ValueError(f"\"{file_path}\" can not be read: {error}") from error
+
+def _get_time_formats(time_format):
+    if time_format is None: return possible_time_formats
+    return [time_format] + possible_time_formats
+
+def _get_detected_format(lines: list, data_names: list, separator: str, no_value_key: str, time_format):
+    # format of the first time-string -> the following chunks do not need to try every possible format
+    time_names = [name for name in data_names if name in weather_columns._time_names]
+    if len(time_names) == 0: return time_format
+
+    time_index = data_names.index(time_names[0])
+    for line in lines:
+        row = line.split(separator)
+        if len(row) > time_index and row[time_index] != no_value_key:
+            return get_valid_time_format(_get_time_formats(time_format), row[time_index])
+    return time_format
+
+def _split_lines(lines: list, field_count: int, separator: str, no_value_key: str):
+    rows = [line.split(separator) for line in lines]
+
+    for row in rows:
+        if len(row) < field_count: # in this case, "windlevel" didn't get recorded!
+            row.extend([no_value_key] * (field_count - len(row)))
+        elif len(row) > field_count:
+            del row[field_count:]
+
+    return array(rows)
+
+def _get_format_layout(time_format: str):
+    # returns [(directive, position, width)] and [(position, literal_char)] for a fixed-width format, None otherwise
+    fields, literals = [], []
+    position, i = 0, 0
+
+    while i < len(time_format):
+        if time_format[i] == "%":
+            if i + 1 >= len(time_format) or not time_format[i+1] in _directive_widths:
+                return None
+            width = _directive_widths[time_format[i+1]]
+            fields.append((time_format[i+1], position, width))
+            position += width
+            i += 2
+        else:
+            literals.append((position, ord(time_format[i])))
+            position += 1
+            i += 1
+
+    return fields, literals, position
+
+def _parse_fixed_width_times(time_strings, time_format: str, missing):
+    layout = _get_format_layout(time_format)
+    if layout is None: return None
+    fields, literals, length = layout
+
+    valid_strings = time_strings[~missing]
+    try: encoded = valid_strings.astype("S%i" % (length + 1)) # one more char to detect too long strings
+    except UnicodeEncodeError: return None
+
+    chars = encoded.view(uint8).reshape(-1, length + 1)
+    if not np_all(chars[:, length] == 0): return None # too short strings get caught by the digit-checks
+    for position, literal in literals:
+        if not np_all(chars[:, position] == literal): return None
+
+    values = {}
+    for directive, position, width in fields:
+        digits = chars[:, position:position+width].astype(int64) - ord("0")
+        if not np_all((digits >= 0) & (digits <= 9)): return None
+
+        tmp_value = zeros(digits.shape[0], dtype=int64)
+        for i in range(width):
+            tmp_value = tmp_value * 10 + digits[:, i]
+        values[directive] = tmp_value
+
+    if not all(directive in values for directive in ["d", "m", "Y"]): return None
+    for directive in ["H", "M", "S"]:
+        if not directive in values: values[directive] = zeros(chars.shape[0], dtype=int64)
+
+    months = (values["Y"] - 1970).astype("datetime64[Y]") + (values["m"] - 1).astype("timedelta64[M]")
+    days = months.astype("datetime64[D]") + (values["d"] - 1).astype("timedelta64[D]")
+    seconds = values["H"] * 3600 + values["M"] * 60 + values["S"]
+
+    # same checks as strptime (invalid dates/times would silently roll over otherwise)
+    if not (np_all((values["m"] >= 1) & (values["m"] <= 12)) and np_all(values["d"] >= 1)
+            and np_all(days.astype("datetime64[M]") == months)
+            and np_all(values["H"] <= 23) and np_all(values["M"] <= 59) and np_all(values["S"] <= 61)):
+        raise ValueError(f"time data does not match format '{time_format}'")
+
+    ret_times = full(time_strings.shape[0], "NaT", dtype=weather_columns._time_dtype)
+    ret_times[~missing] = days.astype(weather_columns._time_dtype) + seconds.astype("timedelta64[s]")
+    return ret_times
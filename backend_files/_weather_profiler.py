@@ -0,0 +1,150 @@
+from time import perf_counter
+from threading import local, get_ident
+from collections import deque
+from cProfile import Profile
+import json
+
+
+_max_records = 100000 # oldest spans get dropped (long sessions)
+
+_enabled = False
+_records = deque(maxlen=_max_records)
+_profile = None # cProfile.Profile while profiling
+_thread_spans = local() # stack of the open spans of every thread (for the parent of a span)
+_start_time = perf_counter()
+
+
+def span(name: str, rows=None, bytes_read=None):
+    '''
+    Named time measurement of a stage, used as "with span("parse", bytes_read=size) as current: ... current.set(rows=n)".
+    Disabled (default) it returns one shared object that does nothing -> only a function call and a flag check.
+    Enabled it records the duration, rows, read bytes and the enclosing span of the same thread.
+    Spans of worker processes (weather_wrapper with workers) stay in these processes and are not recorded.
+    '''
+    if not _enabled: return _disabled_span
+    return _span(name, rows, bytes_read)
+
+def enable(profile=False):
+    # profile: additionally run cProfile (only for the calling thread, slows down python-code noticeably)
+    global _enabled, _profile
+    _enabled = True
+    if profile and _profile is None:
+        _profile = Profile()
+        _profile.enable()
+
+def disable():
+    global _enabled
+    _enabled = False
+    if not _profile is None: _profile.disable()
+
+def is_enabled():
+    return _enabled
+
+def is_profiling():
+    return not _profile is None
+
+def reset():
+    global _profile, _start_time
+    _records.clear()
+    if not _profile is None:
+        _profile.disable()
+        _profile = Profile() if _enabled else None
+        if _enabled: _profile.enable()
+    _start_time = perf_counter()
+
+def get_records():
+    return list(_records)
+
+def get_summary():
+    '''
+    Recorded spans aggregated by name, sorted by the total duration.
+
+    Returns
+    -------
+    list
+        {"name", "count", "total_seconds", "mean_seconds", "max_seconds", "rows", "bytes_read"} for every name.
+    '''
+    summary = {}
+    for record in get_records():
+        entry = summary.setdefault(record["name"], {"name": record["name"], "count": 0, "total_seconds": 0.0,
+                                                    "max_seconds": 0.0, "rows": 0, "bytes_read": 0})
+        entry["count"] += 1
+        entry["total_seconds"] += record["seconds"]
+        entry["max_seconds"] = max(entry["max_seconds"], record["seconds"])
+        entry["rows"] += record["rows"] or 0
+        entry["bytes_read"] += record["bytes_read"] or 0
+
+    for entry in summary.values():
+        entry["mean_seconds"] = entry["total_seconds"] / entry["count"]
+    return sorted(summary.values(), key=lambda entry: entry["total_seconds"], reverse=True)
+
+def dump_json(file_path: str):
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump({"summary": get_summary(), "spans": get_records()}, file, indent=1)
+
+def dump_profile(file_path: str):
+    # pstats/cProfile-file (e.g. "python -m pstats file" or snakeviz)
+    if _profile is None:
+        raise RuntimeError("no cProfile-data recorded, enable the measurement with profile=True")
+    _profile.create_stats()
+    _profile.dump_stats(file_path)
+    if _enabled: _profile.enable() # create_stats stops the profiler
+
+
+
+class _span(object):
+    __slots__ = ("name", "rows", "bytes_read", "parent", "_start")
+
+    def __init__(self, name: str, rows, bytes_read):
+        self.name = name
+        self.rows = rows
+        self.bytes_read = bytes_read
+        self.parent = None
+
+    def set(self, rows=None, bytes_read=None):
+        if not rows is None: self.rows = int(rows)
+        if not bytes_read is None: self.bytes_read = int(bytes_read)
+
+    def __enter__(self):
+        stack = _get_stack()
+        if len(stack) > 0: self.parent = stack[-1].name
+        stack.append(self)
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        stop = perf_counter()
+        _get_stack().pop()
+        _records.append({"name": self.name,
+                         "start": self._start - _start_time,
+                         "seconds": stop - self._start,
+                         "rows": self.rows,
+                         "bytes_read": self.bytes_read,
+                         "parent": self.parent,
+                         "thread": get_ident(),
+                         "error": None if exception_type is None else exception_type.__name__})
+        return False
+
+
+class _no_span(object):
+    __slots__ = ()
+
+    def set(self, rows=None, bytes_read=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        return False
+
+
+_disabled_span = _no_span()
+
+
+
+### helper functions ###
+
+def _get_stack():
+    if not hasattr(_thread_spans, "stack"): _thread_spans.stack = []
+    return _thread_spans.stack
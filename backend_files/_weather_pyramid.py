@@ -0,0 +1,132 @@
+import json
+from os import replace
+
+from numpy import load, savez, array, empty, zeros, searchsorted, float32
+
+from backend_files._weather_columns import weather_columns
+from backend_files._weather_resample import get_bin_starts, aggregate
+
+
+pyramid_levels = ["1h", "1d", "1w"] # from fine to coarse
+pyramid_statistics = ["min", "mean", "max"]
+
+
+class weather_pyramid(object):
+    '''
+    Pre-aggregated min/mean/max values of every numeric field on several time resolutions,
+    so long time ranges can be plotted without touching every raw measurement.
+    '''
+
+    def __init__(self, levels: dict, keys: list):
+        self._levels = levels # level -> (starting times, {key: {statistic: values}})
+        self.keys = list(keys)
+
+    @classmethod
+    def build(cls, columns: weather_columns, levels=pyramid_levels, time_key="Time"):
+        keys = get_pyramid_keys(columns.data_names, time_key=time_key)
+
+        tmp_levels = {}
+        for level in levels:
+            bin_times = get_bin_starts(columns.column(time_key), level)
+            start_indizes = _get_group_start_indizes(bin_times)
+
+            level_values = {}
+            for key in keys:
+                level_values[key] = {statistic: _aggregate(columns.column(key), start_indizes, statistic)
+                                     for statistic in pyramid_statistics}
+
+            tmp_levels[level] = (bin_times[start_indizes], level_values)
+
+        return cls(tmp_levels, keys)
+
+    @classmethod
+    def load(cls, file_path: str, signature: str):
+        # returns None if the file does not exist or belongs to other data
+        try:
+            with load(file_path, allow_pickle=False) as pyramid_file:
+                meta = json.loads(str(pyramid_file["_meta"]))
+                if meta["signature"] != signature:
+                    return None
+
+                tmp_levels = {}
+                for level in meta["levels"]:
+                    level_values = {key: {statistic: pyramid_file[f"{level}__{key}__{statistic}"] for statistic in pyramid_statistics}
+                                    for key in meta["keys"]}
+                    tmp_levels[level] = (pyramid_file[f"{level}__Time"], level_values)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        return cls(tmp_levels, meta["keys"])
+
+
+    ### ---- Public Methods ----- ###
+
+    def save(self, file_path: str, signature: str):
+        # writes to a temporary file first -> never leaves half written pyramid-files
+        arrays = {"_meta": array(json.dumps({"signature": signature, "levels": list(self._levels), "keys": self.keys}))}
+        for level, (bin_times, level_values) in self._levels.items():
+            arrays[f"{level}__Time"] = bin_times
+            for key in self.keys:
+                for statistic in pyramid_statistics:
+                    arrays[f"{level}__{key}__{statistic}"] = level_values[key][statistic]
+
+        with open(file_path + ".tmp", "wb") as pyramid_file: # file-object: savez does not append another ".npz"
+            savez(pyramid_file, **arrays)
+        replace(file_path + ".tmp", file_path)
+
+    def get_level(self, start_date, end_date, point_count: int):
+        # coarsest level that still contains more than "point_count" values inside of the range
+        for level in reversed(list(self._levels)):
+            start_index, stop_index = self._get_indizes(level, start_date, end_date)
+            if stop_index - start_index > point_count:
+                return level
+        return None
+
+    def size(self, level: str, start_date, end_date):
+        start_index, stop_index = self._get_indizes(level, start_date, end_date)
+        return stop_index - start_index
+
+    def get_values(self, level: str, key: str, start_date, end_date, statistic="mean"):
+        start_index, stop_index = self._get_indizes(level, start_date, end_date)
+        bin_times, level_values = self._levels[level]
+        return bin_times[start_index:stop_index], level_values[key][statistic][start_index:stop_index]
+
+    def get_minmax_values(self, level: str, key: str, start_date, end_date):
+        # minimum and maximum of every interval after each other (like the min/max downsampling of the plots)
+        bin_times, minima = self.get_values(level, key, start_date, end_date, statistic="min")
+        maxima = self.get_values(level, key, start_date, end_date, statistic="max")[1]
+
+        ret_times = empty(2 * bin_times.shape[0], dtype=bin_times.dtype)
+        ret_values = empty(2 * bin_times.shape[0], dtype=float)
+        ret_times[0::2], ret_times[1::2] = bin_times, bin_times
+        ret_values[0::2], ret_values[1::2] = minima, maxima
+        return ret_times, ret_values
+
+
+    ### ---- Helper Methods ----- ###
+
+    def _get_indizes(self, level: str, start_date, end_date):
+        # every interval that overlaps with (start_date, end_date]
+        bin_times = self._levels[level][0]
+        level_start = get_bin_starts(array([start_date], dtype=weather_columns._time_dtype), level)
+        end_date = array([end_date], dtype=weather_columns._time_dtype)
+        return int(searchsorted(bin_times, level_start, side="left")[0]), int(searchsorted(bin_times, end_date, side="right")[0])
+
+
+
+def get_pyramid_keys(data_names: list, time_key="Time"):
+    # every measurement (no time, categories or numbering)
+    return [name for name in data_names if name != time_key and not name in weather_columns._category_names
+            and not name in weather_columns._int_names]
+
+def _aggregate(values, start_indizes, statistic: str):
+    if start_indizes.shape[0] == 0: return zeros(0, dtype=float32)
+    return aggregate(values, start_indizes, statistic).astype(float32) # precise enough for plotting, half the memory
+
+def _get_group_start_indizes(bin_times):
+    is_start = empty(bin_times.shape[0], dtype=bool)
+    if is_start.shape[0] == 0: return is_start.nonzero()[0]
+
+    is_start[0] = True
+    is_start[1:] = bin_times[1:] != bin_times[:-1]
+    return is_start.nonzero()[0]
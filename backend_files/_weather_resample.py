@@ -0,0 +1,165 @@
+from numpy import asarray, array, where, isnan, flatnonzero, cumsum, empty, zeros, full, bincount, diff, concatenate
+from numpy import add, minimum, maximum, inf, nan, int64
+
+from backend_files._weather_columns import weather_columns
+
+
+aggregation_names = ["mean", "sum", "min", "max", "count",
+                     "mode", # most frequent category (e.g. "WindDirection")
+                     "increment_sum"] # sum of the increments of a cumulative counter (e.g. "RainfallTotal")
+
+default_aggregations = {"No": "count",
+                        "MeasureInterval": "mean",
+                        "WindSpeed": "mean",
+                        "WindGustSpeed": "max",
+                        "WindDirection": "mode",
+                        "RainfallHourly": "max", # rolling sums of the station -> maximum inside of the interval
+                        "RainfallDaily": "max",
+                        "RainfallWeekly": "max",
+                        "RainfallMonthly": "max",
+                        "RainfallTotal": "increment_sum", # rain that fell inside of the interval
+                        "WindLevel": "mean",
+                        "WindGustLevel": "max"}
+                        # Otherwise, "mean"!
+
+_fixed_units = {"s": 1, "min": 60, "h": 3600, "d": 86400, "w": 7*86400}
+_calendar_units = {"m": 1, "y": 12} # in months
+_week_offset = 4 * 86400 # 1970-01-01 was a thursday -> weeks start on monday
+
+
+def resample_columns(columns: weather_columns, keys: list, freq: str, aggs=None, time_key="Time"):
+    '''
+    Aggregates the (time-sorted) columns into intervals of the given frequency, e.g. "h", "d", "w", "m", "y"
+    or multiples like "15min" or "6h". Every step works on whole columns, so it scales linearly.
+
+    aggs can be None (default aggregation per key), one aggregation name for all keys or a dict key -> name.
+    Missing values are ignored, intervals without any measurement are not returned.
+
+    Returns
+    -------
+    (numpy.ndarray, dict)
+        Starting times (datetime64) of the intervals and the aggregated values for every key.
+    '''
+
+    bin_times = get_bin_starts(columns.column(time_key), freq)
+    if bin_times.shape[0] == 0:
+        return bin_times, {key: zeros(0) for key in keys}
+
+    group_starts = empty(bin_times.shape[0], dtype=bool)
+    group_starts[0] = True
+    group_starts[1:] = bin_times[1:] != bin_times[:-1]
+    start_indizes = flatnonzero(group_starts)
+
+    ret_values = {}
+    for key in keys:
+        assert key != time_key, "the time can not be aggregated"
+        aggregation = get_aggregation(key, aggs)
+
+        if aggregation == "mode":
+            ret_values[key] = _aggregate_mode(columns, key, start_indizes, group_starts)
+        else:
+            ret_values[key] = aggregate(_get_float_values(columns, key), start_indizes, aggregation)
+
+    return bin_times[start_indizes], ret_values
+
+def aggregate(values, start_indizes, aggregation: str):
+    # NaN-aware reductions over the consecutive groups starting at start_indizes
+    if aggregation == "increment_sum":
+        values = _get_increments(values)
+
+    nan_values = isnan(values)
+    counts = add.reduceat(~nan_values, start_indizes)
+    if aggregation == "count":
+        return counts
+
+    if aggregation in ["sum", "increment_sum", "mean"]:
+        sums = add.reduceat(where(nan_values, 0.0, values), start_indizes)
+        if aggregation == "mean":
+            return where(counts > 0, sums / maximum(counts, 1), nan)
+        return where(counts > 0, sums, nan)
+
+    if aggregation == "min":
+        return where(counts > 0, minimum.reduceat(where(nan_values, inf, values), start_indizes), nan)
+    if aggregation == "max":
+        return where(counts > 0, maximum.reduceat(where(nan_values, -inf, values), start_indizes), nan)
+
+    raise ValueError(f"unknown aggregation \"{aggregation}\", possible are {aggregation_names}")
+
+def get_aggregation(key: str, aggs=None):
+    if aggs is None:
+        return default_aggregations.get(key, "mean")
+    if isinstance(aggs, str):
+        return aggs
+    if key in aggs:
+        return aggs[key]
+    return default_aggregations.get(key, "mean")
+
+def get_bin_starts(times, freq: str):
+    # floors every time to the start of its interval
+    count, unit = _split_frequency(freq)
+    times = asarray(times, dtype=weather_columns._time_dtype)
+
+    if unit in _calendar_units:
+        months = times.astype("datetime64[M]").view(int64)
+        step = count * _calendar_units[unit]
+        return ((months // step) * step).astype("datetime64[M]").astype(weather_columns._time_dtype)
+
+    step = count * _fixed_units[unit]
+    offset = _week_offset if unit == "w" else 0
+    seconds = times.view(int64) - offset
+    return ((seconds // step) * step + offset).astype(weather_columns._time_dtype)
+
+def get_frequency_seconds(freq: str):
+    # length of a fixed frequency (e.g. "15min", "6h", "1d") in seconds, months and years have no fixed length
+    count, unit = _split_frequency(freq)
+    if not unit in _fixed_units:
+        raise ValueError(f"\"{freq}\" has no fixed length, possible units are {list(_fixed_units)}")
+    return count * _fixed_units[unit]
+
+
+
+### helper functions ###
+
+def _split_frequency(freq: str):
+    freq = freq.strip()
+    number = ""
+    while len(freq) > 0 and freq[0].isdigit():
+        number, freq = number + freq[0], freq[1:]
+
+    unit = freq.lower()
+    if unit in ["min", "t"]: unit = "min"
+    if not unit in _fixed_units and not unit in _calendar_units:
+        raise ValueError(f"unknown frequency \"{freq}\", possible are {list(_fixed_units) + list(_calendar_units)}")
+
+    count = int(number) if number != "" else 1
+    assert count > 0, "frequency must be positive"
+    return count, unit
+
+def _get_float_values(columns: weather_columns, key: str):
+    values = columns.column(key)
+    if key in weather_columns._category_names or key in weather_columns._int_names:
+        return where(values < 0, nan, values.astype(float))
+    return values
+
+def _get_increments(values):
+    # counter resets (e.g. new year) count their new value as increment
+    if values.shape[0] == 0: return values
+    differences = diff(values)
+    increments = where(differences < 0, values[1:], differences)
+    return concatenate([[0.0], increments])
+
+def _aggregate_mode(columns: weather_columns, key: str, start_indizes, group_starts):
+    codes = columns.column(key).astype(int64)
+    categories = columns.categories(key)
+    group_ids = cumsum(group_starts) - 1
+    group_count, category_count = start_indizes.shape[0], len(categories)
+
+    lookup = array(categories + [None], dtype=object) # code -1 indexes the trailing None
+    if category_count == 0: return lookup[full(group_count, -1)]
+
+    valid = codes >= 0
+    counts = bincount(group_ids[valid] * category_count + codes[valid],
+                      minlength=group_count * category_count).reshape(group_count, category_count)
+
+    mode_codes = where(counts.max(axis=1) > 0, counts.argmax(axis=1), -1)
+    return lookup[mode_codes]
@@ -0,0 +1,157 @@
+from numpy import argsort, searchsorted, iinfo, int64
+
+from backend_files._weather_columns import weather_columns
+
+
+_end_of_time = iinfo(int64).max
+
+
+def merge_chunk_streams(chunk_functions: list, chunk_size=50000, remove_duplicates=True,
+                        duplicate_policy="first", time_key="Time"):
+    '''
+    k-way merge of several chunked sources (e.g. export files) into time-sorted weather_columns-chunks
+    of "chunk_size" rows (only the last one may be shorter).
+
+    chunk_functions: one function per source, each returns a new iterator over its weather_columns-chunks.
+    A source is opened once the merge reaches its first time and is always read exactly one chunk ahead,
+    so the memory depends on the number of overlapping sources and the chunk size, not on the archive size.
+    Rows inside of a source may be out of order by less than one chunk (e.g. the repeated hour at the end
+    of the daylight saving time). Equal times are handled like in weather_wrapper (earlier source first).
+    '''
+
+    assert chunk_size > 0, "chunk_size must be positive"
+
+    pending = [_chunk_source(index, function, time_key) for index, function in enumerate(chunk_functions)]
+    pending = sorted([source for source in pending if not source.first_time is None], key=lambda source: (source.first_time, source.index))
+    active = []
+    output = _chunk_output(chunk_size)
+
+    while len(active) > 0 or len(pending) > 0:
+        while len(pending) > 0 and pending[0].first_time <= _get_horizon(active):
+            active.append(pending.pop(0).open())
+        active.sort(key=lambda source: source.index) # concatenation in the order of the sources -> same result as weather_wrapper
+
+        horizon = _get_horizon(active)
+        if len(pending) > 0: horizon = min(horizon, pending[0].first_time)
+
+        batch_list = [source.pop_before(horizon) for source in active]
+        batch_list = [batch for batch in batch_list if batch.size() > 0]
+        if len(batch_list) > 0:
+            batch = weather_columns.concatenate(batch_list)
+            output.append(batch.take(batch.get_sort_order(remove_duplicates=remove_duplicates, duplicate_policy=duplicate_policy,
+                                                          time_key=time_key)))
+            yield from output.pop_full_chunks()
+
+        for source in active:
+            if source.bound == horizon and source.bound != _end_of_time: source.advance(horizon)
+        active = [source for source in active if not source.is_finished()]
+
+    yield from output.pop_full_chunks(last=True)
+
+
+
+class _chunk_source(object):
+    # one source of the merge: sorted buffer of already read rows and the next chunk (lookahead)
+
+    def __init__(self, index: int, chunk_function: callable, time_key: str):
+        self.index = index
+        self._chunk_function = chunk_function
+        self._time_key = time_key
+        self._chunks = None
+        self._buffer = None
+        self._lookahead = None
+        self.bound = _end_of_time # no row of a later chunk is smaller than this time
+
+        self.first_time = self._read_first_time()
+
+    def open(self):
+        self._chunks = iter(self._chunk_function())
+        self._lookahead = self._next_chunk()
+        self.bound = self._get_bound()
+        return self
+
+    def advance(self, horizon: int):
+        if self._buffer is None:
+            self._buffer = self._lookahead
+        else:
+            combined = weather_columns.concatenate([self._buffer, self._lookahead])
+            self._buffer = combined.take(_sorted_order(combined, self._time_key))
+
+        self._lookahead = self._next_chunk()
+        self.bound = self._get_bound()
+        if self.bound < horizon:
+            raise ValueError(f"rows of source {self.index} are out of time order by more than one chunk, "
+                             "increase chunk_size")
+
+    def pop_before(self, horizon: int):
+        # every buffered row with a time < horizon (removed from the buffer)
+        if self._buffer is None: return weather_columns.allocate([])
+
+        split_index = int(searchsorted(self._buffer.time_as_int(self._time_key), horizon, side="left"))
+        ret_rows = self._buffer.slice(0, split_index)
+        self._buffer = self._buffer.slice(split_index, self._buffer.size())
+        return ret_rows
+
+    def is_finished(self):
+        return self._lookahead is None and (self._buffer is None or self._buffer.size() == 0)
+
+    def _next_chunk(self):
+        for chunk in self._chunks:
+            chunk = chunk.take(_sorted_order(chunk, self._time_key))
+            if chunk.size() > 0: return chunk
+        return None
+
+    def _get_bound(self):
+        if self._lookahead is None: return _end_of_time
+        return int(self._lookahead.time_as_int(self._time_key)[0])
+
+    def _read_first_time(self):
+        # smallest time of the first chunk (None for sources without rows), the chunk itself is not kept
+        chunks = iter(self._chunk_function())
+        try:
+            for chunk in chunks:
+                times = chunk.time_as_int(self._time_key)[~chunk.missing_mask(self._time_key)]
+                if times.shape[0] > 0: return int(times.min())
+        finally:
+            if hasattr(chunks, "close"): chunks.close()
+        return None
+
+
+class _chunk_output(object):
+    # collects the merged rows and returns them in chunks of a fixed size
+
+    def __init__(self, chunk_size: int):
+        self._chunk_size = chunk_size
+        self._parts = []
+        self._row_count = 0
+
+    def append(self, rows: weather_columns):
+        if rows.size() == 0: return
+        self._parts.append(rows)
+        self._row_count += rows.size()
+
+    def pop_full_chunks(self, last=False):
+        if self._row_count < self._chunk_size and not (last and self._row_count > 0):
+            return []
+
+        rows = weather_columns.concatenate(self._parts) if len(self._parts) > 1 else self._parts[0]
+        full_size = (rows.size() // self._chunk_size) * self._chunk_size
+        if last: full_size = rows.size()
+
+        ret_chunks = [rows.slice(start, min(start + self._chunk_size, full_size)) for start in range(0, full_size, self._chunk_size)]
+        rest = rows.slice(full_size, rows.size())
+        self._parts, self._row_count = ([rest] if rest.size() > 0 else []), rest.size()
+        return ret_chunks
+
+
+
+### helper functions ###
+
+def _get_horizon(active: list):
+    # rows before the smallest bound of all opened sources are complete
+    return min([source.bound for source in active], default=_end_of_time)
+
+def _sorted_order(columns: weather_columns, time_key: str):
+    # like weather_columns.get_sort_order without removing duplicates: rows without time get dropped
+    order = argsort(columns.time_as_int(time_key), kind="stable")
+    return order[~columns.missing_mask(time_key)[order]]
@@ -0,0 +1,175 @@
+from datetime import datetime
+
+from numpy import array, isfinite, argsort, searchsorted, concatenate, cumsum, diff, median, convolve, pad, exp
+from numpy import bincount, zeros, empty, arange, vander, floor, int64, interp
+from numpy.linalg import pinv
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backend_files._weather_fit import do_polyval_batch, get_day_offsets
+from backend_files._weather_resample import get_frequency_seconds
+from backend_files._weather_profiler import span
+
+
+trend_methods = ["polynomial", "rolling_mean", "rolling_median", "ema", "savgol", "seasonal_daily", "seasonal_annual"]
+
+trend_labels = {"polynomial": "Ausgleichspolynom",
+                "rolling_mean": "Gleitender Mittelwert",
+                "rolling_median": "Gleitender Median",
+                "ema": "Exponentieller Mittelwert",
+                "savgol": "Savitzky-Golay",
+                "seasonal_daily": "Tagesgang",
+                "seasonal_annual": "Jahresgang"}
+
+_seasonal_periods = {"seasonal_daily": (86400.0, 3600.0), # (period, width of one phase-bin) in seconds
+                     "seasonal_annual": (365.2425 * 86400.0, 7 * 86400.0)}
+_max_exponent = 600.0 # exp(600) still fits into float64
+_median_block_size = 10**7 # values per block of the rolling median
+_median_points = 16 # longer windows: exact median at every (window/16)-th value only, linear in between
+_epoch = datetime(1970, 1, 1)
+
+
+def get_trends(times, data, method="polynomial", degree=1, window="1d"):
+    '''
+    Trend lines for several series over the same time axis (data: one column per series).
+
+    method: one of trend_methods. "polynomial" is the global least-squares fit (see do_polyval_batch),
+    the others are local smoothers over "window" (e.g. "6h", "1d", "2w"):
+        rolling_mean    - mean of the centered time-window (cumulative sums)
+        rolling_median  - median of the centered window (in samples of the typical measuring interval),
+                          long windows get evaluated at 16 points per window and interpolated in between
+        ema             - exponential moving average with time constant "window" (irregular intervals allowed)
+        savgol          - Savitzky-Golay filter of order "degree" (window in samples like rolling_median)
+        seasonal_daily  - trend (rolling mean over one day) plus the mean daily cycle
+        seasonal_annual - trend (rolling mean over one year) plus the mean annual cycle (weekly resolution)
+
+    Returns
+    -------
+    list
+        (times without the NaN-values, trend values) for every column of data.
+    '''
+
+    if method == "polynomial":
+        return do_polyval_batch(times, data, degree=degree)
+    if not method in trend_methods:
+        raise ValueError(f"unknown trend method \"{method}\", possible are {trend_methods}")
+
+    times = array(times)
+    values = array(data, dtype=float) # None -> nan
+    if values.ndim == 1: values = values.reshape(-1, 1)
+    if times.shape[0] == 0:
+        return [(times, zeros(0)) for i in range(values.shape[1])]
+
+    seconds = get_day_offsets(times, starting_time=_epoch) * 86400.0 # since 1970 -> daily/annual phases fit the calendar
+    window_seconds = float(get_frequency_seconds(window)) if not method in _seasonal_periods else None
+
+    ret_trends = []
+    with span("trend", rows=values.size):
+        for column in range(values.shape[1]):
+            mask = isfinite(values[:, column]) & isfinite(seconds)
+            ret_trends.append((times[mask], get_trend(seconds[mask], values[mask, column], method, degree=degree,
+                                                      window_seconds=window_seconds)))
+    return ret_trends
+
+def get_trend(seconds, values, method: str, degree=1, window_seconds=86400.0):
+    # one series without missing values, seconds: time of every value since 1970
+    if values.shape[0] == 0: return zeros(0)
+
+    order = argsort(seconds, kind="stable")
+    seconds, values = seconds[order], values[order]
+
+    if method == "rolling_mean":
+        trend = rolling_mean(seconds, values, window_seconds)
+    elif method == "rolling_median":
+        trend = rolling_median(values, _get_window_samples(seconds, window_seconds))
+    elif method == "ema":
+        trend = exponential_moving_average(seconds, values, window_seconds)
+    elif method == "savgol":
+        trend = savitzky_golay(values, _get_window_samples(seconds, window_seconds, minimum=degree + 2), degree)
+    else:
+        trend = seasonal_model(seconds, values, *_seasonal_periods[method])
+
+    ret_trend = empty(trend.shape[0])
+    ret_trend[order] = trend
+    return ret_trend
+
+def rolling_mean(seconds, values, window_seconds: float):
+    # mean of every value inside of [t - window/2, t + window/2], O(n) via cumulative sums
+    starts = searchsorted(seconds, seconds - window_seconds / 2, side="left")
+    stops = searchsorted(seconds, seconds + window_seconds / 2, side="right")
+
+    offset = values.mean() # smaller cumulative sums -> less rounding errors
+    sums = concatenate([[0.0], cumsum(values - offset)])
+    return (sums[stops] - sums[starts]) / (stops - starts) + offset
+
+def rolling_median(values, window_samples: int):
+    # every median costs O(window) -> O(n * _median_points) in total instead of O(n * window)
+    half = window_samples // 2
+    padded = pad(values, half, mode="edge")
+    windows = sliding_window_view(padded, 2 * half + 1)
+
+    step = max((2 * half + 1) // _median_points, 1)
+    positions = arange(0, values.shape[0], step)
+    if positions[-1] != values.shape[0] - 1: positions = concatenate([positions, [values.shape[0] - 1]])
+
+    medians = empty(positions.shape[0])
+    block_size = max(_median_block_size // (2 * half + 1), 1) # median copies every window -> blockwise
+    for start in range(0, positions.shape[0], block_size):
+        medians[start:start + block_size] = median(windows[positions[start:start + block_size]], axis=1)
+    if step == 1: return medians
+    return interp(arange(values.shape[0]), positions, medians)
+
+def exponential_moving_average(seconds, values, time_constant: float):
+    '''
+    y_i = a_i * x_i + (1 - a_i) * y_(i-1) with a_i = 1 - exp(-(t_i - t_(i-1)) / time_constant), written as
+    y_i = sum_j a_j * x_j * exp(-(t_i - t_j) / time_constant) -> cumulative sums instead of a python loop.
+    The exponentials only stay finite for a limited time span, so the sums restart in blocks.
+    '''
+    weights = 1.0 - exp(-diff(seconds, prepend=seconds[0] - float("inf")) / time_constant) # first value: weight 1
+
+    block_ids = floor((seconds - seconds[0]) / (_max_exponent * time_constant)).astype(int64)
+    block_starts = concatenate([[0], (diff(block_ids) != 0).nonzero()[0] + 1, [seconds.shape[0]]])
+
+    ret_values = empty(values.shape[0])
+    last_value, last_time = 0.0, seconds[0]
+    for start, stop in zip(block_starts[:-1], block_starts[1:]):
+        relative = (seconds[start:stop] - seconds[start]) / time_constant
+        sums = cumsum(weights[start:stop] * values[start:stop] * exp(relative))
+        carry = last_value * exp(-(seconds[start:stop] - last_time) / time_constant)
+
+        ret_values[start:stop] = carry + sums * exp(-relative)
+        last_value, last_time = ret_values[stop - 1], seconds[stop - 1]
+    return ret_values
+
+def savitzky_golay(values, window_samples: int, degree: int):
+    # local least-squares polynomial of every window, evaluated at its center (one convolution)
+    half = window_samples // 2
+    degree = min(degree, 2 * half)
+
+    offsets = arange(-half, half + 1, dtype=float)
+    coefficients = pinv(vander(offsets, degree + 1, increasing=True))[0] # value of the fit at offset 0
+    return convolve(pad(values, half, mode="edge"), coefficients[::-1], mode="valid")
+
+def seasonal_model(seconds, values, period: float, bin_width: float):
+    # trend (rolling mean over one period) plus the mean deviation of every phase of the period
+    trend = rolling_mean(seconds, values, period)
+
+    phase_bins = ((seconds % period) // bin_width).astype(int64)
+    bin_count = int(period // bin_width) + 1
+    deviation_sums = bincount(phase_bins, weights=values - trend, minlength=bin_count)
+    counts = bincount(phase_bins, minlength=bin_count)
+
+    seasonal = deviation_sums / counts.clip(min=1)
+    return trend + seasonal[phase_bins]
+
+
+
+### helper functions ###
+
+def _get_window_samples(seconds, window_seconds: float, minimum=1):
+    # window in samples of the typical measuring interval (odd -> centered)
+    if seconds.shape[0] < 2: return 1
+    interval = median(diff(seconds))
+    if interval <= 0: interval = 1.0
+
+    samples = max(int(round(window_seconds / interval)), minimum)
+    return samples + 1 if samples % 2 == 0 else samples
@@ -0,0 +1,47 @@
+from threading import Thread, Event
+
+
+class weather_folder_watcher(object):
+    '''
+    Polls the folder of a weather_wrapper and merges new or changed exports via weather_wrapper.refresh().
+
+    Either call poll() regularly yourself (e.g. from a QTimer in the GUI thread) or let start()
+    poll in a background thread. "callback" gets called with the list of changed file paths.
+    '''
+
+    def __init__(self, data_object, interval=10.0, callback=None):
+        self._data_object = data_object
+        self._interval = interval
+        self._callback = callback
+
+        self._stop_event = Event()
+        self._thread = None
+
+    def poll(self):
+        changed_paths = self._data_object.refresh()
+        if len(changed_paths) > 0 and not self._callback is None:
+            self._callback(changed_paths)
+        return changed_paths
+
+    def start(self):
+        if self.is_running(): return
+
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if not self._thread is None:
+            self._thread.join()
+        self._thread = None
+
+    def is_running(self):
+        return not self._thread is None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop_event.wait(self._interval):
+            try:
+                self.poll()
+            except (OSError, RuntimeError, ValueError) as error: # e.g. file still gets written -> try again next time
+                print(f"Warning: refreshing weather data failed ({error})")
@@ -0,0 +1,217 @@
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.dates import DateFormatter, num2date
+from PyQt5 import QtCore
+
+from backend_files.weather_plot_main import _get_usable_colors
+from backend_files._weather_profiler import span
+
+
+_refetch_delay_ms = 250 # debounce: zooming/panning fires many limit changes, only the last one gets fetched
+_refetch_margin = 0.5 # fetched additionally on both sides (in widths of the visible window) -> panning needs no refetch
+_refetch_zoom_factor = 3 # refetch if the visible window is this much smaller than the fetched one
+
+
+class weather_plot_canvas(FigureCanvasQTAgg):
+    '''
+    Plot embedded in the GUI (instead of a new pyplot-window for every plot).
+    The figure, its axes and the lines are kept: a new plot only updates the data of the lines (set_data).
+    Blitting (only the lines get redrawn onto the cached background) needs unchanged axes, so it is used for
+    the viewport refetches after zooming/panning and for new plots with the same limits, labels and lines.
+    A new date range changes the limits (ticks, grid, labels) -> the whole figure gets redrawn once.
+    
+    With a viewport_source (see show_series) the data of the visible window gets refetched after
+    zooming or panning, at a resolution matching the width of the plot.
+    '''
+
+    def __init__(self, parent=None):
+        super(weather_plot_canvas, self).__init__(Figure(tight_layout=True))
+        self.setParent(parent)
+
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title("Zusammenstellung Wetterdaten")
+        self.ax.grid(True)
+        self.ax2 = None # secondary axis (only while used)
+
+        self._lines = {} # (axis index, label) -> Line2D
+        self._colors = _get_usable_colors() # to ensure different colors for every line
+        self._background = None # figure without the lines (for blitting)
+        self._printing = False
+        self._decoration = None # (labels, time format) of the last full redraw
+        self._background_limits = None # x-limits of the cached background
+
+        self._viewport_source = None
+        self._fetched_range = None # x-limits (matplotlib date numbers) of the currently shown data
+        self._updating = False # own limit changes do not cause a refetch
+        self._refetch_timer = QtCore.QTimer(self)
+        self._refetch_timer.setSingleShot(True)
+        self._refetch_timer.setInterval(_refetch_delay_ms)
+        self._refetch_timer.timeout.connect(self._refetch_viewport)
+
+        self.mpl_connect("draw_event", self._on_draw)
+        self.ax.callbacks.connect("xlim_changed", self._on_xlim_changed)
+
+    ### ---- Public Methods ----- ###
+
+    def get_pixel_width(self):
+        return max(int(self.ax.get_window_extent().width), 1)
+
+    def show_series(self, axes_series: list, plotting_time_format: str, x_label="Zeit", viewport_source=None):
+        '''
+        Shows the result of weather_plot_main.get_series: (y-label, [(label, x_data, y_data)]) for one or two y-axes.
+        Lines with the same axis and label as before keep their artist (and color).
+        
+        viewport_source: function(time_range, pixel_width) -> [(label, x_data, y_data)] for every y-axis
+        (e.g. weather_plot_main.get_viewport_series), called for the visible window after zooming.
+        Lines not returned by it (e.g. trend lines) keep their data.
+        '''
+
+        assert 1 <= len(axes_series) <= 2, "only one or two y-axes are possible"
+        self._refetch_timer.stop()
+        self._viewport_source = viewport_source
+        self._updating = True
+        try:
+            self._show_series(axes_series, plotting_time_format, x_label)
+        finally:
+            self._updating = False
+        self._fetched_range = self.ax.get_xlim()
+
+    def draw(self):
+        with span("render", rows=sum(len(line.get_xdata()) for line in self._lines.values())):
+            super(weather_plot_canvas, self).draw()
+
+    def print_figure(self, *args, **kwargs):
+        # animated lines would be missing in saved files (e.g. save-button of the toolbar)
+        self._printing = True
+        for line in self._lines.values(): line.set_animated(False)
+        try:
+            return super(weather_plot_canvas, self).print_figure(*args, **kwargs)
+        finally:
+            for line in self._lines.values(): line.set_animated(True)
+            self._printing = False
+            self._background = None
+            self.draw_idle()
+
+
+
+    ### helper functions ###
+
+    def _show_series(self, axes_series: list, plotting_time_format: str, x_label: str):
+        structure_changed = self._set_twin_axis(len(axes_series) == 2)
+        axes = self._get_axes()
+
+        used_keys = []
+        for axis_index, (tmp_ax, (y_label, series)) in enumerate(zip(axes, axes_series)):
+            for label, x_data, y_data in series:
+                key = (axis_index, label)
+                used_keys.append(key)
+
+                if key in self._lines:
+                    self._lines[key].set_data(x_data, y_data)
+                else:
+                    self._lines[key] = tmp_ax.plot(x_data, y_data, label=label, c=self._next_color(), animated=True)[0]
+                    structure_changed = True
+
+        for key in [key for key in self._lines if not key in used_keys]: # lines of the last plot which are not used anymore
+            self._lines.pop(key).remove()
+            structure_changed = True
+
+        old_limits = self._get_limits()
+        for tmp_ax in axes:
+            tmp_ax.set_autoscale_on(True) # zooming turns it off
+            tmp_ax.relim()
+            tmp_ax.autoscale_view()
+        limits_changed = old_limits != self._get_limits()
+        if not self.toolbar is None: self.toolbar.update() # new "home"-view
+
+        decoration = ([y_label for y_label, series in axes_series], x_label, plotting_time_format)
+        if structure_changed or limits_changed or decoration != self._decoration: # the cached background is outdated
+            self._decorate(axes, axes_series, x_label, plotting_time_format)
+            self._decoration = decoration
+            self.draw_idle() # new background, the lines get drawn in _on_draw
+        else:
+            self._update_lines()
+
+    def _get_axes(self):
+        return [self.ax] if self.ax2 is None else [self.ax, self.ax2]
+
+    def _set_twin_axis(self, twin_axis: bool):
+        # returns True if the axes changed
+        if twin_axis == (not self.ax2 is None): return False
+
+        if twin_axis:
+            self.ax2 = self.ax.twinx()
+        else:
+            for key in [key for key in self._lines if key[0] == 1]: self._lines.pop(key)
+            self.ax2.remove()
+            self.ax2 = None
+        return True
+
+    def _next_color(self):
+        used_colors = [line.get_color() for line in self._lines.values()]
+        for color in self._colors:
+            if not color in used_colors: return color
+        return self._colors[len(self._lines) % len(self._colors)]
+
+    def _decorate(self, axes: list, axes_series: list, x_label: str, plotting_time_format: str):
+        self.ax.set_xlabel(x_label)
+        for tmp_ax, (y_label, series) in zip(axes, axes_series):
+            tmp_ax.set_ylabel(y_label)
+
+        lns = [line for tmp_ax in axes for line in tmp_ax.get_lines()] # one legend for both axes
+        if len(lns) > 0:
+            self.ax.legend(lns, [line.get_label() for line in lns], loc="best")
+        elif not self.ax.get_legend() is None:
+            self.ax.get_legend().remove()
+
+        ### Format x-axis as "time"
+        self.ax.xaxis.set_major_formatter(DateFormatter(plotting_time_format))
+        self.figure.autofmt_xdate() ## Rotate date labels automatically
+
+    def _on_draw(self, event):
+        # after every full redraw: store the background, then draw the (animated) lines on top
+        if self._printing: return
+        self._background = self.copy_from_bbox(self.figure.bbox)
+        self._background_limits = self._get_limits()
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line in self._lines.values():
+            self.figure.draw_artist(line)
+
+    def _update_lines(self):
+        # blitting only if the cached background still fits the axes, otherwise redraw everything
+        if self._background is None or self._background_limits != self._get_limits():
+            self.draw_idle()
+            return
+        with span("blit", rows=sum(len(line.get_xdata()) for line in self._lines.values())):
+            self.restore_region(self._background)
+            self._draw_lines()
+            self.blit(self.figure.bbox)
+
+    def _get_limits(self):
+        return [(tmp_ax.get_xlim(), tmp_ax.get_ylim()) for tmp_ax in self._get_axes()]
+
+    def _on_xlim_changed(self, ax):
+        if self._updating or self._viewport_source is None: return
+        self._refetch_timer.start() # restarts the delay
+
+    def _refetch_viewport(self):
+        x_min, x_max = self.ax.get_xlim()
+        if not self._fetched_range is None:
+            fetched_min, fetched_max = self._fetched_range
+            if fetched_min <= x_min and x_max <= fetched_max and fetched_max - fetched_min < _refetch_zoom_factor * (x_max - x_min):
+                return # visible window already shown in (almost) full resolution
+
+        margin = _refetch_margin * (x_max - x_min)
+        fetch_range = (x_min - margin, x_max + margin)
+        pixel_width = int(self.get_pixel_width() * (1 + 2 * _refetch_margin))
+        time_range = [num2date(x).replace(tzinfo=None) for x in fetch_range] # naive times like the data
+        with span("viewport_refetch"):
+            axes_series = self._viewport_source(time_range, pixel_width)
+
+        for axis_index, series in enumerate(axes_series):
+            for label, x_data, y_data in series:
+                if (axis_index, label) in self._lines: self._lines[(axis_index, label)].set_data(x_data, y_data)
+        self._fetched_range = fetch_range
+        self._update_lines() # limits stay as zoomed by the user
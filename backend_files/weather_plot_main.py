@@ -1,6 +1,6 @@
 import numpy as np
-from datetime import datetime
 import random
+from os.path import splitext
 
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
@@ -8,7 +8,15 @@ from matplotlib.dates import DateFormatter
 
 ### imports for usage ###
 from backend_files.weather_wrapper import weather_wrapper as ww
-from backend_files.weather_wrapper import do_polyval
+from backend_files._weather_trend import trend_labels
+from backend_files._downsampling import minmax_downsample
+from backend_files._weather_profiler import span
+
+
+_downsampling_factor = 4 # series with more points than "factor * pixel-width of the axis" get downsampled
+_color_seed = 0 # same colors in every run/process
+_file_metadata = {".svg": {"Date": None}, ".pdf": {"CreationDate": None}} # no timestamps -> equal plots give equal files
+_svg_hashsalt = "WeatherDataVisualization" # otherwise the ids inside of svg-files are random
 
 
 
@@ -17,30 +25,142 @@ def _get_yString(labels: list):
         #"Plotted values must be more than zero!"
         return None
     if len(labels) == 1:
-        if labels[0].startswith("Ausgleichspolynom: "):
-            labels[0] = labels[0][19:]
-        return labels[0]
+        return _remove_trend_prefix(labels[0])
     
     ret_string = ""
     for label in labels:
         print(label)
-        if label.startswith("Ausgleichspolynom: "):
-            label = label[19:]
-        ret_string += label + "/"
+        ret_string += _remove_trend_prefix(label) + "/"
     
     return ret_string[:-1]
 
+def _remove_trend_prefix(label: str):
+    for trend_label in trend_labels.values():
+        if label.startswith(trend_label + ": "):
+            return label[len(trend_label) + 2:]
+    return label
+
+def _get_trend_labels(data_object: ww, keys: list, trend_method: str):
+    # e.g. "Gleitender Mittelwert: Temperatur aussen" (Time stays at labels[0])
+    labels = data_object.get_labels(["Time"] + keys)
+    return labels[:1] + [trend_labels[trend_method] + ": " + label for label in labels[1:]]
+
+def _get_pixel_width(ax):
+    return max(int(ax.get_window_extent().width), 1)
+
+def _get_plot_series(data_object: ww, key: str, time_range: list, pixel_width: int, downsampling=True):
+    # long ranges: pre-aggregated min/max of the pyramid (if the data object has one), raw measurements otherwise
+    if downsampling:
+        start_indizes, stop_indizes = data_object.get_index_ranges([time_range[0]], [time_range[1]])
+        
+        if stop_indizes[0] - start_indizes[0] > _downsampling_factor * pixel_width:
+            pyramid_data = data_object.get_pyramid_data(key, time_range[0], time_range[1], pixel_width)
+            if not pyramid_data is None: return pyramid_data
+    
+    subs_data = data_object.subscript_data(["Time", key], start_date=time_range[0], end_date=time_range[1], include_labeling=False,
+                                           output="columns")
+    return subs_data["Time"], subs_data.get_values(key)
+
+def _downsample(x_data, y_data, pixel_width: int, downsampling=True):
+    # at most two points (min/max) per pixel of the axis if the series is long
+    if not _is_numeric(y_data): # categories: matplotlib can not plot missing values (None) as category
+        valid = np.not_equal(y_data, None)
+        return np.asarray(x_data)[valid], np.asarray(y_data)[valid]
+    if downsampling and len(x_data) > _downsampling_factor * pixel_width:
+        with span("downsample", rows=len(x_data)):
+            return minmax_downsample(x_data, y_data, pixel_width)
+    return x_data, y_data
+
+def _is_numeric(y_data):
+    # categories (e.g. "WindDirection") have no minimum/maximum -> plotted as they are
+    try: np.asarray(y_data, dtype=float)
+    except (TypeError, ValueError): return False
+    return True
+
+def get_series(data_object: ww, time_range: list, axis_keys: list, pixel_width: int, interpolation_degree=1, downsampling=True,
+               trend_method="polynomial", trend_window="1d"):
+    '''
+    Data of every line, independent of where it gets drawn (pyplot-figure or embedded canvas).
+    
+    Parameters
+    ----------
+    axis_keys : list
+        [(plotting_keys, interp_keys)] for every y-axis.
+    pixel_width : int
+        Width of the axis in pixels (resolution of the downsampling).
+        
+    Returns
+    -------
+    list
+        (y-label, [(label, x_data, y_data)]) for every y-axis, first the plotted keys, then the trend lines.
+    '''
+    
+    # every trend line shares the same time axis -> one batched fit for all axes (cached per key by the data object)
+    all_interp_keys = [key for plotting_keys, interp_keys in axis_keys for key in interp_keys]
+    interp_fits = data_object.get_trends(all_interp_keys, time_range[0], time_range[1], method=trend_method, degree=interpolation_degree,
+                                         window=trend_window)
+    
+    axes_plot_series = get_viewport_series(data_object, time_range, [plotting_keys for plotting_keys, interp_keys in axis_keys],
+                                           pixel_width, downsampling=downsampling)
+    
+    ret_axes = []
+    for (plotting_keys, interp_keys), series in zip(axis_keys, axes_plot_series):
+        labels_plot = data_object.get_labels(plotting_keys)
+        labels_interp = _get_trend_labels(data_object, interp_keys, trend_method)[1:]
+        
+        for label in labels_interp:
+            interp_time, interp_data_tmp = interp_fits.pop(0)
+            series.append((label, *_downsample(interp_time, interp_data_tmp, pixel_width, downsampling=downsampling)))
+        
+        y_label = _get_yString(labels_plot)
+        if y_label == None: y_label = _get_yString(labels_interp)
+        ret_axes.append((y_label, series))
+    
+    return ret_axes
+
+def get_viewport_series(data_object: ww, time_range: list, axis_plotting_keys: list, pixel_width: int, downsampling=True):
+    '''
+    Data of the plotted keys (without trend lines) inside of time_range, at most about two points per pixel.
+    Used to refetch the visible window after zooming: the resolution follows the window, not the whole plot.
+    
+    Returns
+    -------
+    list
+        [(label, x_data, y_data)] for every list of keys in axis_plotting_keys (one per y-axis).
+    '''
+    
+    ret_axes = []
+    for plotting_keys in axis_plotting_keys:
+        series = []
+        for key, label in zip(plotting_keys, data_object.get_labels(plotting_keys)): # data gets fetched per key (see _get_plot_series)
+            plot_time, plot_data_tmp = _get_plot_series(data_object, key, time_range, pixel_width, downsampling=downsampling)
+            series.append((label, *_downsample(plot_time, plot_data_tmp, pixel_width, downsampling=downsampling)))
+        ret_axes.append(series)
+    
+    return ret_axes
+
+def _show_figure(fig, output_file=None):
+    # blocking window or (e.g. headless with the Agg-backend) file
+    if output_file is None:
+        plt.show()
+        return
+    file_ending = splitext(output_file)[1].lower() if isinstance(output_file, str) else None # file objects get PNG
+    with span("render"), plt.rc_context({"svg.hashsalt": _svg_hashsalt}):
+        fig.savefig(output_file, metadata=_file_metadata.get(file_ending))
+    plt.close(fig)
+
 def _get_usable_colors():
     base_color_keys = list(mcolors.BASE_COLORS.keys())
     tableau_color_keys = list(mcolors.TABLEAU_COLORS.keys())
     css_color_keys = list(mcolors.CSS4_COLORS.keys())
     
-    random.shuffle(css_color_keys) # to ensure not to close lying colors
+    random.Random(_color_seed).shuffle(css_color_keys) # to ensure not to close lying colors
     
     return base_color_keys + tableau_color_keys + css_color_keys
     
 
-def plot_oneAxis(data_object: ww, plotting_time_format: str, time_range: list, plotting_keys: list, interp_keys: list, interpolation_degree=1):
+def plot_oneAxis(data_object: ww, plotting_time_format: str, time_range: list, plotting_keys: list, interp_keys: list, interpolation_degree=1,
+                 downsampling=True, trend_method="polynomial", trend_window="1d", output_file=None):
     '''
     Parameters
     ----------
@@ -52,32 +172,30 @@ def plot_oneAxis(data_object: ww, plotting_time_format: str, time_range: list, p
         Contains two elements with from type "datetime" [plot_start, plot_end].
     plotting_values : list
         A list with every key-word that needs to be plotted on the y-axis.
+    downsampling : bool
+        Long series get reduced to their min/max per pixel before plotting.
+    trend_method : str
+        Trend line of the interp_keys, one of _weather_trend.trend_methods (interpolation_degree: degree of the polynomial).
+    trend_window : str
+        Window of the smoothing trend methods, e.g. "6h" or "1d".
+    output_file : str
+        Saves the figure (format from the file ending, e.g. ".png" or ".svg", PNG for binary file objects) instead of showing it.
         
     '''
     
-    subs_data_plot, labels_plot = data_object.subscript_data(["Time"] + plotting_keys,
-                                                             start_date=time_range[0], end_date=time_range[1])
-    
-    subs_data_interp, labels_interp = data_object.subscript_data(["Time"] + interp_keys, for_interpolation=True,
-                                                                 start_date=time_range[0], end_date=time_range[1])
-    
     fig, ax = plt.subplots()
     ax.set_title("Zusammenstellung Wetterdaten")
     
-    ax.set_xlabel(labels_plot[0]) # Standard: contains "Time" at labels[0] / subs_data[0]
+    ax.set_xlabel(data_object.get_labels(["Time"])[0])
     
-    y_label = _get_yString(labels_plot[1:])
-    if y_label == None: y_label = _get_yString(labels_interp[1:])
+    (y_label, series), = get_series(data_object, time_range, [(plotting_keys, interp_keys)], _get_pixel_width(ax),
+                                    interpolation_degree=interpolation_degree, downsampling=downsampling,
+                                    trend_method=trend_method, trend_window=trend_window)
     ax.set_ylabel(y_label)
     
-    # normal plotting
-    for i in range(1, subs_data_plot.shape[1]):
-        ax.plot(subs_data_plot[:,0], subs_data_plot[:,i], label=labels_plot[i])
-    
-    # interpolation plottings
-    for i in range(1, subs_data_interp.shape[1]):
-        interp_time, interp_data_tmp = do_polyval(subs_data_interp[:,0], subs_data_interp[:,i], degree=interpolation_degree)
-        ax.plot(interp_time, interp_data_tmp, label=labels_interp[i])
+    # normal plotting, then the trend lines
+    for label, x_data, y_data in series:
+        ax.plot(x_data, y_data, label=label)
     
     ax.legend(loc="best")
     
@@ -87,22 +205,13 @@ def plot_oneAxis(data_object: ww, plotting_time_format: str, time_range: list, p
     fig.autofmt_xdate() ## Rotate date labels automatically
     
     ax.grid(True)
-    plt.show()
+    _show_figure(fig, output_file)
     
     
 
 def plot_twinAxis(data_object: ww, plotting_time_format: str, time_range: list, plotting_YKeys: list, plotting_secYKeys: list,
-                  interp_YKeys: list, interp_secYKeys: list, interpolation_degree=1):
-    
-    subs_dataY_plot, labelsY_plot = data_object.subscript_data(["Time"] + plotting_YKeys,
-                                                               start_date=time_range[0], end_date=time_range[1])
-    subs_dataSecY_plot, labelsSecY_plot = data_object.subscript_data(["Time"] + plotting_secYKeys,
-                                                                     start_date=time_range[0], end_date=time_range[1])
-    
-    subs_dataY_interp, labelsY_interp = data_object.subscript_data(["Time"] + interp_YKeys, for_interpolation=True,
-                                                                   start_date=time_range[0], end_date=time_range[1])
-    subs_dataSecY_interp, labelsSecY_interp = data_object.subscript_data(["Time"] + interp_secYKeys, for_interpolation=True,
-                                                                         start_date=time_range[0], end_date=time_range[1])
+                  interp_YKeys: list, interp_secYKeys: list, interpolation_degree=1, downsampling=True,
+                  trend_method="polynomial", trend_window="1d", output_file=None):
     
     usable_color = _get_usable_colors() # to ensure different colors for every line
     color_iterator = 0
@@ -110,46 +219,24 @@ def plot_twinAxis(data_object: ww, plotting_time_format: str, time_range: list,
     fig, ax = plt.subplots()
     ax.set_title("Zusammenstellung Wetterdaten")
     
-    ax.set_xlabel(labelsY_plot[0]) # Standard: contains "Time" at labels[0] / subs_data[0]
-    #ax.set_ylabel(_get_yString(labelsY_plot[1:]))
+    ax.set_xlabel(data_object.get_labels(["Time"])[0])
+    ax2 = ax.twinx() # secondary axis
     
-    y_label = _get_yString(labelsY_plot[1:])
-    if y_label == None: y_label = _get_yString(labelsY_interp[1:])
-    ax.set_ylabel(y_label)
+    axes_series = get_series(data_object, time_range, [(plotting_YKeys, interp_YKeys), (plotting_secYKeys, interp_secYKeys)],
+                             _get_pixel_width(ax), interpolation_degree=interpolation_degree, downsampling=downsampling,
+                             trend_method=trend_method, trend_window=trend_window)
     
-    plot_objects_Y = []
-    for i in range(1, subs_dataY_plot.shape[1]):
-        plot_objects_Y.append(ax.plot(subs_dataY_plot[:,0], subs_dataY_plot[:,i], label=labelsY_plot[i], c=usable_color[color_iterator])[0])
-        color_iterator += 1
+    plot_objects = [] # lines of both axes (for one legend)
+    for tmp_ax, (y_label, series) in zip([ax, ax2], axes_series):
+        tmp_ax.set_ylabel(y_label)
+        
+        for label, x_data, y_data in series:
+            plot_objects.append(tmp_ax.plot(x_data, y_data, label=label, c=usable_color[color_iterator])[0])
+            color_iterator += 1
         
-    # interpolation plottings YAxis
-    for i in range(1, subs_dataY_interp.shape[1]):
-        interp_time, interp_data_tmp = do_polyval(subs_dataY_interp[:,0], subs_dataY_interp[:,i], degree=interpolation_degree)
-        plot_objects_Y.append(ax.plot(interp_time, interp_data_tmp, label=labelsY_interp[i], c=usable_color[color_iterator])[0])
-        color_iterator += 1
-    
-    
-    ### secondary axis ###
-    ax2 = ax.twinx()
-    
-    sec_y_label = _get_yString(labelsSecY_plot[1:])
-    if sec_y_label == None: sec_y_label = _get_yString(labelsSecY_interp[1:])
-    ax2.set_ylabel(sec_y_label)
-    
-    plot_objects_SecY = []
-    for i in range(1, subs_dataSecY_plot.shape[1]):
-        plot_objects_SecY.append(ax2.plot(subs_dataSecY_plot[:,0], subs_dataSecY_plot[:,i], label=labelsSecY_plot[i], c=usable_color[color_iterator])[0])
-        color_iterator += 1
-    
-    # interpolation plottings secYAxis
-    for i in range(1, subs_dataSecY_interp.shape[1]):
-        interp_time, interp_data_tmp = do_polyval(subs_dataSecY_interp[:,0], subs_dataSecY_interp[:,i], degree=interpolation_degree)
-        plot_objects_SecY.append(ax2.plot(interp_time, interp_data_tmp, label=labelsSecY_interp[i], c=usable_color[color_iterator])[0])
-        color_iterator += 1
         
-
     ### Get Labels     
-    lns = plot_objects_Y + plot_objects_SecY # added every line together
+    lns = plot_objects # added every line together
     labs = [l.get_label() for l in lns]
     ax.legend(lns, labs, loc="best")
     
@@ -159,7 +246,7 @@ def plot_twinAxis(data_object: ww, plotting_time_format: str, time_range: list,
     fig.autofmt_xdate() ## Rotate date labels automatically
     
     ax.grid(True)
-    plt.show()
+    _show_figure(fig, output_file)
 
 
     
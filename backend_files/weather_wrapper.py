@@ -1,9 +1,33 @@
 from backend_files._weather_object import weather_object as wo
-from os import walk
+from backend_files._weather_columns import weather_columns, weather_row
+from backend_files._weather_parser import read_export_file, iter_export_file
+from backend_files._weather_cache import load_cached_file, get_cache_directory
+from backend_files._weather_merge import get_merge_order, duplicate_policies
+from backend_files._weather_resample import resample_columns
+from backend_files._weather_pyramid import weather_pyramid, pyramid_levels
+from backend_files._weather_dataset import save_dataset, open_dataset
+from backend_files._weather_overlay import weather_overlay
+from backend_files._weather_stream import merge_chunk_streams
+from backend_files._weather_profiler import span
+from backend_files._weather_lru import lru_cache
+from backend_files._weather_fit import do_polyval, do_polyval_batch, get_day_offsets # still importable from here
+from backend_files._weather_trend import get_trends
+from os import walk, stat, makedirs
+from os.path import abspath, dirname
+from hashlib import sha1
+import json
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait
 from datetime import datetime
 
-from numpy import array, sort, unique
-from numpy import polyval, polyfit, isfinite, flip # für "Sonstiges"
+from numpy import array, searchsorted, maximum, concatenate, full, zeros, isin, column_stack, argsort, int32
+from numpy import isfinite, delete # für "Sonstiges"
+
+
+subscript_outputs = ["rows", "columns"]
+_progress_interval = 0.2 # seconds between two progress reports while waiting for a worker process
+_progress_chunk_size = 10000 # lines parsed at once (peak memory of parsing), one progress report each
+_dataset_pyramid_name = "pyramid.npz" # pyramid of a dataset, inside of its folder
 
 
 class weather_wrapper(object):
@@ -30,72 +54,300 @@ class weather_wrapper(object):
                      "WindLevel": "Windlevel",
                      "WindGustLevel": "Windböenlevel"}
     
-    def _get_data(self, file_endings, separator, directory, data_names, time_format):
-        file_names = self._get_file_names(file_endings, directory)
+    def _get_data(self, file_paths, progress_callback=None):
+        # returns the loaded files as one (unsorted) column-object and the index of the file (in file_paths) of every row
+        if self._workers is None or self._workers <= 1 or len(file_paths) <= 1:
+            tmp_data = []
+            for file_path in file_paths:
+                chunk_callback = None if progress_callback is None else partial(_report_progress, progress_callback, tmp_data, len(file_paths))
+                tmp_data.append(self._load_function(file_path, chunk_callback=chunk_callback))
+                _report_progress(progress_callback, tmp_data, len(file_paths))
+        else:
+            executor = ProcessPoolExecutor(max_workers=min(self._workers, len(file_paths)))
+            futures = [executor.submit(self._load_function, file_path) for file_path in file_paths]
+            try:
+                tmp_data = []
+                for future in futures: # in the order of the files -> same result as serial
+                    while not progress_callback is None and len(wait([future], timeout=_progress_interval).done) == 0:
+                        _report_progress(progress_callback, tmp_data, len(file_paths)) # can cancel while waiting
+                    tmp_data.append(future.result())
+                    _report_progress(progress_callback, tmp_data, len(file_paths))
+            finally: # e.g. cancelled by the progress_callback -> do not wait for the other files
+                for future in futures: future.cancel()
+                executor.shutdown(wait=False)
         
-        tmp_data = []
+        tmp_files = [full(one_file_data.size(), i, dtype=int32) for i, one_file_data in enumerate(tmp_data)]
         
-        for filename in file_names:
-            with open(directory + filename) as file:
-                lines = [line.rstrip() for line in file]
-                one_file_data = []
-                
-                for i, line in enumerate(lines):
-                    if i == 0:
-                        first_line = line
-                        continue
-                    if line in ["", "\x00", " "]: # line is empty...
-                        continue
-                    
-                    tmp_object = wo(line, separator, data_names, time_format=time_format)
-                    one_file_data.append(tmp_object)
-                
-                one_file_data = convert_to_std_units(one_file_data, first_line, separator=separator) # ex: km/h should be converted to m/s
-                tmp_data += one_file_data
-                    
-        return array(tmp_data)
+        if len(tmp_data) == 0:
+            return weather_columns.allocate(self._data_names), zeros(0, dtype=int32)
+        return weather_columns.concatenate(tmp_data), concatenate(tmp_files)
     
     
     
     def __init__(self, file_endings=[".txt", ".csv"], separator=";", directory="weather_files/", data_names=None,
-                 time_format=None, sort_elements=True, remove_duplicates=True):
+                 time_format=None, sort_elements=True, remove_duplicates=True, duplicate_policy="first", use_cache=True,
+                 cache_directory=None, workers=None, build_pyramid=False, dataset_directory=None, progress_callback=None,
+                 result_cache_bytes=64 * 2**20):
         
         if not directory.endswith("/"): directory += "/"
-        
-        self._data = self._get_data(file_endings, separator, directory, data_names, time_format)
+        if data_names is None: data_names = wo._data_names
+        if cache_directory is None: cache_directory = get_cache_directory(directory)
+        if not use_cache: cache_directory = None
         
         if remove_duplicates: 
             assert sort_elements, "if duplicates should get removed, array must be sorted"
-            self._data = unique(self._data)
-        else:
-            if sort_elements: self._data = sort(self._data) # sorts through implemented-overwritten comparison methods
+        assert duplicate_policy in duplicate_policies, f"duplicate_policy must be one of {duplicate_policies}"
+        
+        self._directory = directory
+        self._file_endings = file_endings
+        self._data_names = data_names
+        self._sort_elements = sort_elements
+        self._remove_duplicates = remove_duplicates
+        self._duplicate_policy = duplicate_policy
+        self._workers = workers
+        self._cache_directory = cache_directory
+        self._load_function = partial(_load_one_file, data_names=data_names, separator=separator, time_format=time_format,
+                                      cache_directory=cache_directory) # picklable for worker processes
+        
+        self._version = 0 # increases with every change of the loaded data
+        self._file_states = {} # file path -> (size, modification time) when it was loaded
+        self._file_ranges = {} # file path -> (first, last) time as int of its rows (before removing duplicates)
+        self._source_files = [] # source-id -> file path
+        self._sources = zeros(0, dtype=int32) # source-id of every loaded row (without the rows of an opened dataset)
+        self._data = weather_columns.allocate(data_names)
+        
+        self._build_pyramid = build_pyramid and sort_elements
+        self._pyramid, self._pyramid_version = None, -1
+        
+        self._dataset_id, self._dataset_directory, self._dataset_version = None, None, -1
+        self._result_cache, self._result_cache_version = lru_cache(max_bytes=result_cache_bytes), 0 # subscript_data/get_trends
+        if not dataset_directory is None: self._open_dataset(dataset_directory) # memory-mapped, export files get merged on top (see weather_overlay)
+        
+        self.add_files(self._get_file_paths(), progress_callback=progress_callback)
+        if self._build_pyramid: self.get_pyramid() # once at load time (or from the cache-directory)
+    
+    @classmethod
+    def from_dataset(cls, dataset_directory: str, **kwargs):
+        '''
+        Opens a dataset written by save_dataset() memory-mapped: startup does not depend on the size
+        of the archive, queries only read the pages of the requested time range.
+        '''
+        kwargs.setdefault("directory", dataset_directory) # no export files inside of the dataset itself
+        return cls(dataset_directory=dataset_directory, **kwargs)
     
     ### ---- Public Methods ----- ###
     
     def size(self):
-        return len(self._data)
+        return self._data.size()
     
     def subscript_data(self, index_strings, start_date=datetime(2000, 1, 1), end_date=datetime(3000, 12, 31),
-                       include_labeling=True, for_interpolation=False):
-        
+                       include_labeling=True, for_interpolation=False, output="rows"):
+        '''
+        Values of the given keys with start_date < time <= end_date.
+        output="rows": new 2d-array with one row per measurement (python objects, None for missing values).
+        output="columns": key -> typed array, read-only zero-copy views for numpy-code (categories as codes,
+        see weather_columns.get_arrays).
+        '''
+        assert output in subscript_outputs, f"output must be one of {subscript_outputs}"
         start_index, stop_index = self._get_indizes(start_date, end_date)
         
-        return_array = []
-        for i in range(start_index, stop_index):
-            tmp_data_entries = [self._data[i][key] for key in index_strings]
-            return_array.append(tmp_data_entries)
-            
+        if output == "columns":
+            with span("subscript_columns", rows=stop_index - start_index):
+                return_arrays = self._data.get_arrays(index_strings, start_index, stop_index)
+            if include_labeling: return return_arrays, self._get_labels(index_strings, for_interpolation=for_interpolation)
+            return return_arrays
+        
+        cache_key = ("subscript", tuple(index_strings), start_index, stop_index, self._version)
+        return_array = self._get_result_cache().get(cache_key)
+        if return_array is None:
+            with span("subscript", rows=stop_index - start_index):
+                return_array = self._data.get_rows(index_strings, start_index, stop_index)
+            return_array.flags.writeable = False # the cached array never reaches a caller
+            self._result_cache.put(cache_key, return_array)
+        return_array = return_array.copy() # own, writeable array of every caller (the values themselves are immutable)
+        
         if include_labeling:
-            return array(return_array), self._get_labels(index_strings, for_interpolation=for_interpolation)
+            return return_array, self._get_labels(index_strings, for_interpolation=for_interpolation)
         else:
-            return array(return_array)
+            return return_array
+        
+    def add_files(self, file_paths: list, progress_callback=None):
+        '''
+        Parses the given files and merges them into the already loaded (sorted) data.
+        Already loaded files get replaced by their new content.
         
+        progress_callback(loaded_files, file_count, loaded_rows) gets called after every file and every chunk of a
+        file, an exception raised inside of it cancels the loading (the already loaded data stays unchanged).
+        '''
+        file_paths = list(file_paths)
+        if len(file_paths) == 0: return []
+        
+        new_data, new_files, file_states = self._load_files(file_paths, progress_callback=progress_callback)
+        self._insert_files(file_paths, new_data, new_files, file_states)
+        return file_paths
+    
+    def refresh(self, progress_callback=None):
+        '''
+        Loads new or changed files of the directory and removes the data of deleted files.
+        Returns the paths of every added, changed or removed file (empty if nothing changed).
+        
+        Rows of other files can have lost the duplicate-removal against the old rows of these files ->
+        every file overlapping their time ranges gets reloaded too (same result as loading the folder again).
+        '''
+        return self.apply_changes(self.load_changes(progress_callback=progress_callback))
+    
+    def load_changes(self, progress_callback=None):
+        '''
+        Parsing part of refresh(), does not change the wrapper at all (e.g. in a background thread while
+        the data gets used). Returns None if nothing changed, otherwise pass the result to apply_changes().
+        '''
+        file_paths = self._get_file_paths()
+        
+        removed_paths = [path for path in self._file_states if not path in file_paths]
+        changed_paths = [path for path in file_paths if self._file_states.get(path) != _get_file_state(path)]
+        if len(removed_paths) + len(changed_paths) == 0: return None
+        
+        new_data, new_files, file_states = self._load_files(changed_paths, progress_callback=progress_callback)
+        reload_paths = changed_paths
+        if self._remove_duplicates:
+            changed_ranges = [self._file_ranges.get(path) for path in removed_paths + changed_paths]
+            changed_ranges += list(self._get_file_ranges(changed_paths, new_data, new_files).values())
+            overlapping_paths = self._get_overlapping_paths(changed_ranges, removed_paths + changed_paths)
+            
+            if len(overlapping_paths) > 0:
+                overlapping_data, overlapping_files, overlapping_states = self._load_files(overlapping_paths,
+                                                                                          progress_callback=progress_callback)
+                file_states.update(overlapping_states)
+                reload_paths = [path for path in file_paths if path in file_states]
+                new_data, new_files = self._get_in_file_order(changed_paths + overlapping_paths, reload_paths,
+                                                              weather_columns.concatenate([new_data, overlapping_data]),
+                                                              concatenate([new_files, overlapping_files + len(changed_paths)]))
+        
+        return self._version, changed_paths, removed_paths, reload_paths, new_data, new_files, file_states
+    
+    def apply_changes(self, changes):
+        # merges the result of load_changes() (fast compared to parsing), returns the changed and removed paths
+        # every change of the wrapper happens here (in the thread that uses the data), including the source-ids
+        if changes is None: return []
+        version, changed_paths, removed_paths, reload_paths, new_data, new_files, file_states = changes
+        if version != self._version:
+            raise RuntimeError("the loaded data changed since load_changes() was called")
+        
+        if len(removed_paths) > 0:
+            self._remove_files(removed_paths)
+            self._version += 1
+        if len(reload_paths) > 0:
+            self._insert_files(reload_paths, new_data, new_files, file_states)
+        
+        return changed_paths + removed_paths
+    
+    def get_version(self):
+        return self._version
+    
+    def save_dataset(self, dataset_directory: str):
+        # binary dataset of the loaded data (one fixed-width file per data-name), open it with from_dataset()
+        # with build_pyramid, the pyramid gets saved into the dataset too -> opening the dataset does not build it again
+        assert self._sort_elements, "only sorted data can be saved as a dataset (the time-index needs sorted times)"
+        if not dataset_directory.endswith("/"): dataset_directory += "/"
+        dataset_id = save_dataset(self._data, dataset_directory)
+        if self._build_pyramid:
+            self.get_pyramid().save(dataset_directory + _dataset_pyramid_name, self._get_dataset_signature(dataset_id))
+    
+    def get_dataset_directory(self):
+        # dataset-folder with exactly the loaded data (opened by from_dataset, nothing added since), otherwise None
+        if self._dataset_version == self._version: return self._dataset_directory
+        return None
+    
+    def get_pyramid(self):
+        # pre-aggregated values (see _weather_pyramid), rebuilt after the data changed
+        if self._pyramid_version != self._version:
+            with span("pyramid", rows=self._data.size()):
+                self._pyramid = self._load_pyramid()
+            self._pyramid_version = self._version
+        return self._pyramid
+    
+    def get_pyramid_data(self, key: str, start_date, end_date, point_count: int):
+        '''
+        Minimum and maximum per interval of the coarsest pyramid-level that still has more than "point_count"
+        intervals inside of the time range. Returns None if no pyramid is used or no level is fine enough.
+        '''
+        if not self._build_pyramid: return None
+        
+        pyramid = self.get_pyramid()
+        if not key in pyramid.keys: return None
+        
+        level = pyramid.get_level(start_date, end_date, point_count)
+        if level is None: return None
+        return pyramid.get_minmax_values(level, key, start_date, end_date)
+    
+    def resample(self, keys: list, freq: str, aggs=None, start_date=datetime(2000, 1, 1), end_date=datetime(3000, 12, 31)):
+        '''
+        Aggregated values of the given keys per time-interval (e.g. freq="d" for daily values).
+        aggs: None (default per key, e.g. "max" for gusts), one aggregation for all keys or a dict key -> aggregation.
+        See _weather_resample.aggregation_names for the possible aggregations.
+        
+        Returns the starting times of the intervals (datetime64) and a dict key -> aggregated values.
+        '''
+        start_index, stop_index = self._get_indizes(start_date, end_date)
+        return resample_columns(self._data.slice(start_index, stop_index), keys, freq, aggs=aggs)
+    
+    def get_trends(self, keys: list, start_date, end_date, method="polynomial", degree=1, window="1d"):
+        '''
+        Trend lines of the keys inside of the time range (see _weather_trend.get_trends). Every key gets cached
+        on its own -> after changing the selection only the newly selected keys get fitted.
+        '''
+        start_index, stop_index = self._get_indizes(start_date, end_date)
+        cache = self._get_result_cache()
+        cache_keys = [("trend", key, start_index, stop_index, self._version, method, degree, window) for key in keys]
+        ret_trends = [cache.get(cache_key) for cache_key in cache_keys]
+        
+        missing_keys = [key for key, trend in zip(keys, ret_trends) if trend is None]
+        if len(missing_keys) > 0:
+            subs_data = self._data.get_arrays(["Time"] + missing_keys, start_index, stop_index)
+            values = column_stack([subs_data.get_values(key) for key in missing_keys]) # typed columns -> no python objects per value
+            new_trends = iter(get_trends(subs_data["Time"], values, method=method, degree=degree, window=window))
+            for i, cache_key in enumerate(cache_keys):
+                if not ret_trends[i] is None: continue
+                ret_trends[i] = next(new_trends)
+                for values in ret_trends[i]: values.flags.writeable = False
+                cache.put(cache_key, ret_trends[i])
+        
+        return [(times.copy(), values.copy()) for times, values in ret_trends] # like subscript_data: own arrays of every caller
+    
+    def get_result_cache_stats(self):
+        # hits, misses, evictions, entries and bytes of the cache of subscript_data/get_trends
+        return self._result_cache.get_stats()
+    
     def get_possible_labels(self, time_key="Time"):
-        indizes = self._data[0]._data_names.copy() # choose one shared representative "label-array"
+        indizes = self._data.data_names.copy()
         if time_key in indizes: indizes.remove(time_key)
         
         return self._get_labels(indizes)
     
+    def get_index_ranges(self, start_dates: list, end_dates: list):
+        '''
+        Resolves many time-windows at once via binary search on the sorted "Time"-column.
+        Returns two integer arrays, data[start_indizes[i]:stop_indizes[i]] contains all measurements
+        with start_dates[i] < time <= end_dates[i].
+        '''
+        start_dates = array(start_dates, dtype=weather_columns._time_dtype).reshape(-1)
+        end_dates = array(end_dates, dtype=weather_columns._time_dtype).reshape(-1)
+        assert start_dates.shape == end_dates.shape, "there must be as many starting as ending dates"
+        
+        with span("range_lookup", rows=start_dates.shape[0]):
+            if not self._dataset_id is None: # memory-mapped dataset -> only reads one block per date
+                start_indizes = self._data.searchsorted(start_dates, side="right")
+                stop_indizes = self._data.searchsorted(end_dates, side="right")
+            else:
+                times = self._data.column("Time")
+                start_indizes = searchsorted(times, start_dates, side="right")
+                stop_indizes = searchsorted(times, end_dates, side="right")
+        
+        return start_indizes, maximum(start_indizes, stop_indizes)
+    
+    def get_labels(self, index_strings: list, for_interpolation=False):
+        return self._get_labels(index_strings, for_interpolation=for_interpolation)
+    
     def get_keys_from_labels(self, labels):
         def key_from_value(tmp_dict, value):
             keys = tmp_dict.keys()
@@ -135,140 +387,320 @@ class weather_wrapper(object):
                 
         return return_labels
     
+    def _get_result_cache(self):
+        # results of an older data-version can never be used again
+        if self._result_cache_version != self._version:
+            self._result_cache.clear()
+            self._result_cache_version = self._version
+        return self._result_cache
+    
     def _get_indizes(self, start_date, end_date):
         assert start_date < end_date, "starting date must be before ending date"
         
-        ret_start = 0
-        ret_stop = self._data.size
-        
-        for i in range(ret_stop):
-            if self._data[i] > start_date:
-                ret_start = i
-                break
-        for i in range(ret_start, ret_stop):
-            if self._data[i] > end_date:
-                ret_stop = i
-                break
-            
-        return ret_start, ret_stop
+        start_indizes, stop_indizes = self.get_index_ranges([start_date], [end_date])
+        return int(start_indizes[0]), int(stop_indizes[0])
+    
+    def _load_files(self, file_paths: list, progress_callback=None):
+        # (unsorted data, index of the file in file_paths of every row, file states) of the given files
+        file_states = {path: _get_file_state(path) for path in file_paths} # before loading -> later changes get detected
+        with span("load_files", bytes_read=sum(size for size, mtime in file_states.values())) as current:
+            new_data, new_files = self._get_data(file_paths, progress_callback=progress_callback)
+            current.set(rows=new_data.size())
+        return new_data, new_files, file_states
+    
+    def _insert_files(self, file_paths: list, new_data, new_files, file_states: dict):
+        # replaces the old content of the files by new_data (rows in the order of file_paths, new_files: index into file_paths)
+        self._remove_files([path for path in file_paths if path in self._file_states]) # old content of reloaded files
+        self._file_ranges.update(self._get_file_ranges(file_paths, new_data, new_files))
+        new_sources = array([self._get_source_id(path) for path in file_paths], dtype=int32)[new_files]
+        if self._sort_elements:
+            with span("sort_dedup", rows=new_data.size()):
+                order = new_data.get_sort_order(remove_duplicates=self._remove_duplicates, duplicate_policy=self._duplicate_policy)
+                new_data, new_sources = new_data.take(order), new_sources[order]
+        
+        with span("merge", rows=self._data.size() + new_data.size()):
+            self._merge_data(new_data, new_sources)
+        self._file_states.update(file_states)
+        self._version += 1
+    
+    def _get_file_ranges(self, file_paths: list, new_data, new_files):
+        # path -> (first, last) time as int of its rows in new_data (None without valid times)
+        times = new_data.time_as_int()
+        valid = ~new_data.missing_mask("Time")
+        ret_ranges = {}
+        for i, path in enumerate(file_paths):
+            file_times = times[valid & (new_files == i)]
+            ret_ranges[path] = (int(file_times.min()), int(file_times.max())) if file_times.shape[0] > 0 else None
+        return ret_ranges
+    
+    def _get_overlapping_paths(self, time_ranges: list, exclude_paths: list):
+        # loaded files overlapping one of the time ranges or (transitively) one of the files found that way
+        time_ranges = [time_range for time_range in time_ranges if not time_range is None]
+        ret_paths = []
+        found = True
+        while found:
+            found = False
+            for path, file_range in self._file_ranges.items():
+                if file_range is None or path in exclude_paths or path in ret_paths: continue
+                if any(file_range[0] <= stop and start <= file_range[1] for start, stop in time_ranges):
+                    ret_paths.append(path)
+                    time_ranges.append(file_range)
+                    found = True
+        return ret_paths
+    
+    def _get_in_file_order(self, loaded_paths: list, file_paths: list, new_data, new_files):
+        # stable reordering of the rows by the position of their file in file_paths (new_files: index into loaded_paths)
+        file_positions = array([file_paths.index(path) for path in loaded_paths], dtype=int32)[new_files]
+        order = argsort(file_positions, kind="stable")
+        return new_data.take(order), file_positions[order]
+    
+    def _merge_data(self, new_data, new_sources):
+        # both (self._data and new_data) are sorted -> merge instead of sorting everything again
+        if not self._dataset_id is None: # only the new rows get merged, the memory-mapped dataset stays untouched
+            order = self._data.insert(new_data, remove_duplicates=self._remove_duplicates, duplicate_policy=self._duplicate_policy)
+            self._sources = concatenate([self._sources, new_sources])[order]
+            return
+        
+        combined_data = weather_columns.concatenate([self._data, new_data])
+        combined_sources = concatenate([self._sources, new_sources])
+        
+        if not self._sort_elements:
+            self._data, self._sources = combined_data, combined_sources
+            return
+        
+        order = get_merge_order(self._data.time_as_int(), new_data.time_as_int())
+        if self._remove_duplicates: # on equal times, the already loaded row comes first
+            order = order[combined_data.get_duplicate_mask(order, self._duplicate_policy)]
+        
+        self._data, self._sources = combined_data.take(order), combined_sources[order]
+    
+    def _open_dataset(self, dataset_directory: str):
+        assert self._sort_elements, "a dataset can only be opened with sorted data (the time-index needs sorted times)"
+        if not dataset_directory.endswith("/"): dataset_directory += "/"
+        columns, time_index, header = open_dataset(dataset_directory)
+        self._data = weather_overlay(columns, time_index, time_key=header["time_key"])
+        self._dataset_id, self._dataset_directory = header["id"], dataset_directory
+        
+        self._version += 1
+        self._dataset_version = self._version
+    
+    def _load_pyramid(self):
+        if self._dataset_version == self._version: # exactly the opened dataset -> pyramid inside of its folder (see save_dataset)
+            return self._load_saved_pyramid(self._dataset_directory + _dataset_pyramid_name, self._get_dataset_signature(self._dataset_id))
+        if self._cache_directory is None:
+            return weather_pyramid.build(self._data)
+        
+        pyramid_path = self._cache_directory + "pyramid." + sha1(abspath(self._directory).encode("utf-8")).hexdigest()[:12] + ".npz"
+        return self._load_saved_pyramid(pyramid_path, self._get_data_signature())
+    
+    def _load_saved_pyramid(self, pyramid_path: str, signature: str):
+        # builds and saves the pyramid if the file is missing or belongs to other data
+        pyramid = weather_pyramid.load(pyramid_path, signature)
+        if pyramid is None:
+            pyramid = weather_pyramid.build(self._data)
+            try:
+                makedirs(dirname(pyramid_path), exist_ok=True)
+                pyramid.save(pyramid_path, signature)
+            except OSError as error: # e.g. read-only folder, works without cache
+                print(f"Warning: could not write pyramid-file \"{pyramid_path}\" ({error})")
+        return pyramid
+    
+    def _get_data_signature(self):
+        # changes with every loaded file or loading parameter
+        signature = [sorted(self._file_states.items()), self._dataset_id, self._data_names, self._remove_duplicates, self._duplicate_policy, pyramid_levels]
+        return sha1(json.dumps(signature).encode("utf-8")).hexdigest()
+    
+    def _get_dataset_signature(self, dataset_id: str):
+        # pyramid of a dataset: only depends on its rows
+        return sha1(json.dumps([dataset_id, pyramid_levels]).encode("utf-8")).hexdigest()
+    
+    def _remove_files(self, file_paths: list):
+        remove_ids = [self._source_files.index(path) for path in file_paths if path in self._source_files]
+        if len(remove_ids) > 0:
+            keep = ~isin(self._sources, remove_ids)
+            if not self._dataset_id is None: self._data.keep_rows(keep) # only rows merged on top of the dataset
+            else: self._data = self._data.take(keep)
+            self._sources = self._sources[keep]
+        
+        for path in file_paths:
+            self._file_states.pop(path, None)
+            self._file_ranges.pop(path, None)
+    
+    def _get_source_id(self, file_path: str):
+        if not file_path in self._source_files:
+            self._source_files.append(file_path)
+        return self._source_files.index(file_path)
+    
+    def _get_file_paths(self):
+        with span("discover_files") as current:
+            file_paths = [self._directory + filename for filename in self._get_file_names(self._file_endings, self._directory)]
+            current.set(rows=len(file_paths))
+        return file_paths
     
     def _ends_with(self, name_str, name_array):
-        for name in name_array:
-            if name_str.endswith(name):
-                return True
-        return False
+        return ends_with(name_str, name_array)
     
     def _get_file_names(self, file_endings, directory):
-        directory_structure = next(walk(directory), (None, None, []))[2]  # [] if no file
-        file_names = []
-        for tmp_filename in directory_structure:
-            if self._ends_with(tmp_filename, file_endings): file_names.append(str(tmp_filename))
-        return file_names
+        return get_file_names(file_endings, directory)
     
     def __getitem__(self, key):
-        #assert isinstance(key, ), "keyword must be a valid data-name-entry"
-        return self._data[key]
+        # returns the measurement(s) at the given position (accessible like a weather_object)
+        if isinstance(key, slice):
+            return [weather_row(self._data, i) for i in range(*key.indices(self.size()))]
+        
+        if key < 0: key += self.size()
+        if not 0 <= key < self.size(): raise IndexError("index out of range")
+        return weather_row(self._data, key)
     
     
     
 
 ### Sonstige Methoden zur Datenverarbeitung ###
 
+def load_export_file(file_path: str, data_names: list, separator=";", time_format=None, chunk_callback=None):
+    # reads one export and converts it to standard units (ex: km/h should be converted to m/s)
+    # chunk_callback(parsed_rows) gets called after every chunk of the file, e.g. for progress and cancellation
+    with span("parse", bytes_read=stat(file_path).st_size) as current:
+        one_file_data, first_line = read_export_file(file_path, data_names, separator=separator, time_format=time_format,
+                                                     chunk_size=_progress_chunk_size, chunk_callback=chunk_callback)
+        current.set(rows=one_file_data.size())
+    if one_file_data.size() == 0:
+        return one_file_data
+    
+    with span("convert_units", rows=one_file_data.size()):
+        return convert_to_std_units(one_file_data, first_line, separator=separator)
+
+def iter_weather_chunks(directory="weather_files/", file_endings=[".txt", ".csv"], separator=";", data_names=None, time_format=None,
+                        chunk_size=50000, remove_duplicates=True, duplicate_policy="first"):
+    '''
+    Streams every export of the directory as time-sorted weather_columns-chunks of "chunk_size" rows
+    (converted to standard units, duplicates removed like in weather_wrapper) without loading the whole archive.
+    Overlapping files get merged (k-way), the memory only depends on the chunk size and the overlapping files.
+    '''
+    if not directory.endswith("/"): directory += "/"
+    if data_names is None: data_names = wo._data_names
+    assert duplicate_policy in duplicate_policies, f"duplicate_policy must be one of {duplicate_policies}"
+    
+    chunk_functions = [partial(iter_export_chunks, directory + filename, data_names, separator=separator, time_format=time_format,
+                               chunk_size=chunk_size) for filename in get_file_names(file_endings, directory)]
+    
+    return merge_chunk_streams(chunk_functions, chunk_size=chunk_size, remove_duplicates=remove_duplicates,
+                               duplicate_policy=duplicate_policy)
+
+def iter_export_chunks(file_path: str, data_names: list, separator=";", time_format=None, chunk_size=50000):
+    # chunked version of load_export_file (units of the header are converted for every chunk)
+    for one_chunk, first_line in iter_export_file(file_path, data_names, separator=separator, time_format=time_format,
+                                                  chunk_size=chunk_size):
+        yield convert_to_std_units(one_chunk, first_line, separator=separator)
+
+def get_file_names(file_endings: list, directory: str):
+    directory_structure = next(walk(directory), (None, None, []))[2]  # [] if no file
+    file_names = []
+    for tmp_filename in directory_structure:
+        if ends_with(tmp_filename, file_endings): file_names.append(str(tmp_filename))
+    return file_names
+
+def ends_with(name_str: str, name_array: list):
+    for name in name_array:
+        if name_str.endswith(name):
+            return True
+    return False
+
+def _report_progress(progress_callback, loaded_data: list, file_count: int, parsed_rows=0):
+    # parsed_rows: rows of the file that is currently parsed
+    if progress_callback is None: return
+    progress_callback(len(loaded_data), file_count, sum(one_file_data.size() for one_file_data in loaded_data) + parsed_rows)
+
+def _get_file_state(file_path: str):
+    file_stat = stat(file_path)
+    return file_stat.st_size, file_stat.st_mtime_ns
+
+def _load_one_file(file_path: str, data_names: list, separator=";", time_format=None, cache_directory=None, chunk_callback=None):
+    # module-level (picklable) to be usable in worker processes, returns only typed columns
+    load_function = partial(load_export_file, data_names=data_names, separator=separator, time_format=time_format,
+                            chunk_callback=chunk_callback)
+    if cache_directory is None:
+        return load_function(file_path)
+    
+    cache_parameters = str([separator, data_names, time_format]) # cache-files are only valid for the same parsing
+    with span("load_cached_file") as current: # contains "parse" if the cache-file is missing or outdated
+        one_file_data = load_cached_file(file_path, cache_directory, load_function, cache_parameters)
+        current.set(rows=one_file_data.size())
+    return one_file_data
+
 def remove_indizes_from_list(value_list: list, rm_list):
-    
-    value_list = array(value_list).tolist()
-    
-    reversed_sorted_indizes = flip(sort(rm_list))
-    for index in reversed_sorted_indizes:
-        value_list.pop(index)
-        
-    return array(value_list)
+    return delete(array(value_list), array(rm_list, dtype=int)) # one pass instead of list.pop per index
     
 def clear_nan_values(x_data, y_data):
-    # clears nan values in y_data
-    
-    nan_indizes = []
-    tmp_ar = array(y_data.copy(), dtype=float)
-    
-    for i in range(tmp_ar.shape[0]):
-        if not isfinite([tmp_ar[i]]):
-            nan_indizes.append(i)
-            
-    return remove_indizes_from_list(x_data, nan_indizes), remove_indizes_from_list(y_data, nan_indizes)
+    # clears nan values in y_data (boolean mask instead of element by element)
+    y_data = array(y_data, dtype=float) # None -> nan
+    valid = isfinite(y_data)
+    return array(x_data)[valid], y_data[valid]
     
+### more helper methods ###
+standard_units = {"No": "No",
+                  "Time": "Zeit",
+                  "MeasureInterval": "mi",
+                  "HumidityInside": "%",
+                  "TemperatureInside": "°C",
+                  "HumidityOutside": "%",
+                  "TemperatureOutside": "°C",
+                  "PressureAbsolute": "hpa",
+                  "WindSpeed": "m/s",
+                  "WindGustSpeed": "m/s",
+                  "WindDirection": "Richtung",
+                  "PressureRelative": "hpa",
+                  "DewPoint": "°C",
+                  "WindChill": "°C",
+                  "RainfallHourly": "mm",
+                  "RainfallDaily": "mm",
+                  "RainfallWeekly": "mm",
+                  "RainfallMonthly": "mm",
+                  "RainfallTotal": "mm",
+                  "WindLevel": "bft",
+                  "WindGustLevel": "bft"}
 
-def do_polyval(times: list, data: list, degree=1): # übergebe auf erster Achse die Zeitobjekte, auf der zweiten die zu fittenden Daten
+# (current unit, desired unit) -> (scale, offset), desired = current * scale + offset
+# units are compared in lower case (e.g. "Hpa" from older versions is the same as "hpa")
+unit_conversions = {("km/h", "m/s"): (1 / 3.6, 0.0),
+                    ("m/s", "km/h"): (3.6, 0.0),
+                    ("mph", "m/s"): (0.44704, 0.0),
+                    ("knots", "m/s"): (1852.0 / 3600.0, 0.0),
+                    ("kn", "m/s"): (1852.0 / 3600.0, 0.0),
+                    ("ft/s", "m/s"): (0.3048, 0.0),
+                    ("mm", "m"): (1 / 1000.0, 0.0),
+                    ("m", "mm"): (1000.0, 0.0),
+                    ("in", "mm"): (25.4, 0.0),
+                    ("inhg", "hpa"): (33.8638866667, 0.0),
+                    ("mmhg", "hpa"): (1.33322387415, 0.0),
+                    ("mbar", "hpa"): (1.0, 0.0),
+                    ("°f", "°c"): (5 / 9, -32 * 5 / 9)}
 
-    starting_time = times[0]
-    seconds_per_day = 86400
-    
-    times, data = clear_nan_values(times, data)
-    
-    time_as_timestamp = array([(times[i]-starting_time).total_seconds() / seconds_per_day for i in range(times.shape[0])], dtype="float")
-    data = array(data, dtype="float")
-    
-    fit_constants = polyfit(time_as_timestamp, data, degree)
-    ret_eval = polyval(fit_constants, time_as_timestamp)
-    
-    return times, ret_eval
-    
-    
+
+def get_conversion_factors(current_unit: str, desired_unit: str):
+    current_unit, desired_unit = _normalize_unit(current_unit), _normalize_unit(desired_unit)
+    if current_unit == desired_unit:
+        return 1.0, 0.0
     
+    if (current_unit, desired_unit) in unit_conversions:
+        return unit_conversions[(current_unit, desired_unit)]
     
-### more helper methods ###
+    print(f"Error: desired conversion ({current_unit}->{desired_unit}) not available, using identity!")
+    return 1.0, 0.0
+
 def get_conversion_function(current_unit: str, desired_unit: str):
-    if current_unit == desired_unit:
-        print("Warning: returning \"no conversion\" (should not happen normally)!")
-        return lambda x: x # nothing happens (this case should not occur)
-    
-    if current_unit=="km/h":
-        if desired_unit=="m/s":
-            return lambda x: x / 3.6
-    if current_unit=="m/s":
-        if desired_unit=="km/h":
-            return lambda x: x * 3.6
-    if current_unit=="mm":
-        if desired_unit=="m":
-            return lambda x: x / 1000.0
-    if current_unit=="m":
-        if desired_unit=="mm":
-            return lambda x: x * 1000.0
-        
-    if current_unit=="Hpa":
-        if desired_unit=="hpa": # to ensure compatibility for older versions
-            return lambda x: x
-    
-    print(f"Error: desired conversion ({current_unit}->{desired_unit}) not available, returning identity function!")
-    return lambda x: x
-        
-def apply_function_to_all_values(values: list, value_key: str, function: callable):
-    for i in range(len(values)):
-        values[i]._apply_func_to_value(value_key, function)
+    scale, offset = get_conversion_factors(current_unit, desired_unit)
+    return lambda x: x * scale + offset # works for single values and whole numpy-columns
+        
+def apply_function_to_all_values(values: weather_columns, value_key: str, function: callable):
+    values.set_column(value_key, function(values.column(value_key))) # functions work on whole numpy-columns
     return values
 
-def convert_to_std_units(values: list, first_line: str, separator=";"):
-    standard_units = {"No": "No",
-                      "Time": "Zeit",
-                      "MeasureInterval": "mi",
-                      "HumidityInside": "%",
-                      "TemperatureInside": "°C",
-                      "HumidityOutside": "%",
-                      "TemperatureOutside": "°C",
-                      "PressureAbsolute": "hpa",
-                      "WindSpeed": "m/s",
-                      "WindGustSpeed": "m/s",
-                      "WindDirection": "Richtung",
-                      "PressureRelative": "hpa",
-                      "DewPoint": "°C",
-                      "WindChill": "°C",
-                      "RainfallHourly": "mm",
-                      "RainfallDaily": "mm",
-                      "RainfallWeekly": "mm",
-                      "RainfallMonthly": "mm",
-                      "RainfallTotal": "mm",
-                      "WindLevel": "bft",
-                      "WindGustLevel": "bft"}
-    
+def get_unit_conversions(first_line: str, data_names: list, separator=";"):
+    '''
+    Reads the units of the header line and returns [(data-name, scale, offset)] for every
+    column that is not in its standard unit (ex: km/h should be converted to m/s).
+    '''
     used_units = first_line.split(separator)
     for i, title in enumerate(used_units):
         if not "(" in title:
@@ -276,17 +708,30 @@ def convert_to_std_units(values: list, first_line: str, separator=";"):
         from_index = title.rindex("(") + 1
         used_units[i] = title[from_index:-1]
     
-    tmp_data_names = values[0]._data_names # to iterate through data names and find the right key
-    
-    for _used, value_key in zip(used_units, tmp_data_names):
-        _desired = standard_units[value_key]
-        if _used == _desired:
+    ret_conversions = []
+    for _used, value_key in zip(used_units, data_names):
+        _desired = standard_units.get(value_key, _used)
+        if _normalize_unit(_used) == _normalize_unit(_desired):
             continue
         
-        conversion_function = get_conversion_function(_used, _desired)
-        values = apply_function_to_all_values(values, value_key, conversion_function) # lieber doppelt gemoppelt zugewiesen...
+        scale, offset = get_conversion_factors(_used, _desired)
+        if scale != 1.0 or offset != 0.0:
+            ret_conversions.append((value_key, scale, offset))
+    
+    return ret_conversions
+
+def convert_to_std_units(values: weather_columns, first_line: str, separator=";"):
+    # conversion table gets computed once per file, then applied to the whole columns
+    for value_key, scale, offset in get_unit_conversions(first_line, values.data_names, separator=separator):
+        column = values.column(value_key)
+        if column.dtype.kind != "f": continue # numbering, time and categories have no units
+        column *= scale # in place, the columns of a freshly parsed file are not shared
+        column += offset
     
     return values
+
+def _normalize_unit(unit: str):
+    return unit.strip().lower().replace("º", "°")
     
     
     
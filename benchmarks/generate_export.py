@@ -0,0 +1,155 @@
+from os import makedirs
+from os.path import isfile, join
+from datetime import datetime
+
+from numpy import arange, array, empty, sin, pi, round as np_round, datetime64, datetime_as_string, int64
+from numpy.random import default_rng
+
+
+# the two header versions of EasyWeather (like in backend_files/weather_files)
+export_formats = {
+    "de": {"header": "No;Zeit;Intervall(mi);innen Luftfeuchtigkeit(%);innen Temperatur(°C);außen Luftfeuchtigkeit(%);"
+                     "außen Temperatur(°C);absolut Luftdruck(Hpa);Wind(m/s);Windbö\"(m/s);Richtung;relative Luftdruck(Hpa);"
+                     "Taupunkt(°C);Windauskühlung(°C);Stunde Niederschlag(mm);24 Stunde Niederschlag(mm);Woche Niederschlag(mm);"
+                     "Monat Niederschlag(mm);Total Niederschlag(mm);Wind Level(bft);Windbö Level(bft)",
+           "time_format": "%d-%m-%Y %H:%M",
+           "wind_factor": 1.0, # m/s
+           "wind_levels": True},
+    "en": {"header": "NO.(No);Time(Zeit);Interval(mi);Indoor Humidity(%);Indoor Temperature(°C);Outdoor Humidity(%);"
+                     "Outdoor Temperature(°C);Absolute Pressure(hpa);Wind Speed(km/h);Gust(km/h);Wind Direction(Richtung);"
+                     "Relative Pressure(hpa);DewPoint(°C);WindChill(°C);Hour Rainfall(mm);24 Hour Rainfall(mm);Week Rainfall(mm);"
+                     "Month Rainfall(mm);Total Rainfall(mm)",
+           "time_format": "%d.%m.%Y %H:%M:%S",
+           "wind_factor": 3.6, # km/h
+           "wind_levels": False}}
+
+wind_directions = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+
+_file_encoding = "latin-1"
+_chunk_rows = 100000 # rows per write -> memory independent of the file size
+_iso_positions = {"Y": (0, 4), "m": (5, 7), "d": (8, 10), "H": (11, 13), "M": (14, 16), "S": (17, 19)} # in "YYYY-MM-DDTHH:MM:SS"
+
+
+def write_export_file(file_path: str, rows: int, export_format="de", start_time=datetime(2015, 1, 1), interval_minutes=5,
+                      first_number=1, gap_fraction=0.01, seed=0):
+    '''
+    Writes a synthetic EasyWeather export with "rows" measurements every "interval_minutes" from start_time on.
+    export_format: "de" (old header, "%d-%m-%Y %H:%M", m/s) or "en" (new header, "%d.%m.%Y %H:%M:%S", km/h).
+    A fraction of "gap_fraction" of the measured values is "---" (missing), like sensor outages in real exports.
+    '''
+
+    assert export_format in export_formats, f"export_format must be one of {list(export_formats)}"
+    settings = export_formats[export_format]
+    rng = default_rng(seed)
+
+    with open(file_path, "w", encoding=_file_encoding, newline="") as file:
+        file.write(settings["header"] + "\r\n")
+        for start in range(0, rows, _chunk_rows):
+            chunk_rows = min(_chunk_rows, rows - start)
+            columns = _get_columns(rng, start, chunk_rows, settings, start_time, interval_minutes, first_number, gap_fraction)
+            file.write("\r\n".join(map(";".join, zip(*[column.tolist() for column in columns]))) + "\r\n")
+
+def write_export_folder(directory: str, rows: int, rows_per_file=1000000, overlap_rows=100, interval_minutes=5, gap_fraction=0.01, seed=0):
+    '''
+    Writes "rows" measurements as several export files into directory, alternating between both export formats.
+    Consecutive files share "overlap_rows" measurements (duplicates, like overlapping exports of the same station).
+    A finished folder gets marked and is not written again (generating large folders takes a while).
+
+    Returns
+    -------
+    list
+        Paths of the written files.
+    '''
+
+    makedirs(directory, exist_ok=True)
+    marker_path = join(directory, f".complete_{rows}_{rows_per_file}_{overlap_rows}_{interval_minutes}_{gap_fraction}_{seed}")
+
+    file_paths = []
+    start = 0
+    while start < rows or len(file_paths) == 0:
+        file_rows = min(rows_per_file, rows - start) if len(file_paths) == 0 else min(rows_per_file, rows - start + overlap_rows)
+        file_start = start if len(file_paths) == 0 else start - overlap_rows
+        export_format = list(export_formats)[len(file_paths) % len(export_formats)]
+        file_path = join(directory, f"{len(file_paths):03d} - Wettertation Export {export_format}.{'txt' if export_format == 'de' else 'csv'}")
+
+        if not isfile(marker_path):
+            write_export_file(file_path, file_rows, export_format=export_format, interval_minutes=interval_minutes,
+                              start_time=datetime(2015, 1, 1), first_number=file_start + 1, gap_fraction=gap_fraction,
+                              seed=seed + len(file_paths))
+        file_paths.append(file_path)
+        start = file_start + file_rows
+
+    if not isfile(marker_path): open(marker_path, "w").close()
+    return file_paths
+
+
+
+### helper functions ###
+
+def _get_columns(rng, start: int, rows: int, settings: dict, start_time: datetime, interval_minutes: int, first_number: int,
+                 gap_fraction: float):
+    # one chunk of rows as list of string-columns (in the column order of the header)
+    index = arange(first_number - 1 + start, first_number - 1 + start + rows, dtype=int64)
+    times = datetime64(start_time, "m") + index * interval_minutes
+    days = index * interval_minutes / 1440.0
+
+    temperature = 10.0 - 8.0 * sin(2 * pi * (days + 10) / 365.25) - 4.0 * sin(2 * pi * (days + 0.25)) + rng.normal(0, 1.0, rows)
+    humidity = (70.0 + 15.0 * sin(2 * pi * days) + rng.normal(0, 5.0, rows)).clip(10, 99)
+    pressure = 985.0 + 8.0 * sin(2 * pi * days / 5.3) + rng.normal(0, 0.5, rows)
+    wind = abs(rng.normal(0, 2.5, rows))
+    gust = wind * (1.2 + rng.random(rows))
+    rain = (rng.random(rows) < 0.03) * rng.exponential(0.5, rows)
+
+    values = [_format(45.0 + rng.normal(0, 2.0, rows), 0), # humidity inside
+              _format(20.0 + rng.normal(0, 0.5, rows), 1), # temperature inside
+              _format(humidity, 0),
+              _format(temperature, 1),
+              _format(pressure, 1), # absolute
+              _format(wind * settings["wind_factor"], 1),
+              _format(gust * settings["wind_factor"], 1),
+              array(wind_directions)[rng.integers(0, len(wind_directions), rows)],
+              _format(pressure + 25.0, 1), # relative
+              _format(temperature - 6.0, 1), # dew point
+              _format(temperature - wind, 1), # wind chill
+              _format(rain, 1), # hourly, daily, weekly, monthly, total
+              _format(rain * 24, 1),
+              _format(rain * 24 * 7, 1),
+              _format(rain * 24 * 30, 1),
+              _format(index * 0.002, 1)]
+    if settings["wind_levels"]:
+        values += [_format(wind // 1.5, 0), _format(gust // 1.5, 0)]
+
+    for column in values: # sensor outages
+        column[rng.random(rows) < gap_fraction] = "---"
+
+    return [(index + 1).astype(str), _format_times(times, settings["time_format"]), array([str(interval_minutes)] * rows)] + values
+
+def _format(values, decimals: int):
+    if decimals == 0: return np_round(values).astype(int64).astype("U8")
+    return np_round(values, decimals).astype("U12")
+
+def _format_times(times, time_format: str):
+    # strftime for the whole array: characters of the ISO-strings rearranged to the layout of time_format
+    iso_chars = datetime_as_string(times.astype("datetime64[s]")).astype("U19").view("U1").reshape(-1, 19)
+
+    layout = [] # (start, stop) in the ISO-string or a literal character
+    i = 0
+    while i < len(time_format):
+        if time_format[i] == "%":
+            layout.append(_iso_positions[time_format[i+1]])
+            i += 2
+        else:
+            layout.append(time_format[i])
+            i += 1
+
+    width = sum(part[1] - part[0] if isinstance(part, tuple) else 1 for part in layout)
+    ret_chars = empty((times.shape[0], width), dtype="U1")
+    position = 0
+    for part in layout:
+        if isinstance(part, tuple):
+            ret_chars[:, position:position + part[1] - part[0]] = iso_chars[:, part[0]:part[1]]
+            position += part[1] - part[0]
+        else:
+            ret_chars[:, position] = part
+            position += 1
+    return ret_chars.view(f"U{width}").reshape(-1)
@@ -0,0 +1,198 @@
+'''
+Benchmarks of the hot paths: parsing, loading, range lookup, subscripting, fitting and plotting.
+
+Usage (from the folder of the repository):
+    python benchmarks/run_benchmarks.py --sizes 10k,100k,1M --output results.json
+    python benchmarks/run_benchmarks.py --sizes 10k,100k,1M --output new.json --compare results.json
+
+Every stage reports its duration (best of --repeat runs), the throughput in rows per second, the peak of the
+python/numpy-memory (tracemalloc, one extra run) and for queries the latency of one call. The results
+get written as JSON, --compare prints the ratio to an older result file.
+'''
+
+import sys
+from os.path import dirname, abspath, join
+sys.path.insert(0, dirname(dirname(abspath(__file__)))) # backend_files of the repository
+
+import argparse
+import json
+import platform
+import tempfile
+import tracemalloc
+import warnings
+from contextlib import redirect_stdout
+from io import StringIO
+from time import perf_counter
+from datetime import datetime, timedelta
+
+import matplotlib
+matplotlib.use("Agg") # no windows, plt.show() does nothing
+import matplotlib.pyplot as plt
+import numpy
+from numpy import percentile
+from numpy.random import default_rng
+
+from backend_files._weather_object import weather_object as wo
+from backend_files.weather_wrapper import weather_wrapper as ww, do_polyval
+from backend_files.weather_plot_main import plot_oneAxis
+from generate_export import write_export_folder
+
+
+_size_units = {"k": 10**3, "M": 10**6}
+_query_count = 200 # calls per latency-stage
+_max_object_rows = 20000 # weather_object parses row by row, more rows only take longer
+
+
+def run_benchmarks(sizes: list, data_directory: str, repeat=1, trace_memory=True):
+    ret_results = []
+    for rows in sizes:
+        directory = join(data_directory, f"rows_{rows}")
+        print(f"Generating {rows} rows in \"{directory}\"...")
+        file_paths = write_export_folder(directory, rows)
+
+        for stage, function, stage_rows, calls in _get_stages(directory, file_paths, rows):
+            result = _measure(function, repeat, trace_memory, calls)
+            result = dict(stage=stage, size=rows, rows=stage_rows, **result) # size: rows of the dataset, rows: per call
+            result["rows_per_second"] = stage_rows / result["seconds"] if result["seconds"] > 0 else None
+            ret_results.append(result)
+            _print_result(result)
+
+    return ret_results
+
+def compare_results(results: list, old_results: list):
+    old_seconds = {(result["stage"], result["size"]): result["seconds"] for result in old_results}
+    print(f"\n{'stage':<20}{'size':>12}{'old [ms]':>12}{'new [ms]':>12}{'new/old':>10}")
+    for result in results:
+        old = old_seconds.get((result["stage"], result["size"]))
+        if old is None or old == 0: continue
+        print(f"{result['stage']:<20}{result['size']:>12}{1000 * old:>12.3f}{1000 * result['seconds']:>12.3f}{result['seconds'] / old:>10.2f}")
+
+def parse_size(size: str):
+    size = size.strip()
+    if size[-1] in _size_units: return int(float(size[:-1]) * _size_units[size[-1]])
+    return int(size)
+
+
+
+### helper functions ###
+
+def _get_stages(directory: str, file_paths: list, rows: int):
+    # (name, function, rows per call, calls per run) of every stage, later stages use the data of the first ones
+    with open(file_paths[0], encoding="latin-1") as file:
+        object_lines = [line.rstrip() for line, i in zip(file, range(_max_object_rows + 1))][1:]
+
+    state = {}
+    def load_cold():
+        state["data"] = ww(directory=directory, use_cache=False, result_cache_bytes=0) # stages measure the work, not cache-hits
+    def load_cached():
+        ww(directory=directory, cache_directory=join(directory, ".benchmark_cache"))
+
+    yield "weather_object", lambda: [wo(line) for line in object_lines], len(object_lines), 1
+    yield "load_cold", load_cold, rows, 1
+
+    data = state["data"]
+    ww(directory=directory, cache_directory=join(directory, ".benchmark_cache")) # writes the cache-files
+    yield "load_cached", load_cached, rows, 1
+    yield "get_data", lambda: data._get_data(data._get_file_paths()), rows, 1
+
+    first_time, last_time = data.subscript_data(["Time"], include_labeling=False)[[0, -1], 0]
+    week_starts = _get_random_times(first_time, last_time - timedelta(days=7), _query_count)
+    week_ends = [start + timedelta(days=7) for start in week_starts]
+    week_rows = int(numpy.mean([stop - start for start, stop in zip(*data.get_index_ranges(week_starts, week_ends))]))
+    queries = iter([])
+    def next_week():
+        nonlocal queries
+        try: return next(queries)
+        except StopIteration:
+            queries = iter(zip(week_starts, week_ends))
+            return next(queries)
+
+    yield "get_indizes", lambda: data._get_indizes(*next_week()), 1, _query_count
+    yield "subscript_week", lambda: data.subscript_data(["Time", "TemperatureOutside", "WindSpeed"], *next_week(),
+                                                        include_labeling=False), week_rows, _query_count
+    yield "subscript_full", lambda: data.subscript_data(["Time", "TemperatureOutside", "WindSpeed"], include_labeling=False), rows, 1
+    yield "subscript_columns", lambda: data.subscript_data(["Time", "TemperatureOutside", "WindSpeed"], include_labeling=False,
+                                                           output="columns"), rows, 1
+
+    fit_data = data.subscript_data(["Time", "TemperatureOutside"], include_labeling=False)
+    yield "do_polyval", lambda: do_polyval(fit_data[:,0], fit_data[:,1], degree=3), rows, 1
+    yield "plot_one_axis", lambda: _plot(data, [first_time, last_time]), rows, 1
+    yield "plot_one_axis_week", lambda: _plot(data, list(next_week())), week_rows, _query_count // 10
+
+def _measure(function: callable, repeat: int, trace_memory: bool, calls: int):
+    # best of "repeat" runs, every run calls the function "calls" times (latencies of the single calls)
+    durations, latencies = [], []
+    for i in range(repeat):
+        run_latencies = []
+        for call in range(calls):
+            start = perf_counter()
+            function()
+            run_latencies.append(perf_counter() - start)
+        durations.append(sum(run_latencies))
+        latencies += run_latencies
+
+    ret_result = {"seconds": min(durations) / calls,
+                  "latency_ms": {"mean": 1000 * float(numpy.mean(latencies)),
+                                 "p50": 1000 * float(percentile(latencies, 50)),
+                                 "p95": 1000 * float(percentile(latencies, 95))},
+                  "peak_memory_bytes": None}
+
+    if trace_memory: # extra run, tracing slows down the python-parts
+        tracemalloc.start()
+        try:
+            function()
+            ret_result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return ret_result
+
+def _plot(data: ww, time_range: list):
+    with warnings.catch_warnings(), redirect_stdout(StringIO()): # Agg can not show windows, labels get printed
+        warnings.simplefilter("ignore", UserWarning)
+        plot_oneAxis(data, "%d.%m.%Y", time_range, ["TemperatureOutside", "WindSpeed"], ["TemperatureOutside"], interpolation_degree=3)
+    plt.gcf().canvas.draw() # rendering is part of the stage
+    plt.close("all")
+
+def _get_random_times(first_time: datetime, last_time: datetime, count: int):
+    offsets = default_rng(0).random(count) * max((last_time - first_time).total_seconds(), 0)
+    return [first_time + timedelta(seconds=float(offset)) for offset in offsets]
+
+def _print_result(result: dict):
+    memory = "-" if result["peak_memory_bytes"] is None else f"{result['peak_memory_bytes'] / 2**20:.1f} MiB"
+    throughput = "-" if result["rows_per_second"] is None else f"{result['rows_per_second']:.3g} rows/s"
+    print(f"  {result['stage']:<20}{result['rows']:>10} rows {1000 * result['seconds']:>10.3f} ms {throughput:>18} {memory:>12}")
+
+def _get_meta(arguments):
+    return {"date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "matplotlib": matplotlib.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "repeat": arguments.repeat,
+            "trace_memory": not arguments.no_memory}
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of loading, querying and plotting of weather data.")
+    parser.add_argument("--sizes", default="10k,100k,1M", help="rows of the synthetic data, e.g. \"10k,100k,1M,10M\"")
+    parser.add_argument("--data-directory", default=join(tempfile.gettempdir(), "weather_benchmark_data"),
+                        help="folder of the generated exports (reused by later runs)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the best one counts")
+    parser.add_argument("--no-memory", action="store_true", help="skip the extra run with tracemalloc")
+    parser.add_argument("--output", default=None, help="JSON-file for the results")
+    parser.add_argument("--compare", default=None, help="JSON-file of an older run")
+    arguments = parser.parse_args()
+
+    results = run_benchmarks([parse_size(size) for size in arguments.sizes.split(",")], arguments.data_directory,
+                             repeat=arguments.repeat, trace_memory=not arguments.no_memory)
+
+    if not arguments.output is None:
+        with open(arguments.output, "w", encoding="utf-8") as output_file:
+            json.dump({"meta": _get_meta(arguments), "results": results}, output_file, indent=1)
+        print(f"Results written to \"{arguments.output}\"")
+
+    if not arguments.compare is None:
+        with open(arguments.compare, encoding="utf-8") as compare_file:
+            compare_results(results, json.load(compare_file)["results"])
@@ -11,7 +11,7 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class Ui_MainWindow(object):
     def setupUi(self, MainWindow):
         MainWindow.setObjectName("MainWindow")
-        MainWindow.resize(595, 397)
+        MainWindow.resize(1195, 420)
         icon = QtGui.QIcon()
         icon.addPixmap(QtGui.QPixmap("ressourcen/main_icon.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
         MainWindow.setWindowIcon(icon)
@@ -96,9 +96,21 @@ class Ui_MainWindow(object):
         self.spinBoxInterpDegree.setMinimum(1)
         self.spinBoxInterpDegree.setMaximum(15)
         self.spinBoxInterpDegree.setObjectName("spinBoxInterpDegree")
+        self.comboBoxTrendMethod = QtWidgets.QComboBox(self.centralwidget)
+        self.comboBoxTrendMethod.setGeometry(QtCore.QRect(440, 320, 131, 22))
+        self.comboBoxTrendMethod.setObjectName("comboBoxTrendMethod")
+        self.label_8 = QtWidgets.QLabel(self.centralwidget)
+        self.label_8.setGeometry(QtCore.QRect(290, 350, 101, 22))
+        self.label_8.setObjectName("label_8")
+        self.lineEditTrendWindow = QtWidgets.QLineEdit(self.centralwidget)
+        self.lineEditTrendWindow.setGeometry(QtCore.QRect(390, 350, 42, 22))
+        self.lineEditTrendWindow.setObjectName("lineEditTrendWindow")
+        self.widgetPlot = QtWidgets.QWidget(self.centralwidget)
+        self.widgetPlot.setGeometry(QtCore.QRect(600, 10, 585, 362))
+        self.widgetPlot.setObjectName("widgetPlot")
         MainWindow.setCentralWidget(self.centralwidget)
         self.menubar = QtWidgets.QMenuBar(MainWindow)
-        self.menubar.setGeometry(QtCore.QRect(0, 0, 595, 21))
+        self.menubar.setGeometry(QtCore.QRect(0, 0, 1195, 21))
         self.menubar.setObjectName("menubar")
         self.menuDatei = QtWidgets.QMenu(self.menubar)
         self.menuDatei.setObjectName("menuDatei")
@@ -110,6 +122,9 @@ class Ui_MainWindow(object):
         self.statusbar = QtWidgets.QStatusBar(MainWindow)
         self.statusbar.setObjectName("statusbar")
         MainWindow.setStatusBar(self.statusbar)
+        self.actionOrdner_ueberwachen = QtWidgets.QAction(MainWindow)
+        self.actionOrdner_ueberwachen.setCheckable(True)
+        self.actionOrdner_ueberwachen.setObjectName("actionOrdner_ueberwachen")
         self.actionBeenden = QtWidgets.QAction(MainWindow)
         self.actionBeenden.setObjectName("actionBeenden")
         self.actionLink_zu_GitHub = QtWidgets.QAction(MainWindow)
@@ -118,10 +133,15 @@ class Ui_MainWindow(object):
         self.action_ber.setObjectName("action_ber")
         self.actionZeitachsen_Beschriftung = QtWidgets.QAction(MainWindow)
         self.actionZeitachsen_Beschriftung.setObjectName("actionZeitachsen_Beschriftung")
+        self.actionDiagnose = QtWidgets.QAction(MainWindow)
+        self.actionDiagnose.setObjectName("actionDiagnose")
+        self.menuDatei.addAction(self.actionOrdner_ueberwachen)
+        self.menuDatei.addSeparator()
         self.menuDatei.addAction(self.actionBeenden)
         self.menuInformationen.addAction(self.actionZeitachsen_Beschriftung)
         self.menuHilfe.addAction(self.menuInformationen.menuAction())
         self.menuHilfe.addAction(self.actionLink_zu_GitHub)
+        self.menuHilfe.addAction(self.actionDiagnose)
         self.menuHilfe.addAction(self.action_ber)
         self.menubar.addAction(self.menuDatei.menuAction())
         self.menubar.addAction(self.menuHilfe.menuAction())
@@ -148,13 +168,21 @@ class Ui_MainWindow(object):
         self.label_6.setText(_translate("MainWindow", "Plotte auf y-Achse"))
         self.labelPlotSecAxis.setText(_translate("MainWindow", "Plotte auf zweiter y-Achse"))
         self.label_7.setText(_translate("MainWindow", "Interpolationsgrad:"))
+        self.comboBoxTrendMethod.setToolTip(_translate("MainWindow", "Art der Trendlinie für die angekreuzten Werte."))
+        self.label_8.setText(_translate("MainWindow", "Trendfenster:"))
+        self.lineEditTrendWindow.setToolTip(_translate("MainWindow", "Zeitfenster der gleitenden Trendlinien, z.B. 6h, 1d oder 2w (Einheiten: s, min, h, d, w)."))
+        self.lineEditTrendWindow.setText(_translate("MainWindow", "1d"))
         self.menuDatei.setTitle(_translate("MainWindow", "Datei"))
         self.menuHilfe.setTitle(_translate("MainWindow", "Hilfe"))
         self.menuInformationen.setTitle(_translate("MainWindow", "Informationen"))
+        self.actionOrdner_ueberwachen.setText(_translate("MainWindow", "Ordner überwachen"))
+        self.actionOrdner_ueberwachen.setToolTip(_translate("MainWindow", "Lädt neue oder geänderte Wetterdateien des Ordners automatisch nach."))
         self.actionBeenden.setText(_translate("MainWindow", "Beenden"))
         self.actionLink_zu_GitHub.setText(_translate("MainWindow", "Link zu GitHub"))
         self.action_ber.setText(_translate("MainWindow", "Über"))
         self.actionZeitachsen_Beschriftung.setText(_translate("MainWindow", "Zeitachsen-Beschriftung"))
+        self.actionDiagnose.setText(_translate("MainWindow", "Diagnose..."))
+        self.actionDiagnose.setToolTip(_translate("MainWindow", "Zeitmessungen des Einlesens und Plottens anzeigen und speichern."))
 
 
 if __name__ == "__main__":
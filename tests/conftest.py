@@ -0,0 +1,4 @@
+import sys
+from os.path import dirname, abspath
+
+sys.path.insert(0, dirname(dirname(abspath(__file__)))) # backend_files and the entry points of the repository
@@ -0,0 +1,98 @@
+import shutil
+from os import stat, utime, listdir
+from os.path import dirname, abspath, join
+
+import pytest
+from numpy import array_equal
+
+from backend_files._weather_cache import load_cached_file, get_cache_directory
+from backend_files.weather_wrapper import load_export_file
+
+
+_weather_files = join(dirname(dirname(abspath(__file__))), "backend_files", "weather_files")
+_file_name = "2021.08.25-2021.08.30 - Wettertation Export 25.08.2021.txt"
+
+
+@pytest.fixture
+def export(tmp_path):
+    shutil.copy(join(_weather_files, _file_name), tmp_path)
+    return str(tmp_path / _file_name)
+
+class counting_loader(object):
+    # load_function of load_cached_file that counts how often the file really got parsed
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, file_path: str):
+        self.calls += 1
+        return load_export_file(file_path, ["No", "Time", "MeasureInterval", "HumidityInside", "TemperatureInside"])
+
+def load(export: str, loader: counting_loader, parameters="default"):
+    return load_cached_file(export, get_cache_directory(dirname(export)), loader, parameters)
+
+def rewrite(export: str, old: str, new: str):
+    with open(export, encoding="latin-1") as file:
+        content = file.read()
+    with open(export, "w", encoding="latin-1") as file:
+        file.write(content.replace(old, new, 1))
+
+
+def test_unchanged_file_is_read_from_the_cache(export):
+    loader = counting_loader()
+    parsed = load(export, loader)
+    cached = load(export, loader)
+
+    assert loader.calls == 1
+    for name in parsed.data_names:
+        assert array_equal(cached.column(name), parsed.column(name), equal_nan=name != "Time"), name
+
+def test_new_modification_time_with_same_content(export):
+    loader = counting_loader()
+    load(export, loader)
+    utime(export, ns=(stat(export).st_atime_ns, stat(export).st_mtime_ns + 10**9)) # e.g. copied again
+
+    load(export, loader)
+    assert loader.calls == 1 # same hash -> still valid
+    load(export, loader)
+    assert loader.calls == 1 # the new modification time got stored, no hash needed anymore
+
+def test_changed_content_with_same_size(export):
+    loader = counting_loader()
+    old = load(export, loader)
+    mtime = stat(export).st_mtime_ns
+
+    rewrite(export, "15:02;30;57;22.5;", "15:02;30;57;22.6;") # temperature inside of the first row
+    utime(export, ns=(mtime + 10**9, mtime + 10**9))
+    new = load(export, loader)
+
+    assert loader.calls == 2 # same size, other hash
+    assert not array_equal(new.column("TemperatureInside"), old.column("TemperatureInside"), equal_nan=True)
+
+def test_changed_size(export):
+    loader = counting_loader()
+    size = load(export, loader).size()
+
+    with open(export, encoding="latin-1") as file:
+        lines = file.readlines()
+    with open(export, "w", encoding="latin-1") as file:
+        file.writelines(lines[:-10])
+    assert load(export, loader).size() == size - 10
+    assert loader.calls == 2
+
+def test_other_parameters(export):
+    loader = counting_loader()
+    load(export, loader)
+    load(export, loader, parameters="other")
+    assert loader.calls == 2
+
+def test_broken_cache_file(export, capsys):
+    loader = counting_loader()
+    load(export, loader)
+    cache_directory = get_cache_directory(dirname(export))
+    for cache_file in listdir(cache_directory):
+        with open(join(cache_directory, cache_file), "wb") as file:
+            file.write(b"no npz-file")
+
+    assert load(export, loader).size() > 0
+    assert loader.calls == 2
+    assert "ignoring unreadable cache-file" in capsys.readouterr().out
@@ -0,0 +1,57 @@
+from os.path import dirname, abspath, join
+
+import pytest
+from numpy.linalg import LinAlgError
+
+import weather_cli # selects the Agg-backend before pyplot gets imported
+import matplotlib.pyplot as plt
+from weather_cli import run_jobs
+from backend_files.weather_wrapper import weather_wrapper as ww
+
+
+_weather_files = join(dirname(dirname(abspath(__file__))), "backend_files", "weather_files")
+
+
+@pytest.fixture(scope="module")
+def data_object():
+    return ww(directory=_weather_files, use_cache=False, build_pyramid=True)
+
+def get_failing_trends(error: Exception):
+    def fail_trends(data_object, keys, *arguments, **keywords):
+        if len(keys) > 0: raise error
+        return []
+    return fail_trends
+
+
+@pytest.mark.parametrize("error, message", [(LinAlgError("SVD did not converge"), "SVD did not converge"),
+                                            (RuntimeError("no memory"), "RuntimeError: no memory")])
+def test_failing_job_is_reported(data_object, tmp_path, monkeypatch, capsys, error, message):
+    monkeypatch.setattr(ww, "get_trends", get_failing_trends(error))
+    jobs = [{"output": "trend.png", "y": ["TemperatureOutside"], "trend": ["TemperatureOutside"]},
+            {"output": "plot.png", "y": ["TemperatureOutside"]}]
+
+    assert run_jobs(data_object, jobs, output_directory=str(tmp_path)) == 1
+    assert "trend.png: " + message in capsys.readouterr().err
+    assert (tmp_path / "plot.png").exists() # the other jobs still run
+
+def test_failing_job_closes_its_figure(data_object, tmp_path, monkeypatch):
+    monkeypatch.setattr(ww, "get_trends", get_failing_trends(LinAlgError("SVD did not converge")))
+    open_figures = plt.get_fignums()
+    for output in ["one_axis.png", "twin_axis.png"]:
+        job = {"output": output, "y": ["TemperatureOutside"], "sec_y": ["WindSpeed"] if output == "twin_axis.png" else [],
+               "trend": ["TemperatureOutside"]}
+        assert weather_cli._run_job_safely(data_object, job, str(tmp_path))[0] is None
+    assert plt.get_fignums() == open_figures
+
+def test_parallel_fails_like_serial(data_object, tmp_path, capsys):
+    jobs = [{"output": "plot.png", "y": ["TemperatureOutside"]},
+            {"output": "unknown.png", "y": ["Unknown"]},
+            {"output": "unpicklable.png", "y": ["TemperatureOutside"], "trend_method": lambda: "ema"}] # parallel: fails in the pool itself
+
+    assert run_jobs(data_object, jobs, output_directory=str(tmp_path / "serial")) == 2
+    serial_errors = capsys.readouterr().err.splitlines()
+    assert weather_cli.run_jobs_parallel(data_object, jobs, output_directory=str(tmp_path / "parallel"), workers=2) == 2
+    parallel_errors = capsys.readouterr().err.splitlines()
+
+    assert [line.split(":")[0] for line in parallel_errors] == [line.split(":")[0] for line in serial_errors]
+    assert (tmp_path / "parallel" / "plot.png").exists()
@@ -0,0 +1,46 @@
+from os.path import dirname, abspath, join
+
+import pytest
+from numpy import shares_memory, int8, int64
+
+from backend_files._weather_columns import weather_columns
+from backend_files.weather_wrapper import weather_wrapper as ww
+
+
+_weather_files = join(dirname(dirname(abspath(__file__))), "backend_files", "weather_files")
+_names = ["Time", "No", "TemperatureOutside", "WindDirection"]
+
+
+@pytest.fixture(scope="module")
+def data_object():
+    return ww(directory=_weather_files, use_cache=False)
+
+def test_get_arrays_are_stored_columns(data_object):
+    columns = data_object._data
+    arrays = columns.get_arrays(_names, 100, 5000)
+
+    assert arrays["No"].dtype == int64 and arrays["WindDirection"].dtype == int8
+    assert arrays.categories == {"WindDirection": tuple(columns.categories("WindDirection"))}
+    for name in _names:
+        assert shares_memory(arrays[name], columns.column(name)) # no copy and no conversion
+        assert not arrays[name].flags.writeable
+    assert columns.column("No").flags.writeable
+
+def test_get_values_like_rows(data_object):
+    arrays = data_object.subscript_data(_names, include_labeling=False, output="columns")
+    rows = data_object.subscript_data(_names, include_labeling=False)
+    assert (arrays["WindDirection"] < 0).any() # the exports contain missing directions
+
+    assert arrays.get_values("WindDirection").tolist() == rows[:, 3].tolist()
+    for i, name in enumerate(["No", "TemperatureOutside"], start=1):
+        values = arrays.get_values(name)
+        assert values.dtype == float
+        assert [None if value != value else value for value in values.tolist()] == rows[:, i].tolist()
+
+def test_categories_of_the_query():
+    columns = weather_columns.allocate(["WindDirection"], size=2)
+    columns.set_values("WindDirection", ["N", None])
+    arrays = columns.get_arrays(["WindDirection"])
+
+    columns.set_values("WindDirection", ["new", "N"]) # adds a category
+    assert arrays.get_values("WindDirection").tolist() == ["N", None]
@@ -0,0 +1,160 @@
+import shutil
+from datetime import datetime, timedelta
+from os import listdir, makedirs
+from os.path import dirname, abspath, join
+
+import pytest
+from numpy import array_equal, searchsorted, concatenate, memmap
+from numpy.random import default_rng
+
+from backend_files import weather_wrapper
+from backend_files._weather_dataset import save_dataset, open_dataset
+from backend_files.weather_wrapper import weather_wrapper as ww
+
+
+_weather_files = join(dirname(dirname(abspath(__file__))), "backend_files", "weather_files")
+_archive_files = ["2015.01.06-2018.07.22 - Wettertation Export 25.08.2021_ohne 2016 und 2017.txt",
+                  "2019.03.11-2019.08.05 - Wettertation Export 25.08.2021.txt"]
+
+
+@pytest.fixture(scope="module")
+def data_object():
+    return ww(directory=_weather_files, use_cache=False)
+
+@pytest.fixture
+def folders(tmp_path):
+    # archive (saved as dataset) and exports of the same station with a changed second export of 2019
+    archive, exports = str(tmp_path / "archive") + "/", str(tmp_path / "exports") + "/"
+    makedirs(archive)
+    makedirs(exports)
+    for file_name in listdir(_weather_files):
+        shutil.copy(join(_weather_files, file_name), archive if file_name in _archive_files else exports)
+    write_changed_copy(join(_weather_files, _archive_files[1]), join(exports, "changed 2019.txt"))
+    return archive, exports
+
+def write_changed_copy(source_path: str, target_path: str):
+    # every 2nd row with another temperature, every 3rd with missing values, every 5th with an unknown direction
+    with open(source_path, encoding="latin-1") as file:
+        lines = file.readlines()
+    for i in range(1, len(lines)):
+        fields = lines[i].rstrip("\n").split(";")
+        if i % 2 == 0 and fields[6] != "---": fields[6] = str(float(fields[6]) + 1.0)
+        if i % 3 == 0: fields[3:6] = ["---"] * 3
+        if i % 5 == 0: fields[10] = "Z"
+        lines[i] = ";".join(fields) + "\n"
+    with open(target_path, "w", encoding="latin-1") as file:
+        file.writelines(lines)
+
+def load_both(archive: str, exports: str, dataset: str, **kwargs):
+    # exports on top of the memory-mapped dataset and on top of the same data in memory
+    ww(directory=archive, use_cache=False, **kwargs).save_dataset(dataset)
+    data_object = ww.from_dataset(dataset, directory=exports, use_cache=False, **kwargs)
+
+    expected = ww(directory=archive, use_cache=False, **kwargs)
+    expected.add_files([exports + file_name for file_name in sorted(listdir(exports))])
+    return data_object, expected
+
+def assert_same_data(data_object: ww, expected: ww):
+    assert data_object.size() == expected.size()
+    for name in expected._data.data_names:
+        assert array_equal(data_object._data.column(name), expected._data.column(name), equal_nan=name != "Time"), name
+
+    names = ["Time", "TemperatureOutside", "HumidityInside", "WindDirection", "No"]
+    for start, end in [(datetime(2000, 1, 1), datetime(3000, 1, 1)), (datetime(2019, 4, 1), datetime(2019, 4, 2)),
+                       (datetime(2018, 7, 1), datetime(2019, 3, 12)), (datetime(2019, 8, 1), datetime(2021, 8, 26))]:
+        assert data_object.subscript_data(names, start, end, include_labeling=False).tolist() == \
+               expected.subscript_data(names, start, end, include_labeling=False).tolist()
+        arrays = data_object.subscript_data(names, start, end, include_labeling=False, output="columns")
+        assert arrays.get_values("WindDirection").tolist() == \
+               expected.subscript_data(["WindDirection"], start, end, include_labeling=False)[:, 0].tolist()
+
+    dates = [datetime(2015, 1, 1) + timedelta(hours=37 * i) for i in range(1500)]
+    for data_indizes, expected_indizes in zip(data_object.get_index_ranges(dates[:-1], dates[1:]),
+                                              expected.get_index_ranges(dates[:-1], dates[1:])):
+        assert array_equal(data_indizes, expected_indizes)
+    assert str(data_object[12345]) == str(expected[12345])
+
+
+def test_round_trip(data_object, tmp_path):
+    save_dataset(data_object._data, str(tmp_path))
+    columns, time_index, header = open_dataset(str(tmp_path))
+
+    assert header["size"] == columns.size() == data_object.size()
+    for name in columns.data_names:
+        assert isinstance(columns.column(name), memmap) and not columns.column(name).flags.writeable
+        assert array_equal(columns.column(name), data_object._data.column(name), equal_nan=name != "Time"), name
+    assert columns.categories("WindDirection") == data_object._data.categories("WindDirection")
+
+@pytest.mark.parametrize("side", ["left", "right"])
+def test_time_index_like_searchsorted(data_object, tmp_path, side):
+    save_dataset(data_object._data, str(tmp_path))
+    columns, time_index, header = open_dataset(str(tmp_path))
+
+    times = columns.column("Time")
+    rng = default_rng(0)
+    offsets = rng.integers(-10**6, (times[-1] - times[0]).astype(int) + 10**6, 500).astype("timedelta64[s]")
+    dates = concatenate([rng.choice(times, 500), times[0] + offsets]) # exact times, in between and outside
+    assert array_equal(time_index.searchsorted(dates, side=side), searchsorted(times, dates, side=side))
+
+def test_range_queries_of_a_dataset(data_object, tmp_path):
+    data_object.save_dataset(str(tmp_path / "dataset"))
+    opened = ww.from_dataset(str(tmp_path / "dataset"), use_cache=False)
+    assert opened.get_dataset_directory() == str(tmp_path / "dataset") + "/"
+    assert_same_data(opened, data_object)
+
+    keys, start, end = ["TemperatureOutside", "RainfallTotal"], datetime(2019, 5, 1), datetime(2019, 6, 1)
+    resampled = opened.resample(keys, "d", start_date=start, end_date=end)
+    expected = data_object.resample(keys, "d", start_date=start, end_date=end)
+    assert array_equal(resampled[0], expected[0])
+    for key in keys:
+        assert array_equal(resampled[1][key], expected[1][key], equal_nan=True)
+
+def test_broken_datasets(data_object, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_dataset(str(tmp_path))
+
+    save_dataset(data_object._data, str(tmp_path))
+    with open(str(tmp_path / "TemperatureOutside.bin"), "ab") as column_file:
+        column_file.write(b"12345678") # one value more than in the header
+    with pytest.raises(ValueError):
+        open_dataset(str(tmp_path))
+
+@pytest.mark.parametrize("duplicate_policy", ["first", "last", "most_complete"])
+def test_exports_on_top_of_dataset(folders, tmp_path, duplicate_policy):
+    archive, exports = folders
+    data_object, expected = load_both(archive, exports, str(tmp_path / "dataset"), duplicate_policy=duplicate_policy)
+
+    assert data_object._data.row_count() < data_object.size() // 4 # only the exports are in memory
+    assert data_object.get_dataset_directory() is None # changed since opening
+    assert_same_data(data_object, expected)
+
+def test_refresh_on_top_of_dataset(folders, tmp_path):
+    archive, exports = folders
+    shutil.move(exports + "changed 2019.txt", str(tmp_path / "changed 2019.txt"))
+    data_object, expected = load_both(archive, exports, str(tmp_path / "dataset"), duplicate_policy="last")
+
+    shutil.move(str(tmp_path / "changed 2019.txt"), exports + "changed 2019.txt")
+    assert data_object.refresh() == [exports + "changed 2019.txt"]
+    expected.add_files([exports + "changed 2019.txt"])
+    assert_same_data(data_object, expected)
+
+def test_saved_overlay_is_a_dataset(folders, tmp_path):
+    archive, exports = folders
+    data_object, expected = load_both(archive, exports, str(tmp_path / "dataset"), duplicate_policy="most_complete")
+
+    data_object.save_dataset(str(tmp_path / "merged"))
+    merged = ww.from_dataset(str(tmp_path / "merged"), use_cache=False)
+    assert merged.get_dataset_directory() == str(tmp_path / "merged") + "/"
+    assert_same_data(merged, expected)
+
+def test_pyramid_is_saved_with_the_dataset(tmp_path, monkeypatch):
+    data_object = ww(directory=_weather_files, use_cache=False, build_pyramid=True)
+    data_object.save_dataset(str(tmp_path / "dataset"))
+    start, end = datetime(2015, 1, 1), datetime(2022, 1, 1)
+    expected = data_object.get_pyramid_data("TemperatureOutside", start, end, 200)
+
+    def build(*arguments, **kwargs): raise AssertionError("the pyramid of the dataset got built again")
+    monkeypatch.setattr(weather_wrapper.weather_pyramid, "build", build)
+    opened = ww.from_dataset(str(tmp_path / "dataset"), use_cache=False, build_pyramid=True)
+    for values, expected_values in zip(opened.get_pyramid_data("TemperatureOutside", start, end, 200), expected):
+        assert array_equal(values, expected_values, equal_nan=True)
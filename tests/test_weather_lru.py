@@ -0,0 +1,44 @@
+from numpy import zeros
+
+from backend_files._weather_lru import lru_cache, get_size
+
+
+def test_least_recently_used_gets_evicted():
+    cache = lru_cache(max_bytes=10**6, max_entries=3)
+    for key in "abc": cache.put(key, key)
+    assert cache.get("a") == "a" # "b" is the least recently used now
+
+    cache.put("d", "d")
+    assert not "b" in cache and "a" in cache and "d" in cache
+    assert cache.get_stats()["evictions"] == 1
+
+def test_eviction_by_bytes():
+    cache = lru_cache(max_bytes=3000)
+    for key in range(3): cache.put(key, zeros(100)) # 800 bytes each
+    cache.put("large", zeros(200))
+
+    assert len(cache) == 2 and not 0 in cache and not 1 in cache
+    assert cache.get_stats()["bytes"] == 2400
+
+def test_too_large_values_are_not_stored():
+    cache = lru_cache(max_bytes=1000)
+    cache.put("small", zeros(10))
+    assert not cache.put("large", zeros(1000))
+    assert len(cache) == 1 and not "large" in cache
+
+def test_replacing_and_stats():
+    cache = lru_cache()
+    cache.put("a", zeros(10))
+    cache.put("a", zeros(20))
+    assert cache.get_stats()["bytes"] == 160 and len(cache) == 1
+
+    assert cache.get("missing") is None
+    cache.get("a")
+    cache.clear()
+    assert cache.get_stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 0, "bytes": 0, "max_bytes": cache.max_bytes}
+
+def test_size_of_object_arrays():
+    values = zeros((1000, 2), dtype=object)
+    values[:, 1] = "text"
+    assert get_size(values) > values.nbytes # the elements count too
+    assert get_size((zeros(10), zeros(5))) > 120
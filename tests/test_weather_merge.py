@@ -0,0 +1,82 @@
+import shutil
+from os.path import dirname, abspath, join
+
+import pytest
+from numpy import array, array_equal, isnan
+
+from backend_files._weather_merge import get_merge_order, get_duplicate_mask
+from backend_files.weather_wrapper import weather_wrapper as ww, iter_weather_chunks
+from backend_files._weather_columns import weather_columns
+
+
+_weather_files = join(dirname(dirname(abspath(__file__))), "backend_files", "weather_files")
+_file_name = "2021.08.25-2021.08.30 - Wettertation Export 25.08.2021.txt"
+
+
+@pytest.fixture
+def folder(tmp_path):
+    # "a.txt": the export, "b.txt": the same times with other temperatures (rows 1-100) and missing values (rows 1-50)
+    shutil.copy(join(_weather_files, _file_name), tmp_path / "a.txt")
+    with open(join(_weather_files, _file_name), encoding="latin-1") as file:
+        lines = file.readlines()
+    for i in range(1, 101):
+        fields = lines[i].split(";")
+        fields[6] = "99.0"
+        if i <= 50: fields[3] = fields[5] = "---"
+        lines[i] = ";".join(fields)
+    with open(tmp_path / "b.txt", "w", encoding="latin-1") as file:
+        file.writelines(lines)
+    return str(tmp_path) + "/"
+
+def load(folder: str, duplicate_policy: str, file_names=["a.txt", "b.txt"]):
+    data_object = ww(directory=folder + "none/", use_cache=False, duplicate_policy=duplicate_policy)
+    data_object.add_files([folder + file_name for file_name in file_names]) # file order: a before b
+    return data_object
+
+def temperatures(data_object: ww):
+    return data_object._data.column("TemperatureOutside")
+
+
+def test_merge_order():
+    old_times, new_times = array([1, 3, 3, 7]), array([0, 3, 8])
+    order = get_merge_order(old_times, new_times)
+    assert order.tolist() == [4, 0, 1, 2, 5, 3, 6] # on equal times, the old element comes first
+
+@pytest.mark.parametrize("policy, expected", [("first", [True, False, False, True, True, False]),
+                                              ("last", [False, False, True, True, False, True]),
+                                              ("most_complete", [False, True, False, True, True, False])])
+def test_duplicate_mask(policy, expected):
+    times = array([1, 1, 1, 2, 5, 5])
+    non_null_counts = array([3, 5, 5, 1, 4, 4])
+    assert get_duplicate_mask(times, policy=policy, non_null_counts=non_null_counts).tolist() == expected
+
+def test_policies_on_overlapping_files(folder):
+    original, changed = load(folder, "first", ["a.txt"]), load(folder, "first", ["b.txt"])
+    first, last, most_complete = [load(folder, policy) for policy in ["first", "last", "most_complete"]]
+
+    for data_object in [first, last, most_complete]:
+        assert data_object.size() == original.size() # every time only once
+    assert array_equal(temperatures(first), temperatures(original))
+    assert array_equal(temperatures(last), temperatures(changed))
+
+    # b is more complete nowhere, equally complete in rows 51-100 -> a (the first one) wins everywhere
+    assert array_equal(temperatures(most_complete), temperatures(original))
+    assert not isnan(most_complete._data.column("HumidityInside")).any()
+
+def test_most_complete_replaces_incomplete_rows(folder):
+    # other file order: the incomplete rows come first, the complete ones of a replace them
+    most_complete = load(folder, "most_complete", ["b.txt", "a.txt"])
+    changed = load(folder, "first", ["b.txt"])
+
+    assert not isnan(most_complete._data.column("HumidityInside")).any()
+    assert array_equal(temperatures(most_complete)[:50], temperatures(load(folder, "first", ["a.txt"]))[:50])
+    assert array_equal(temperatures(most_complete)[50:], temperatures(changed)[50:]) # equally complete -> b stays
+
+@pytest.mark.parametrize("duplicate_policy", ["first", "last", "most_complete"])
+def test_stream_merge_like_wrapper(folder, duplicate_policy):
+    expected = ww(directory=folder, use_cache=False, duplicate_policy=duplicate_policy) # same file order as the stream
+    chunks = list(iter_weather_chunks(directory=folder, chunk_size=100, duplicate_policy=duplicate_policy))
+    assert all(chunk.size() == 100 for chunk in chunks[:-1])
+    streamed = weather_columns.concatenate(chunks)
+    for name in streamed.data_names:
+        assert array_equal(streamed.column(name), expected._data.column(name), equal_nan=name != "Time"), name
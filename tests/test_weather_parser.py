@@ -0,0 +1,54 @@
+from os import listdir
+from os.path import dirname, abspath, join
+
+import pytest
+
+from backend_files._weather_parser import read_export_file, iter_export_file
+from backend_files._weather_object import weather_object as wo
+
+
+_weather_files = join(dirname(dirname(abspath(__file__))), "backend_files", "weather_files")
+_file_encoding = "latin-1"
+
+
+def read_per_line(file_path: str):
+    # the old parser: one weather_object per line
+    with open(file_path, encoding=_file_encoding) as file:
+        lines = [line.rstrip() for line in file]
+    return lines[0], [wo(line) for line in lines[1:] if not line in ["", "\x00", " "]]
+
+@pytest.mark.parametrize("file_name", sorted(listdir(_weather_files)))
+@pytest.mark.parametrize("chunk_size", [777, 10000])
+def test_same_as_per_line_parsing(file_name, chunk_size):
+    file_path = join(_weather_files, file_name)
+    first_line, objects = read_per_line(file_path)
+    columns, columns_first_line = read_export_file(file_path, wo._data_names, chunk_size=chunk_size)
+
+    assert columns_first_line == first_line
+    assert columns.size() == len(objects)
+    for name in wo._data_names:
+        assert columns.get_object_column(name).tolist() == [obj[name] for obj in objects], name
+
+def test_missing_times(tmp_path):
+    file_path = str(tmp_path / "gaps.txt")
+    rows = ["1;---;5;50;20.0", "2;01.02.2021 10:00:00;5;51;20.5", "3;---;5;52;21.0"]
+    with open(file_path, "w", encoding=_file_encoding) as file:
+        file.write("No;Zeit;Intervall;innen Luftfeuchtigkeit(%);innen Temperatur(°C)\n" + "\n".join(rows) + "\n")
+
+    names = wo._data_names[:5]
+    columns, first_line = read_export_file(file_path, names, chunk_size=1) # first chunk without any time
+    assert columns.get_object_column("Time").tolist()[0] is None
+    assert columns.get_object_column("HumidityInside").tolist() == [50.0, 51.0, 52.0]
+
+    with open(file_path, "w", encoding=_file_encoding) as file:
+        file.write("No;Zeit\n1;---\n")
+    with pytest.raises(ValueError, match="gaps.txt"):
+        read_export_file(file_path, names)
+
+def test_header_only(tmp_path):
+    file_path = str(tmp_path / "empty.txt")
+    with open(file_path, "w", encoding=_file_encoding) as file:
+        file.write("No;Zeit\n")
+    columns, first_line = read_export_file(file_path, wo._data_names)
+    assert columns.size() == 0 and first_line == "No;Zeit"
+    assert list(iter_export_file(file_path, wo._data_names)) == []
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+from numpy import arange, array, array_equal, datetime64, nan, nanmax, float32
+
+from backend_files._weather_columns import weather_columns
+from backend_files._weather_resample import resample_columns, get_bin_starts, get_frequency_seconds
+from backend_files._weather_pyramid import weather_pyramid, pyramid_levels
+
+
+_names = ["Time", "TemperatureOutside", "RainfallTotal", "WindDirection"]
+
+
+@pytest.fixture(scope="module")
+def columns():
+    # 21 days every 30 minutes from monday, 2021-03-01
+    size = 21 * 48
+    ret_columns = weather_columns.allocate(_names, size=size)
+    ret_columns.set_column("Time", datetime64("2021-03-01T00:00:00") + arange(size) * 1800)
+    temperatures = (arange(size) % 48).astype(float)
+    temperatures[::7] = nan
+    ret_columns.set_column("TemperatureOutside", temperatures)
+    ret_columns.set_column("RainfallTotal", (arange(size) // 10 % 50).astype(float)) # counter with resets to 0
+    ret_columns.set_values("WindDirection", [["N", "N", "SE", None][i % 4] for i in range(size)])
+    return ret_columns
+
+
+def test_daily_aggregations(columns):
+    bin_times, values = resample_columns(columns, ["TemperatureOutside", "RainfallTotal", "WindDirection"], "d",
+                                         aggs={"TemperatureOutside": "max"})
+    assert bin_times.shape[0] == 21
+    assert bin_times[1] == datetime64("2021-03-02T00:00:00")
+    assert array_equal(values["TemperatureOutside"], nanmax(columns.column("TemperatureOutside").reshape(21, 48), axis=1))
+    assert values["WindDirection"].tolist() == ["N"] * 21
+
+    rain = columns.column("RainfallTotal")
+    first_day = rain[:48]
+    increments = sum(b - a if b >= a else b for a, b in zip(first_day[:-1], first_day[1:]))
+    assert values["RainfallTotal"][0] == increments
+
+def test_mean_ignores_missing_values(columns):
+    bin_times, values = resample_columns(columns, ["TemperatureOutside"], "d", aggs="mean")
+    temperatures = columns.column("TemperatureOutside")[:48]
+    assert values["TemperatureOutside"][0] == pytest.approx(temperatures[temperatures == temperatures].mean())
+
+def test_bin_starts():
+    times = array(["2021-03-03T12:34:56", "2021-12-31T23:59:59"], dtype="datetime64[s]")
+    assert get_bin_starts(times, "w").tolist() == [datetime(2021, 3, 1), datetime(2021, 12, 27)] # mondays
+    assert get_bin_starts(times, "m").tolist() == [datetime(2021, 3, 1), datetime(2021, 12, 1)]
+    assert get_bin_starts(times, "15min").tolist() == [datetime(2021, 3, 3, 12, 30), datetime(2021, 12, 31, 23, 45)]
+    assert get_bin_starts(times, "y").tolist() == [datetime(2021, 1, 1), datetime(2021, 1, 1)]
+    assert get_frequency_seconds("6h") == 6 * 3600
+    with pytest.raises(ValueError):
+        get_frequency_seconds("m")
+    with pytest.raises(ValueError):
+        get_bin_starts(times, "fortnight")
+
+def test_empty_columns():
+    bin_times, values = resample_columns(weather_columns.allocate(_names), ["TemperatureOutside"], "d")
+    assert bin_times.shape[0] == 0 and values["TemperatureOutside"].shape[0] == 0
+
+
+def test_pyramid_levels_like_resample(columns):
+    pyramid = weather_pyramid.build(columns)
+    assert pyramid.keys == ["TemperatureOutside", "RainfallTotal"] # no categories
+    start, end = datetime(2021, 2, 1), datetime(2021, 4, 1)
+
+    for level in pyramid_levels:
+        for statistic in ["min", "mean", "max"]:
+            bin_times, values = pyramid.get_values(level, "TemperatureOutside", start, end, statistic=statistic)
+            expected_times, expected = resample_columns(columns, ["TemperatureOutside"], level, aggs=statistic)
+            assert array_equal(bin_times, expected_times)
+            assert array_equal(values, expected["TemperatureOutside"].astype(float32), equal_nan=True), (level, statistic)
+
+def test_pyramid_level_choice(columns):
+    pyramid = weather_pyramid.build(columns)
+    start, end = datetime(2021, 2, 1), datetime(2021, 4, 1)
+    assert pyramid.get_level(start, end, 2) == "1w" # 3 weeks
+    assert pyramid.get_level(start, end, 3) == "1d"
+    assert pyramid.get_level(start, end, 21) == "1h"
+    assert pyramid.get_level(start, end, 21 * 24) is None # not finer than the raw values
+
+    times, values = pyramid.get_minmax_values("1d", "TemperatureOutside", start, end)
+    assert times.shape[0] == values.shape[0] == 42
+    assert (values[0::2] <= values[1::2]).all() # minimum, then maximum of every day
+
+def test_pyramid_file(columns, tmp_path):
+    pyramid = weather_pyramid.build(columns)
+    pyramid.save(str(tmp_path / "pyramid.npz"), "signature")
+
+    assert weather_pyramid.load(str(tmp_path / "pyramid.npz"), "other signature") is None
+    assert weather_pyramid.load(str(tmp_path / "missing.npz"), "signature") is None
+    loaded = weather_pyramid.load(str(tmp_path / "pyramid.npz"), "signature")
+    for level in pyramid_levels:
+        assert array_equal(loaded.get_values(level, "RainfallTotal", datetime(2021, 1, 1), datetime(2022, 1, 1))[1],
+                           pyramid.get_values(level, "RainfallTotal", datetime(2021, 1, 1), datetime(2022, 1, 1))[1])
@@ -0,0 +1,89 @@
+import json
+import asyncio
+from threading import Thread
+from datetime import datetime
+from http.client import HTTPConnection
+from os.path import dirname, abspath, join
+
+import pytest
+
+from weather_server import weather_server
+from backend_files.weather_wrapper import weather_wrapper as ww
+
+
+_weather_files = join(dirname(dirname(abspath(__file__))), "backend_files", "weather_files")
+
+
+@pytest.fixture(scope="module")
+def data_object():
+    return ww(directory=_weather_files, use_cache=False)
+
+@pytest.fixture
+def server(data_object):
+    # event loop of the server in a background thread, port chosen by the system
+    server = weather_server(data_object, port=0)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    thread = Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server
+
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(timeout=10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=10)
+    loop.close()
+
+@pytest.fixture
+def connection(server):
+    connection = HTTPConnection(*server.get_address(), timeout=30)
+    yield connection
+    connection.close()
+
+def get(connection, target: str):
+    connection.request("GET", target)
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def test_range_chunked(data_object, connection):
+    response, body = get(connection, "/range?keys=TemperatureOutside,WindDirection")
+    assert response.status == 200
+    assert response.getheader("Transfer-Encoding") == "chunked"
+
+    lines = body.decode("utf-8").splitlines()
+    assert lines[0] == "Time;TemperatureOutside;WindDirection"
+    assert len(lines) == data_object.size() + 1
+
+def test_range_json(data_object, connection):
+    response, body = get(connection, "/range?keys=TemperatureOutside&start=2021-08-26&end=2021-08-27&format=json")
+    rows = json.loads(body)["rows"]
+    values = data_object.subscript_data(["TemperatureOutside"], start_date=datetime(2021, 8, 26), end_date=datetime(2021, 8, 27),
+                                        include_labeling=False)
+    assert [row[1] for row in rows] == values[:, 0].tolist()
+
+def test_keep_alive(connection):
+    get(connection, "/labels")
+    sock = connection.sock
+    for target in ["/range?keys=TemperatureOutside", "/stats", "/range?keys=Unknown", "/unknown"]:
+        response, body = get(connection, target)
+        assert response.getheader("Connection") == "keep-alive"
+        assert connection.sock is sock # same connection for every request, also after errors
+
+def test_cache(connection):
+    for i in range(2):
+        response, first_body = get(connection, "/range?keys=TemperatureOutside")
+    stats = json.loads(get(connection, "/stats")[1])["cache"]
+    assert stats["hits"] == 1 and stats["entries"] == 1
+
+    response, body = get(connection, "/range?keys=TemperatureOutside")
+    assert body == first_body
+    assert response.getheader("Transfer-Encoding") == "chunked" # cached responses are still sent in chunks
+
+    stats = json.loads(get(connection, "/stats")[1])["cache"]
+    assert stats["hits"] == 2 and stats["entries"] == 1 # /stats itself is not cached
+
+def test_errors(connection):
+    assert get(connection, "/range")[0].status == 400
+    assert get(connection, "/unknown")[0].status == 404
+    connection.request("POST", "/range")
+    assert connection.getresponse().status == 405
@@ -0,0 +1,18 @@
+from numpy import arange, sin, pad, median, abs as np_abs
+from numpy.random import default_rng
+
+from backend_files._weather_trend import rolling_median
+
+
+def exact_median(values, window_samples):
+    half = window_samples // 2
+    padded = pad(values, half, mode="edge")
+    return [median(padded[i:i + 2 * half + 1]) for i in range(values.shape[0])]
+
+def test_rolling_median_short_window_is_exact():
+    values = default_rng(0).normal(size=500)
+    assert (rolling_median(values, 15) == exact_median(values, 15)).all()
+
+def test_rolling_median_long_window():
+    values = sin(arange(20000) / 2000.0) + default_rng(0).normal(scale=0.1, size=20000)
+    assert np_abs(rolling_median(values, 1441) - exact_median(values, 1441)).max() < 0.02
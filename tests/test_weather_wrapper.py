@@ -0,0 +1,172 @@
+import shutil
+from datetime import datetime
+from os import listdir, remove
+from os.path import dirname, abspath, join
+
+import pytest
+from numpy import array, array_equal
+
+from backend_files import weather_wrapper
+from backend_files.weather_wrapper import weather_wrapper as ww
+
+
+_weather_files = join(dirname(dirname(abspath(__file__))), "backend_files", "weather_files")
+_overlap_file = "2019.03.11-2019.08.05 - Wettertation Export 25.08.2021.txt"
+
+
+@pytest.fixture
+def folder(tmp_path):
+    # exports of the repository plus a second export of 2019 (every row of 2019 twice)
+    for file_name in listdir(_weather_files):
+        shutil.copy(join(_weather_files, file_name), tmp_path)
+    shutil.copy(join(_weather_files, _overlap_file), join(tmp_path, "copy 2019.txt"))
+    return str(tmp_path) + "/"
+
+def assert_same_data(data_object: ww, directory: str):
+    fresh_data = ww(directory=directory, use_cache=False)
+    assert data_object.size() == fresh_data.size()
+    for name in fresh_data._data.data_names:
+        assert array_equal(data_object._data.column(name), fresh_data._data.column(name), equal_nan=name != "Time"), name
+    assert data_object.subscript_data(["WindDirection"], include_labeling=False).tolist() == \
+           fresh_data.subscript_data(["WindDirection"], include_labeling=False).tolist()
+
+
+@pytest.mark.parametrize("file_name", ["copy 2019.txt", _overlap_file])
+def test_refresh_after_delete(folder, file_name):
+    data_object = ww(directory=folder, use_cache=False)
+    size = data_object.size()
+
+    remove(join(folder, file_name))
+    assert data_object.refresh() == [join(folder, file_name)]
+    assert data_object.size() == size # the other export of 2019 still contains every row
+    assert_same_data(data_object, folder)
+
+@pytest.mark.parametrize("file_name", ["copy 2019.txt", _overlap_file])
+def test_refresh_after_modify(folder, file_name):
+    data_object = ww(directory=folder, use_cache=False)
+
+    file_path = join(folder, file_name)
+    with open(file_path, encoding="latin-1") as file:
+        lines = file.readlines()
+    with open(file_path, "w", encoding="latin-1") as file: # only the first half of the rows remains
+        file.writelines(lines[:len(lines) // 2])
+
+    assert data_object.refresh() == [file_path]
+    assert_same_data(data_object, folder)
+
+def test_refresh_after_add(folder):
+    shutil.move(join(folder, _overlap_file), join(folder, "..", "moved.txt"))
+    data_object = ww(directory=folder, use_cache=False)
+
+    shutil.move(join(folder, "..", "moved.txt"), join(folder, _overlap_file))
+    assert data_object.refresh() == [join(folder, _overlap_file)]
+    assert_same_data(data_object, folder)
+
+def test_load_changes_before_apply(folder):
+    remove(join(folder, _overlap_file))
+    data_object = ww(directory=folder, use_cache=False)
+    size, version = data_object.size(), data_object.get_version()
+    state = [list(data_object._source_files), dict(data_object._file_states), dict(data_object._file_ranges)]
+
+    shutil.copy(join(_weather_files, _overlap_file), folder)
+    changes = data_object.load_changes()
+    assert data_object.size() == size and data_object.get_version() == version # parsed, not merged yet
+    assert [data_object._source_files, data_object._file_states, data_object._file_ranges] == state # no side effects
+    assert sorted(changes[3]) == sorted([join(folder, _overlap_file), join(folder, "copy 2019.txt")]) # reloads the overlapping file
+    assert data_object.apply_changes(changes) == [join(folder, _overlap_file)]
+    assert_same_data(data_object, folder)
+    assert data_object.apply_changes(data_object.load_changes()) == []
+
+def test_outdated_changes(folder):
+    data_object = ww(directory=folder, use_cache=False)
+    remove(join(folder, "copy 2019.txt"))
+    changes = data_object.load_changes()
+    data_object.refresh()
+    with pytest.raises(RuntimeError):
+        data_object.apply_changes(changes)
+
+def test_progress_per_chunk(folder, monkeypatch):
+    monkeypatch.setattr(weather_wrapper, "_progress_chunk_size", 1000)
+    reports = []
+    data_object = ww(directory=folder, use_cache=False, progress_callback=lambda *report: reports.append(report))
+
+    file_count = len(listdir(folder))
+    assert len(reports) > 2 * file_count # several reports inside of every file
+    assert [report[2] for report in reports] == sorted(report[2] for report in reports)
+    assert reports[-1][:2] == (file_count, file_count)
+    assert_same_data(data_object, folder)
+
+def test_cancel_inside_of_file(folder, monkeypatch):
+    monkeypatch.setattr(weather_wrapper, "_progress_chunk_size", 1000)
+    reports = []
+    def cancel(*report):
+        reports.append(report)
+        if report[2] >= 2000: raise KeyboardInterrupt()
+
+    with pytest.raises(KeyboardInterrupt):
+        ww(directory=folder, use_cache=False, progress_callback=cancel)
+    assert reports[-1][0] == 0 # before the first file was finished
+
+def test_missing_time_is_dropped(tmp_path):
+    file_name = "2021.08.25-2021.08.30 - Wettertation Export 25.08.2021.txt"
+    with open(join(_weather_files, file_name), encoding="latin-1") as file:
+        lines = file.readlines()
+    fields = lines[5].split(";")
+    lines[5] = ";".join(fields[:1] + ["---"] + fields[2:]) # a measurement without time
+    with open(join(tmp_path, file_name), "w", encoding="latin-1") as file:
+        file.writelines(lines)
+
+    data_object = ww(directory=str(tmp_path), use_cache=False)
+    assert data_object.size() == len(lines) - 2 # header and the row without time
+    assert not data_object[0]["Time"] is None
+    assert not data_object._data.missing_mask("Time").any()
+
+    chunks = list(weather_wrapper.iter_weather_chunks(directory=str(tmp_path), chunk_size=50))
+    assert sum(chunk.size() for chunk in chunks) == data_object.size()
+    assert all(not chunk.missing_mask("Time").any() for chunk in chunks)
+
+def test_cached_results_are_own_arrays(folder):
+    data_object = ww(directory=folder, use_cache=False)
+    start, end = datetime(2019, 4, 1), datetime(2019, 5, 1)
+
+    rows = data_object.subscript_data(["Time", "TemperatureOutside"], start, end, include_labeling=False)
+    expected = rows.tolist()
+    rows[:, 1] = None # callers may change their result
+    assert data_object.subscript_data(["Time", "TemperatureOutside"], start, end, include_labeling=False).tolist() == expected
+
+    (times, values), = data_object.get_trends(["TemperatureOutside"], start, end)
+    expected = values.tolist()
+    values[:] = 0.0
+    assert data_object.get_trends(["TemperatureOutside"], start, end)[0][1].tolist() == expected
+    assert data_object.get_result_cache_stats()["hits"] == 2
+
+@pytest.mark.parametrize("current_unit, desired_unit, values, expected", [("km/h", "m/s", [36.0, 0.0], [10.0, 0.0]),
+                                                                          ("°F", "°C", [32.0, 212.0], [0.0, 100.0]),
+                                                                          ("ºF", "°c", [-40.0], [-40.0]),
+                                                                          ("inHg", "hpa", [1.0], [33.8638866667]),
+                                                                          ("Hpa", "hpa", [1013.2], [1013.2])])
+def test_unit_conversions(current_unit, desired_unit, values, expected):
+    function = weather_wrapper.get_conversion_function(current_unit, desired_unit)
+    assert function(array(values)) == pytest.approx(expected)
+
+def test_unknown_unit_conversion(capsys):
+    assert weather_wrapper.get_conversion_factors("furlong", "m/s") == (1.0, 0.0)
+    assert "not available" in capsys.readouterr().out
+
+def test_units_of_the_header(tmp_path):
+    file_name = _overlap_file # units as stored (m/s and °C)
+    with open(join(_weather_files, file_name), encoding="latin-1") as file:
+        lines = file.readlines()
+    lines[0] = lines[0].replace("Wind(m/s)", "Wind(km/h)").replace("außen Temperatur(°C)", "außen Temperatur(°F)")
+    with open(join(tmp_path, file_name), "w", encoding="latin-1") as file:
+        file.writelines(lines)
+
+    names = ["No", "Time", "MeasureInterval", "HumidityInside", "TemperatureInside", "HumidityOutside", "TemperatureOutside",
+             "PressureAbsolute", "WindSpeed", "WindGustSpeed"]
+    assert [key for key, scale, offset in weather_wrapper.get_unit_conversions(lines[0], names)] == ["TemperatureOutside", "WindSpeed"]
+
+    original = weather_wrapper.load_export_file(join(_weather_files, file_name), names)
+    converted = weather_wrapper.load_export_file(join(tmp_path, file_name), names)
+    assert converted.column("WindSpeed") == pytest.approx(original.column("WindSpeed") / 3.6, nan_ok=True)
+    assert converted.column("TemperatureOutside") == pytest.approx((original.column("TemperatureOutside") - 32) * 5 / 9, nan_ok=True)
+    assert array_equal(converted.column("WindGustSpeed"), original.column("WindGustSpeed"), equal_nan=True)
@@ -0,0 +1,264 @@
+'''
+Command line entry point without GUI: loads a folder of weather exports once and renders plots to files
+(Agg-backend, no window needed) or writes queried values as CSV.
+
+Single plot:
+    python weather_cli.py weather_files/ --y TemperatureOutside --trend TemperatureOutside --output temperature.png
+
+Many jobs in one process (the folder gets parsed only once), optionally rendered by several processes:
+    python weather_cli.py weather_files/ --jobs nightly.json --output-directory charts/
+    python weather_cli.py weather_files/ --jobs nightly.json --output-directory charts/ --parallel 4
+
+Job file (every value of "defaults" can be overwritten by a job):
+    {"defaults": {"time_format": "%d.%m.%Y", "trend_method": "polynomial", "degree": 1},
+     "jobs": [{"output": "temperature.png", "y": ["TemperatureOutside"], "trend": ["TemperatureOutside"]},
+              {"output": "pressure_2021.svg", "y": ["PressureRelative"], "sec_y": ["WindSpeed"],
+               "start": "2021-01-01", "end": "2021-12-31"},
+              {"type": "query", "output": "rain.csv", "keys": ["RainfallDaily", "RainfallTotal"], "start": "2021-08-01"}]}
+'''
+
+import sys
+import json
+import argparse
+from os import makedirs
+from os.path import join, dirname
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from tempfile import mkdtemp
+from shutil import rmtree
+
+import matplotlib
+matplotlib.use("Agg") # before pyplot gets imported -> plots only go to files
+import matplotlib.pyplot as plt
+
+from backend_files.weather_wrapper import weather_wrapper as ww
+from backend_files.weather_plot_main import plot_oneAxis, plot_twinAxis
+from backend_files._weather_trend import trend_methods
+
+
+job_defaults = {"type": "plot",
+                "y": [],
+                "sec_y": [],
+                "trend": [],
+                "sec_trend": [],
+                "keys": [],
+                "start": None,
+                "end": None,
+                "time_format": None, # plot: "%d.%m.%Y", query: "%d.%m.%Y %H:%M:%S"
+                "degree": 1,
+                "trend_method": "polynomial",
+                "trend_window": "1d",
+                "downsampling": True,
+                "separator": ";",
+                "no_value_key": "---"}
+job_types = ["plot", "query"]
+default_time_formats = {"plot": "%d.%m.%Y", "query": "%d.%m.%Y %H:%M:%S"}
+
+_worker_data = None # weather_wrapper of a render-process (memory-mapped dataset)
+
+
+def load_data(arguments):
+    if not arguments.dataset is None:
+        return ww.from_dataset(arguments.dataset, directory=arguments.directory, use_cache=not arguments.no_cache,
+                               workers=arguments.workers, build_pyramid=True)
+    return ww(directory=arguments.directory, use_cache=not arguments.no_cache, workers=arguments.workers, build_pyramid=True)
+
+def run_jobs(data_object: ww, jobs: list, output_directory="."):
+    '''
+    Runs every job on the same (already loaded) data. A failing job gets reported and skipped.
+    Returns the number of failed jobs.
+    '''
+    results = [_run_job_safely(data_object, job, output_directory) for job in jobs]
+    return _report_results(jobs, results)
+
+def run_jobs_parallel(data_object: ww, jobs: list, output_directory=".", workers=None, build_pyramid=True):
+    '''
+    Like run_jobs, but independent figures get rendered by "workers" processes (same output files).
+    The loaded data gets shared as memory-mapped dataset (see weather_wrapper.save_dataset): every process
+    maps the same files instead of parsing or copying the data, the operating system keeps them once in its cache.
+    Data opened by weather_wrapper.from_dataset gets used directly, otherwise a temporary dataset is written.
+    The pyramid gets built once into the dataset (only if a job plots with downsampling), every process loads it.
+    '''
+    dataset_directory = data_object.get_dataset_directory()
+    temporary_directory = None
+    if dataset_directory is None:
+        temporary_directory = mkdtemp(prefix="weather_batch_")
+        data_object.save_dataset(temporary_directory)
+        dataset_directory = temporary_directory
+    
+    build_pyramid = build_pyramid and any(_uses_pyramid(job) for job in jobs)
+    if build_pyramid: ww.from_dataset(dataset_directory, use_cache=False, build_pyramid=True) # saved with the dataset if missing
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dataset_directory, build_pyramid)) as executor:
+            futures = [executor.submit(_run_worker_job, job, output_directory) for job in jobs]
+            results = []
+            for i, future in enumerate(futures): # in the order of the jobs
+                results.append(_get_result_safely(future))
+                _report_results(jobs[i:i+1], results[i:i+1], first_index=i, job_count=len(jobs))
+    finally:
+        if not temporary_directory is None: rmtree(temporary_directory, ignore_errors=True)
+    
+    return sum(1 for output_file, error in results if not error is None)
+
+def run_job(data_object: ww, job: dict, output_directory="."):
+    job = get_job(job)
+    output_file = join(output_directory, job["output"])
+    if dirname(output_file) != "": makedirs(dirname(output_file), exist_ok=True)
+
+    time_range = get_time_range(data_object, job["start"], job["end"])
+    if job["time_format"] is None: job["time_format"] = default_time_formats[job["type"]]
+    if job["type"] == "query":
+        write_query(data_object, job["keys"], time_range, output_file, time_format=job["time_format"], separator=job["separator"],
+                    no_value_key=job["no_value_key"])
+        return output_file
+
+    plot_job(data_object, job, time_range, output_file)
+    return output_file
+
+def plot_job(data_object: ww, job: dict, time_range: list, output_file):
+    # job checked by get_job (with time_format), output_file: path or binary file object (PNG)
+    plot_arguments = dict(interpolation_degree=job["degree"], downsampling=job["downsampling"], trend_method=job["trend_method"],
+                          trend_window=job["trend_window"], output_file=output_file)
+    open_figures = plt.get_fignums()
+    try:
+        if len(job["sec_y"]) + len(job["sec_trend"]) > 0:
+            plot_twinAxis(data_object, job["time_format"], time_range, job["y"], job["sec_y"], job["trend"], job["sec_trend"], **plot_arguments)
+        else:
+            plot_oneAxis(data_object, job["time_format"], time_range, job["y"], job["trend"], **plot_arguments)
+    except BaseException: # the figure only gets closed after saving -> otherwise every failed job would keep one open
+        for figure_number in plt.get_fignums():
+            if not figure_number in open_figures: plt.close(figure_number)
+        raise
+
+def get_job(job: dict):
+    # job with every missing value from the defaults, checked before anything gets computed
+    unknown_keys = [key for key in job if not key in job_defaults and key != "output"]
+    if len(unknown_keys) > 0: raise KeyError(f"unknown job values {unknown_keys}")
+    if not "output" in job: raise KeyError("every job needs an \"output\"-file")
+
+    ret_job = dict(job_defaults, **job)
+    if not ret_job["type"] in job_types: raise ValueError(f"job type must be one of {job_types}")
+    if not ret_job["trend_method"] in trend_methods: raise ValueError(f"trend_method must be one of {trend_methods}")
+
+    keys = ret_job["keys"] if ret_job["type"] == "query" else ret_job["y"] + ret_job["trend"] + ret_job["sec_y"] + ret_job["sec_trend"]
+    if len(keys) == 0: raise ValueError("no values selected")
+    return ret_job
+
+def get_time_range(data_object: ww, start, end):
+    # ISO-dates ("2021-08-01" or "2021-08-01 12:00"), missing -> first/last measurement
+    if data_object.size() == 0: raise ValueError("no weather data loaded")
+    first_time, last_time = data_object.subscript_data(["Time"], include_labeling=False)[[0, -1], 0]
+
+    start = first_time - timedelta(seconds=1) if start is None else datetime.fromisoformat(start) # start is exclusive
+    end = last_time if end is None else datetime.fromisoformat(end)
+    if start >= end: raise ValueError("the start must be before the end")
+    return [start, end]
+
+def write_query(data_object: ww, keys: list, time_range: list, output_file: str, time_format="%d.%m.%Y %H:%M:%S", separator=";",
+                no_value_key="---"):
+    values, labels = data_object.subscript_data(["Time"] + keys, start_date=time_range[0], end_date=time_range[1])
+    with open(output_file, "w", encoding="utf-8") as file:
+        file.write(separator.join(labels) + "\n")
+        for row in values:
+            row_strings = [row[0].strftime(time_format)] + [no_value_key if value is None else str(value) for value in row[1:]]
+            file.write(separator.join(row_strings) + "\n")
+
+def read_job_file(file_path: str):
+    with open(file_path, encoding="utf-8") as job_file:
+        job_content = json.load(job_file)
+    if isinstance(job_content, list): return job_content # only jobs, no defaults
+    return [dict(job_content.get("defaults", {}), **job) for job in job_content["jobs"]]
+
+def get_argument_job(arguments):
+    # single job from the command line
+    job = {"output": arguments.output, "y": arguments.y, "sec_y": arguments.sec_y, "trend": arguments.trend,
+           "sec_trend": arguments.sec_trend, "keys": arguments.query, "start": arguments.start, "end": arguments.end,
+           "degree": arguments.degree, "trend_method": arguments.trend_method, "trend_window": arguments.trend_window,
+           "type": "query" if len(arguments.query) > 0 else "plot"}
+    if not arguments.time_format is None: job["time_format"] = arguments.time_format
+    return job
+
+
+
+### helper functions ###
+
+def _run_job_safely(data_object: ww, job: dict, output_directory: str):
+    # (output file, None) or (None, error message) -> a failing job does not stop the others
+    try:
+        return run_job(data_object, job, output_directory=output_directory), None
+    except Exception as error: # also unexpected ones, e.g. numpy.linalg.LinAlgError of a trend fit
+        return None, _get_error_message(error)
+
+def _get_result_safely(future):
+    # errors outside of the job itself (e.g. a crashed worker or an unpicklable job) fail this job like in _run_job_safely
+    try:
+        return future.result()
+    except Exception as error:
+        return None, _get_error_message(error)
+
+def _get_error_message(error: Exception):
+    if isinstance(error, (ValueError, KeyError, AssertionError, OSError)): return str(error) # invalid job, missing file, ...
+    return f"{type(error).__name__}: {error}"
+
+def _report_results(jobs: list, results: list, first_index=0, job_count=None):
+    if job_count is None: job_count = len(jobs)
+    failed_jobs = 0
+    for i, (job, (output_file, error)) in enumerate(zip(jobs, results), start=first_index + 1):
+        if error is None:
+            print(f"[{i}/{job_count}] {output_file}")
+        else:
+            failed_jobs += 1
+            print(f"[{i}/{job_count}] Fehler in Job {job.get('output', i)}: {error}", file=sys.stderr)
+    return failed_jobs
+
+def _uses_pyramid(job: dict):
+    # plots with downsampling read the pyramid on long time ranges, queries never
+    job = dict(job_defaults, **job)
+    return job["type"] == "plot" and job["downsampling"]
+
+def _init_worker(dataset_directory: str, build_pyramid: bool):
+    global _worker_data
+    _worker_data = ww.from_dataset(dataset_directory, use_cache=False, build_pyramid=build_pyramid)
+
+def _run_worker_job(job: dict, output_directory: str):
+    return _run_job_safely(_worker_data, job, output_directory)
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weather Data Visualization without GUI: plots and queries of a folder of exports.")
+    parser.add_argument("directory", help="folder with the exports of EasyWeather")
+    parser.add_argument("--jobs", default=None, help="JSON-file with many plot/query jobs (see the docstring of weather_cli.py)")
+    parser.add_argument("--output-directory", default=".", help="folder for the output files of the jobs")
+    parser.add_argument("--dataset", default=None, help="binary dataset-folder (see weather_wrapper.save_dataset) to start from")
+    parser.add_argument("--workers", type=int, default=None, help="processes for parsing the exports")
+    parser.add_argument("--no-cache", action="store_true", help="do not use/write the cache-files of the parsed exports")
+    parser.add_argument("--parallel", type=int, default=1, help="processes rendering the jobs (data shared memory-mapped)")
+
+    single_job = parser.add_argument_group("single job (without --jobs)")
+    single_job.add_argument("--output", default=None, help="output file, e.g. plot.png, plot.svg or values.csv")
+    single_job.add_argument("--y", nargs="*", default=[], help="keys plotted on the (first) y-axis, e.g. TemperatureOutside")
+    single_job.add_argument("--sec-y", nargs="*", default=[], help="keys plotted on the secondary y-axis")
+    single_job.add_argument("--trend", nargs="*", default=[], help="keys with a trend line on the (first) y-axis")
+    single_job.add_argument("--sec-trend", nargs="*", default=[], help="keys with a trend line on the secondary y-axis")
+    single_job.add_argument("--query", nargs="*", default=[], help="keys written as CSV instead of a plot")
+    single_job.add_argument("--start", default=None, help="ISO-date, e.g. 2021-08-01 (default: first measurement)")
+    single_job.add_argument("--end", default=None, help="ISO-date (default: last measurement)")
+    single_job.add_argument("--time-format", default=None, help="strftime-format of the time axis/column")
+    single_job.add_argument("--degree", type=int, default=1, help="degree of the trend polynomial")
+    single_job.add_argument("--trend-method", default="polynomial", choices=trend_methods)
+    single_job.add_argument("--trend-window", default="1d", help="window of the smoothing trend methods, e.g. 6h, 1d or 2w")
+    arguments = parser.parse_args()
+
+    if arguments.jobs is None and arguments.output is None:
+        parser.error("either --jobs or --output is needed")
+    jobs = read_job_file(arguments.jobs) if not arguments.jobs is None else [get_argument_job(arguments)]
+
+    data_object = load_data(arguments)
+    print(f"{data_object.size()} Messungen eingelesen, {len(jobs)} Job(s)...")
+    if arguments.parallel > 1 and len(jobs) > 1:
+        failed_jobs = run_jobs_parallel(data_object, jobs, output_directory=arguments.output_directory, workers=arguments.parallel)
+    else:
+        failed_jobs = run_jobs(data_object, jobs, output_directory=arguments.output_directory)
+    sys.exit(1 if failed_jobs > 0 else 0)
@@ -0,0 +1,346 @@
+'''
+Local HTTP server (asyncio, only the standard library) that keeps one weather_wrapper resident, so other tools
+can query the station data without parsing the exports themselves:
+    python weather_server.py weather_files/ --port 8765 --refresh 60
+
+Endpoints (GET, keys comma-separated, times as ISO-dates like in weather_cli.py):
+    /labels                                         data-names and their labels (JSON)
+    /range?keys=TemperatureOutside,WindSpeed&start=2021-08-01&end=2021-08-31&format=csv
+                                                    measurements as CSV (default) or JSON, streamed in chunks
+    /resample?keys=TemperatureOutside,RainfallTotal&freq=d&aggs=max&start=2021-08-01
+                                                    aggregated values per interval (JSON, see weather_wrapper.resample)
+    /plot.png?y=TemperatureOutside&trend=TemperatureOutside&sec_y=WindSpeed&start=2021-08-01
+                                                    rendered plot, the values of a plot-job of weather_cli.py
+    /stats                                          number of measurements, data-version and cache statistics
+
+Connections are kept alive (HTTP/1.1), large responses are sent with "Transfer-Encoding: chunked".
+Responses of repeated identical queries come from an LRU-cache, new data (--refresh) invalidates it.
+Queries and plots are computed one after another in a worker thread, the event loop keeps answering cached requests.
+'''
+
+import sys
+import json
+import asyncio
+import argparse
+from io import BytesIO
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from numpy import ndarray, datetime_as_string, isnan
+
+from weather_cli import load_data, get_job, get_time_range, plot_job, default_time_formats
+from backend_files.weather_wrapper import weather_wrapper as ww
+from backend_files._weather_watcher import weather_folder_watcher
+from backend_files._weather_lru import lru_cache
+
+
+_status_texts = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+_chunk_rows = 5000 # rows per chunk of streamed range queries
+_keep_alive_timeout = 15.0 # seconds an idle connection stays open
+_max_header_lines = 100
+_plot_list_values = ["y", "sec_y", "trend", "sec_trend"]
+_plot_values = ["start", "end", "time_format", "degree", "trend_method", "trend_window", "downsampling"]
+_uncached_paths = ["/stats"] # changes with every request
+
+
+class weather_server(object):
+
+    def __init__(self, data_object: ww, host="127.0.0.1", port=8765, cache_bytes=64 * 2**20, refresh_interval=None):
+        self._data_object = data_object
+        self._host, self._port = host, port
+        self._cache = lru_cache(max_bytes=cache_bytes)
+        self._refresh_interval = refresh_interval
+        self._watcher = weather_folder_watcher(data_object)
+
+        self._executor = ThreadPoolExecutor(max_workers=1) # the wrapper and pyplot only get used by this thread
+        self._server = None
+        self._refresh_task = None
+        self._routes = {"/labels": self._get_labels,
+                        "/range": self._get_range,
+                        "/resample": self._get_resample,
+                        "/plot.png": self._get_plot,
+                        "/stats": self._get_stats}
+
+    ### ---- Public Methods ----- ###
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self._host, self._port)
+        if not self._refresh_interval is None:
+            self._refresh_task = asyncio.ensure_future(self._refresh_periodically())
+        return self.get_address()
+
+    async def serve_forever(self):
+        if self._server is None: await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if not self._refresh_task is None: self._refresh_task.cancel()
+        if not self._server is None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+
+    def get_address(self):
+        # (host, port), port 0 gets replaced by the port chosen by the system
+        return self._server.sockets[0].getsockname()[:2]
+
+    def get_cache_stats(self):
+        return self._cache.get_stats()
+
+    ### helper functions ###
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await asyncio.wait_for(_read_request(reader), _keep_alive_timeout)
+                if request is None: break # connection closed by the client
+                method, target, keep_alive = request
+                if not await self._respond(writer, method, target, keep_alive): break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        except ValueError as error: # malformed request
+            await _write_response(writer, 400, "text/plain; charset=utf-8", [str(error).encode("utf-8")], False)
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, method: str, target: str, keep_alive: bool):
+        # returns False if the connection has to be closed
+        url = urlsplit(target)
+        if method != "GET":
+            return await _write_error(writer, 405, "only GET is supported", keep_alive)
+        handler = self._routes.get(url.path)
+        if handler is None:
+            return await _write_error(writer, 404, f"unknown path {url.path}, use one of {list(self._routes)}", keep_alive)
+
+        query = {key: values[-1] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        cache_key = None if url.path in _uncached_paths else (url.path, tuple(sorted(query.items())), self._data_object.get_version())
+        cached = None if cache_key is None else self._cache.get(cache_key)
+        if not cached is None:
+            content_type, chunks = cached
+            return await _write_response(writer, 200, content_type, chunks, keep_alive)
+
+        try:
+            content_type, chunks = await self._run(lambda: self._call_handler(handler, query))
+            first_chunk = await self._run(next, chunks, None) # errors of the query itself still get an error-response
+            second_chunk = None if first_chunk is None else await self._run(next, chunks, None)
+        except (ValueError, KeyError, AssertionError) as error:
+            message = error.args[0] if isinstance(error, KeyError) and len(error.args) == 1 else error # KeyError quotes its message
+            return await _write_error(writer, 400, str(message), keep_alive)
+        except Exception as error:
+            print(f"Fehler bei {target}: {error!r}", file=sys.stderr)
+            return await _write_error(writer, 500, "internal error", keep_alive)
+
+        if second_chunk is None: # small response -> Content-Length
+            response_chunks = [] if first_chunk is None else [first_chunk]
+            if not cache_key is None: self._cache.put(cache_key, (content_type, response_chunks))
+            return await _write_response(writer, 200, content_type, response_chunks, keep_alive)
+
+        # large response -> chunked, cached if it fits into the cache
+        cached_chunks, cached_bytes = None if cache_key is None else [first_chunk, second_chunk], len(first_chunk) + len(second_chunk)
+        _write_head(writer, 200, content_type, keep_alive, chunked=True)
+        await _write_chunk(writer, first_chunk)
+        await _write_chunk(writer, second_chunk)
+        while True:
+            try:
+                chunk = await self._run(next, chunks, None)
+            except Exception as error: # the head is already sent -> only closing the connection reports the error
+                print(f"Fehler bei {target}: {error!r}", file=sys.stderr)
+                return False
+            if chunk is None: break
+            await _write_chunk(writer, chunk)
+            if not cached_chunks is None:
+                cached_chunks.append(chunk)
+                cached_bytes += len(chunk)
+                if cached_bytes > self._cache.max_bytes: cached_chunks = None
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+        if not cached_chunks is None: self._cache.put(cache_key, (content_type, cached_chunks), size=cached_bytes)
+        return keep_alive
+
+    def _call_handler(self, handler, query: dict):
+        # (content type, iterator over the bytes of the response)
+        content_type, body = handler(query)
+        if isinstance(body, bytes): return content_type, iter([body])
+        return content_type, body
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _refresh_periodically(self):
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                changed_paths = await self._run(self._watcher.poll)
+                if len(changed_paths) == 0: continue
+                self._cache.clear() # entries of the old data-version would never be used again
+                print(f"{len(changed_paths)} Datei(en) neu eingelesen, {self._data_object.size()} Messungen")
+            except (OSError, ValueError) as error:
+                print(f"Fehler beim Einlesen: {error}", file=sys.stderr)
+
+    def _get_labels(self, query: dict):
+        labels = self._data_object.get_possible_labels()
+        return "application/json", _to_json(dict(zip(self._data_object.get_keys_from_labels(labels), labels)))
+
+    def _get_range(self, query: dict):
+        keys = _get_list(query, "keys")
+        if len(keys) == 0: raise ValueError("no keys selected")
+        time_range = get_time_range(self._data_object, query.get("start"), query.get("end"))
+        output_format = query.get("format", "csv")
+        if not output_format in ["csv", "json"]: raise ValueError("format must be csv or json")
+
+        values = self._data_object.subscript_data(["Time"] + keys, *time_range, include_labeling=False)
+        time_format = query.get("time_format", default_time_formats["query"])
+        if output_format == "csv":
+            return "text/csv; charset=utf-8", _iter_csv(values, ["Time"] + keys, time_format, query.get("separator", ";"))
+        return "application/json", _iter_json_rows(values, ["Time"] + keys, time_format)
+
+    def _get_resample(self, query: dict):
+        keys = _get_list(query, "keys")
+        if len(keys) == 0: raise ValueError("no keys selected")
+        time_range = get_time_range(self._data_object, query.get("start"), query.get("end"))
+
+        aggs = query.get("aggs")
+        if not aggs is None and ":" in aggs: # key:aggregation,key:aggregation
+            aggs = dict(item.split(":", 1) for item in _get_list(query, "aggs"))
+        times, values = self._data_object.resample(keys, query.get("freq", "d"), aggs=aggs, start_date=time_range[0],
+                                                   end_date=time_range[1])
+        return "application/json", _to_json({"time": datetime_as_string(times, unit="s").tolist(),
+                                             "values": {key: _to_list(key_values) for key, key_values in values.items()}})
+
+    def _get_plot(self, query: dict):
+        unknown_values = [key for key in query if not key in _plot_list_values + _plot_values]
+        if len(unknown_values) > 0: raise KeyError(f"unknown plot values {unknown_values}")
+
+        job = {key: _get_list(query, key) for key in _plot_list_values}
+        job.update({key: query[key] for key in _plot_values if key in query})
+        if "degree" in job: job["degree"] = int(job["degree"])
+        if "downsampling" in job: job["downsampling"] = job["downsampling"].lower() not in ["0", "false", "no"]
+        job = get_job(dict(job, output="plot.png"))
+        if job["time_format"] is None: job["time_format"] = default_time_formats["plot"]
+
+        png_file = BytesIO()
+        plot_job(self._data_object, job, get_time_range(self._data_object, job["start"], job["end"]), png_file)
+        return "image/png", png_file.getvalue()
+
+    def _get_stats(self, query: dict):
+        return "application/json", _to_json({"size": self._data_object.size(), "version": self._data_object.get_version(),
+                                             "cache": self._cache.get_stats(),
+                                             "result_cache": self._data_object.get_result_cache_stats()})
+
+
+
+async def serve(data_object: ww, host="127.0.0.1", port=8765, cache_bytes=64 * 2**20, refresh_interval=None):
+    server = weather_server(data_object, host=host, port=port, cache_bytes=cache_bytes, refresh_interval=refresh_interval)
+    host, port = await server.start()
+    print(f"Server läuft auf http://{host}:{port}/ (Beenden mit Strg+C)")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+
+### helper functions ###
+
+async def _read_request(reader):
+    # (method, target, keep_alive) of the next request, None if the client closed the connection
+    request_line = await reader.readline()
+    if request_line in [b"", b"\r\n", b"\n"]: return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise ValueError("malformed request line")
+
+    headers = {}
+    for i in range(_max_header_lines + 1):
+        line = await reader.readline()
+        if line in [b"\r\n", b"\n", b""]: break
+        name, separator, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise ValueError("too many header lines")
+
+    body_length = int(headers.get("content-length", 0) or 0)
+    if body_length > 0: await reader.readexactly(body_length) # not used, only GET is supported
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method, target, keep_alive
+
+def _write_head(writer, status: int, content_type: str, keep_alive: bool, content_length=None, chunked=False):
+    header_lines = [f"HTTP/1.1 {status} {_status_texts[status]}",
+                    f"Content-Type: {content_type}",
+                    "Connection: " + ("keep-alive" if keep_alive else "close")]
+    if chunked: header_lines.append("Transfer-Encoding: chunked")
+    else: header_lines.append(f"Content-Length: {content_length}")
+    writer.write(("\r\n".join(header_lines) + "\r\n\r\n").encode("latin-1"))
+
+async def _write_chunk(writer, chunk: bytes):
+    if len(chunk) == 0: return # an empty chunk would end the response
+    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+    await writer.drain() # waits for slow clients instead of buffering the whole response
+
+async def _write_response(writer, status: int, content_type: str, chunks: list, keep_alive: bool):
+    if len(chunks) > 1:
+        _write_head(writer, status, content_type, keep_alive, chunked=True)
+        for chunk in chunks: await _write_chunk(writer, chunk)
+        writer.write(b"0\r\n\r\n")
+    else:
+        body = chunks[0] if len(chunks) == 1 else b""
+        _write_head(writer, status, content_type, keep_alive, content_length=len(body))
+        writer.write(body)
+    await writer.drain()
+    return keep_alive
+
+async def _write_error(writer, status: int, message: str, keep_alive: bool):
+    return await _write_response(writer, status, "text/plain; charset=utf-8", [message.encode("utf-8")], keep_alive)
+
+def _get_list(query: dict, key: str):
+    return [value.strip() for value in query.get(key, "").split(",") if value.strip() != ""]
+
+def _iter_csv(values, keys: list, time_format: str, separator: str):
+    yield (separator.join(keys) + "\n").encode("utf-8")
+    for start in range(0, values.shape[0], _chunk_rows):
+        lines = [separator.join([row[0].strftime(time_format)] + ["" if value is None else str(value) for value in row[1:]])
+                 for row in values[start:start + _chunk_rows]]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def _iter_json_rows(values, keys: list, time_format: str):
+    yield ("{\"keys\": " + json.dumps(keys) + ", \"rows\": [").encode("utf-8")
+    for start in range(0, values.shape[0], _chunk_rows):
+        rows = [json.dumps([row[0].strftime(time_format)] + list(row[1:])) for row in values[start:start + _chunk_rows]]
+        yield (("," if start > 0 else "") + ",".join(rows)).encode("utf-8")
+    yield b"]}"
+
+def _to_list(values: ndarray):
+    # JSON-values, NaN -> null
+    if values.dtype.kind == "f":
+        return [None if is_nan else value for value, is_nan in zip(values.tolist(), isnan(values).tolist())]
+    return values.tolist()
+
+def _to_json(content):
+    return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weather Data Visualization as local HTTP-server for dashboards and other tools.")
+    parser.add_argument("directory", help="folder with the exports of EasyWeather")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the whole network)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dataset", default=None, help="binary dataset-folder (see weather_wrapper.save_dataset) to start from")
+    parser.add_argument("--workers", type=int, default=None, help="processes for parsing the exports")
+    parser.add_argument("--no-cache", action="store_true", help="do not use/write the cache-files of the parsed exports")
+    parser.add_argument("--cache-size", type=float, default=64, help="memory of the response-cache in MiB")
+    parser.add_argument("--refresh", type=float, default=None, help="seconds between checks of the folder for new exports")
+    arguments = parser.parse_args()
+
+    data_object = load_data(arguments)
+    print(f"{data_object.size()} Messungen eingelesen")
+    try:
+        asyncio.run(serve(data_object, host=arguments.host, port=arguments.port, cache_bytes=int(arguments.cache_size * 2**20),
+                          refresh_interval=arguments.refresh))
+    except KeyboardInterrupt:
+        pass